@@ -0,0 +1,151 @@
+"""
+Live Client APIクライアントのマイクロベンチマーク。
+mock.py のHTTPサーバを立てて、素の requests.get と共有セッション(LiveClientAPI)を比べるよ。
+
+使い方（srcディレクトリで）:
+    python -m benchmarks.bench_live_client --requests 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import requests
+
+import mock
+from lol_api.client import LiveClientAPI
+
+ENDPOINTS = ["allgamedata", "eventdata"]
+
+
+def make_dump_dir(players: int = 10, events: int = 300) -> str:
+    """
+    それっぽい大きさのallgamedata/eventdataを一時ディレクトリに書き出す。
+    """
+    dump_dir = tempfile.mkdtemp(prefix="bench_dump_")
+    event_list = [
+        {"EventID": i, "EventName": "ChampionKill", "EventTime": i * 5.0,
+         "KillerName": f"Player{i % players}", "VictimName": f"Player{(i + 1) % players}", "Assisters": []}
+        for i in range(events)
+    ]
+    all_players = [
+        {
+            "summonerName": f"Player{i}",
+            "riotId": f"Player{i}#JP1",
+            "team": "ORDER" if i < players // 2 else "CHAOS",
+            "level": 12,
+            "championStats": {"currentHealth": 1200.0, "maxHealth": 1800.0},
+            "items": [{"itemID": 3000 + j, "price": 900, "displayName": f"Item{j}"} for j in range(6)],
+            "scores": {"kills": 3, "deaths": 2, "assists": 5, "creepScore": 150},
+        }
+        for i in range(players)
+    ]
+    all_game_data = {
+        "activePlayer": {"summonerName": "Player0", "currentGold": 1234.5},
+        "allPlayers": all_players,
+        "events": {"Events": event_list},
+        "gameData": {"gameTime": 1500.0, "gameEnded": False},
+    }
+    with open(os.path.join(dump_dir, "allgamedata_0000.json"), "w", encoding="utf-8") as f:
+        json.dump(all_game_data, f)
+    with open(os.path.join(dump_dir, "eventdata_0000.json"), "w", encoding="utf-8") as f:
+        json.dump({"Events": event_list}, f)
+    return dump_dir
+
+
+def start_mock_server(dump_dir: str):
+    """
+    mock.py のハンドラでHTTPサーバを空いているポートに立てる。
+    """
+    mock.VERBOSE = False
+    mock.rotators = {
+        f"/liveclientdata/{ep}": mock.FileRotator(os.path.join(dump_dir, f"{ep}_*.json"))
+        for ep in ENDPOINTS
+    }
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), mock.MockHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    host, port = httpd.server_address
+    return httpd, f"http://{host}:{port}/liveclientdata"
+
+
+def summarize(name: str, latencies: list, elapsed: float, requests_per_sample: int = 1) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "name": name,
+        "requests": len(latencies) * requests_per_sample,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "req_per_sec": len(latencies) * requests_per_sample / elapsed,
+    }
+
+
+def bench_bare(base_url: str, n: int) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    for i in range(n):
+        t0 = time.perf_counter()
+        res = requests.get(f"{base_url}/{ENDPOINTS[i % len(ENDPOINTS)]}", timeout=2)
+        res.raise_for_status()
+        res.json()
+        latencies.append(time.perf_counter() - t0)
+    return summarize("requests.get (毎回接続)", latencies, time.perf_counter() - start)
+
+
+def bench_session(client: LiveClientAPI, n: int) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    for i in range(n):
+        t0 = time.perf_counter()
+        client.get(ENDPOINTS[i % len(ENDPOINTS)])
+        latencies.append(time.perf_counter() - t0)
+    return summarize("LiveClientAPI.get (keep-alive)", latencies, time.perf_counter() - start)
+
+
+async def bench_session_ticks(client: LiveClientAPI, n: int) -> dict:
+    """
+    フェッチャーと同じく、1ティックで全エンドポイントを並列に取る場合。
+    """
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(n // len(ENDPOINTS)):
+        t0 = time.perf_counter()
+        await asyncio.gather(*(client.get_async(ep) for ep in ENDPOINTS))
+        latencies.append(time.perf_counter() - t0)
+    return summarize("LiveClientAPI.get_async (1ティック)", latencies, time.perf_counter() - start, len(ENDPOINTS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live Client APIクライアントのベンチマーク")
+    parser.add_argument("--requests", type=int, default=500, help="各方式でのリクエスト数")
+    args = parser.parse_args()
+
+    dump_dir = make_dump_dir()
+    httpd, base_url = start_mock_server(dump_dir)
+    client = LiveClientAPI(base_url=base_url)
+    try:
+        results = [
+            bench_bare(base_url, args.requests),
+            bench_session(client, args.requests),
+            asyncio.run(bench_session_ticks(client, args.requests)),
+        ]
+    finally:
+        client.close()
+        httpd.shutdown()
+        shutil.rmtree(dump_dir, ignore_errors=True)
+
+    for r in results:
+        print(f"{r['name']:<36} mean {r['mean_ms']:7.3f}ms  p50 {r['p50_ms']:7.3f}ms  "
+              f"p95 {r['p95_ms']:7.3f}ms  {r['req_per_sec']:8.1f} req/s")
+    speedup = results[0]["mean_ms"] / results[1]["mean_ms"]
+    print(f"keep-aliveで1リクエストあたり {speedup:.2f} 倍速くなったよ〜")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""
+トリガーのパイプライン全体のベンチマーク。
+記録したゲームを mock.py のリプレイサーバで流して、OBS WebSocket のスタブサーバを立てて、
+main_async をそのまま動かすよ。
+
+測るもの:
+    - イベントの種類ごとの検知の遅れ（ゲーム内でイベントが起きてから dispatch されるまで）
+    - Live Client API へのリクエスト数（req/s）
+    - CPU時間とRSS
+    - OBSに送られた保存の数
+
+使い方（srcディレクトリで）:
+    python -m benchmarks.bench_pipeline --speed 20 --output bench_pipeline.json
+    python -m benchmarks.bench_pipeline --recording debug_zips/dump_xxx.jsonl.gz
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import websockets
+
+import main
+import utils.config
+from obs import obs_client
+from lol_api.client import LiveClientAPI
+from utils.event_dispatcher import EventDispatcher
+from utils.event_types import EventType, CustomEventType, ChangeEventType
+from utils.metrics import TRACE_KEY, Histogram, metrics
+from utils.recording import DeltaRecordingWriter, RecordingReader
+
+# 件数と遅れを測るイベント
+PROBED_EVENTS = [e.value for e in EventType] + [e.value for e in CustomEventType] + [e.value for e in ChangeEventType]
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# ゲーム内の何秒ごとにスナップショットを記録するか
+RECORD_STEP = 0.5
+# 検知の遅れ（ゲーム内の秒）用のバケット
+LAG_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+
+def make_recording(path: str, minutes: float = 10.0, seed: int = 0) -> None:
+    """
+    それっぽいゲームを1本分、dump.py と同じ形式で書き出す。
+    自分(Player0)のキル、マルチキル、オブジェクト、3分ごとの集団戦が入っているよ。
+    """
+    rng = random.Random(seed)
+    players = [
+        {"summonerName": f"Player{i}", "riotId": f"Player{i}#JP1", "team": "ORDER" if i < 5 else "CHAOS",
+         "level": 1, "isDead": False, "respawnTimer": 0.0,
+         "championStats": {"currentHealth": 1000.0, "maxHealth": 1000.0},
+         "items": [], "scores": {"kills": 0, "deaths": 0, "assists": 0, "creepScore": 0}}
+        for i in range(10)
+    ]
+    events = [{"EventID": 0, "EventName": "GameStart", "EventTime": 0.0}]
+
+    def add_event(name, t, **fields):
+        events.append({"EventID": len(events), "EventName": name, "EventTime": round(t, 3), **fields})
+
+    def kill(t, killer, victim):
+        add_event("ChampionKill", t, KillerName=players[killer]["summonerName"],
+                  VictimName=players[victim]["summonerName"], Assisters=[])
+        players[killer]["scores"]["kills"] += 1
+        players[victim]["scores"]["deaths"] += 1
+        players[victim].update(isDead=True, respawnTimer=10.0)
+        players[victim]["championStats"]["currentHealth"] = 0.0
+
+    with DeltaRecordingWriter(path) as recorder:
+        t = 0.0
+        while t <= minutes * 60:
+            fight = t > 60 and int(t) % 180 < 8
+            for p in players:
+                stats = p["championStats"]
+                if p["isDead"]:
+                    p["respawnTimer"] = max(p["respawnTimer"] - RECORD_STEP, 0.0)
+                    if p["respawnTimer"] == 0.0:
+                        p["isDead"] = False
+                        stats["currentHealth"] = stats["maxHealth"]
+                    continue
+                drop = rng.uniform(0.1, 0.3) if fight else rng.uniform(-0.02, 0.02)
+                stats["currentHealth"] = round(min(max(stats["currentHealth"] - drop * stats["maxHealth"], 1.0),
+                                                   stats["maxHealth"]), 1)
+                p["level"] = min(18, 1 + int(t // 90))
+                p["scores"]["creepScore"] = int(t // 6)
+
+            if fight and int(t * 2) % 4 == 0:
+                killer, victim = rng.randrange(5), rng.randrange(5, 10)
+                if not players[killer]["isDead"] and not players[victim]["isDead"]:
+                    kill(t, killer, victim)
+                    if killer == 0 and rng.random() < 0.5:
+                        add_event("Multikill", t, KillerName="Player0", KillStreak=2)
+            elif rng.random() < 0.01:
+                killer, victim = (0, rng.randrange(5, 10)) if rng.random() < 0.4 else (rng.randrange(10), 0)
+                if players[killer]["team"] != players[victim]["team"] and not players[victim]["isDead"]:
+                    kill(t, killer, victim)
+            if t > 0 and t % 300 == 0:
+                add_event("DragonKill", t, KillerName=f"Player{rng.randrange(10)}", DragonType="Fire", Stolen="False")
+
+            data = {
+                "activePlayer": {"summonerName": "Player0#JP1", "riotId": "Player0#JP1",
+                                 "riotIdGameName": "Player0", "currentGold": round(t * 2.5, 1),
+                                 "championStats": dict(players[0]["championStats"]), "level": players[0]["level"]},
+                "allPlayers": json.loads(json.dumps(players)),
+                "events": {"Events": list(events)},
+                "gameData": {"gameMode": "CLASSIC", "gameTime": t, "gameEnded": False},
+            }
+            recorder.write("allgamedata", data, captured_at=1_000_000.0 + t)
+            recorder.write("eventdata", {"Events": list(events)}, captured_at=1_000_000.0 + t)
+            t = round(t + RECORD_STEP, 3)
+
+
+class StubOBS:
+    """
+    SaveReplayBuffer を受けたら ReplayBufferSaved を返すだけの OBS WebSocket v5 サーバ。
+    """
+    def __init__(self):
+        self.saves = 0
+        self.requests = 0
+
+    async def handle(self, ws) -> None:
+        await ws.send(json.dumps({"op": 0, "d": {"rpcVersion": 1}}))
+        async for raw in ws:
+            message = json.loads(raw)
+            op, d = message["op"], message["d"]
+            if op == 1:
+                await ws.send(json.dumps({"op": 2, "d": {"negotiatedRpcVersion": 1}}))
+            elif op == 6:
+                self.requests += 1
+                await ws.send(json.dumps({"op": 7, "d": {
+                    "requestType": d["requestType"], "requestId": d["requestId"],
+                    "requestStatus": {"result": True, "code": 100}, "responseData": {},
+                }}))
+                if d["requestType"] == "SaveReplayBuffer":
+                    self.saves += 1
+                    await ws.send(json.dumps({"op": 5, "d": {
+                        "eventType": "ReplayBufferSaved",
+                        "eventData": {"savedReplayPath": f"/clips/{self.saves}.mkv"},
+                    }}))
+            elif op == 8:
+                results = [{"requestType": r["requestType"], "requestId": r.get("requestId"),
+                            "requestStatus": {"result": True, "code": 100}, "responseData": {}}
+                           for r in d["requests"]]
+                await ws.send(json.dumps({"op": 9, "d": {"requestId": d["requestId"], "results": results}}))
+
+
+class DetectionProbe:
+    """
+    全イベントを受け取って、種類ごとの件数と検知の遅れを集める。
+    """
+    def __init__(self):
+        self.lag = {}
+        self.counts = {}
+
+    def for_event(self, name: str):
+        async def probe(event: dict) -> None:
+            self.counts[name] = self.counts.get(name, 0) + 1
+            trace = event.get(TRACE_KEY)
+            if trace is not None:
+                self.lag.setdefault(name, Histogram(LAG_BUCKETS)).observe(trace.game_lag)
+        return probe
+
+    def to_dict(self) -> dict:
+        return {
+            name: {"count": count, **({"game_lag": self.lag[name].to_dict()} if name in self.lag else {})}
+            for name, count in sorted(self.counts.items())
+        }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return 0
+
+
+def start_replay_server(recording: str, speed: float, port: int) -> subprocess.Popen:
+    """
+    リプレイサーバは別プロセスで動かして、CPU時間に混ざらないようにする。
+    """
+    server = subprocess.Popen(
+        [sys.executable, "mock.py", "--replay", recording, "--speed", str(speed), "--port", str(port), "--quiet"],
+        cwd=SRC_DIR, stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError("リプレイサーバが起動しなかったよ")
+
+
+async def run_pipeline(config_path: str, duration: float, obs: StubOBS, probe: DetectionProbe) -> dict:
+    request_count = 0
+    count_lock = threading.Lock()
+    original_get = LiveClientAPI.get
+
+    def counting_get(self, *args, **kwargs):
+        nonlocal request_count
+        with count_lock:
+            request_count += 1
+        return original_get(self, *args, **kwargs)
+
+    class ProbedDispatcher(EventDispatcher):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            for name in PROBED_EVENTS:
+                self.register(name, probe.for_event(name))
+
+    LiveClientAPI.get = counting_get
+    main.EventDispatcher = ProbedDispatcher
+    utils.config.CONFIG_FILE = config_path
+
+    rss_peak = 0
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    pipeline = asyncio.create_task(main.main_async())
+    try:
+        while time.perf_counter() - started < duration:
+            rss_peak = max(rss_peak, rss_bytes())
+            await asyncio.sleep(0.5)
+    finally:
+        pipeline.cancel()
+        await asyncio.gather(pipeline, return_exceptions=True)
+        await obs_client.default_targets.close()
+        LiveClientAPI.get = original_get
+        main.EventDispatcher = EventDispatcher
+    elapsed = time.perf_counter() - started
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (usage_after.ru_utime - usage_before.ru_utime) + (usage_after.ru_stime - usage_before.ru_stime)
+
+    return {
+        "wall_seconds": elapsed,
+        "http_requests": request_count,
+        "http_requests_per_sec": request_count / elapsed,
+        "cpu_seconds": cpu,
+        "cpu_percent": 100.0 * cpu / elapsed,
+        "rss_peak_bytes": rss_peak,
+        "max_rss_kb": usage_after.ru_maxrss,
+        "obs_requests": obs.requests,
+        "saves_issued": obs.saves,
+        "save_triggers": main.save_scheduler.requested,
+        "events": probe.to_dict(),
+        "metrics": metrics.snapshot(),
+    }
+
+
+async def bench(recording: str, speed: float, tail: float) -> dict:
+    reader = RecordingReader(recording)
+    game_seconds = reader.end - reader.start
+    duration = game_seconds / speed + tail
+
+    obs = StubOBS()
+    obs_port, live_port = free_port(), free_port()
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as work_dir:
+        config_path = os.path.join(work_dir, "config.json")
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "trigger_events": {name: True for name in (
+                    "ChampionKill", "Multikill", "PlayerDeath", "Ace", "DragonSteal", "BaronSteal",
+                    "Teambattle", "GoldSpike", "SoloBaron", "Comeback")},
+                # ゲーム内時刻で5秒後に保存される（再生速度はゲーム時計が吸収する）
+                "replay_delay": 5.0,
+                "live_client": {"base_url": f"http://127.0.0.1:{live_port}/liveclientdata"},
+                "obs": {"url": f"ws://127.0.0.1:{obs_port}", "password": ""},
+                "metrics_file": "",
+                "dispatcher": {"queue_size": 32, "concurrency": 4, "overflow": "drop_oldest"},
+            }, f)
+
+        async with websockets.serve(obs.handle, "127.0.0.1", obs_port):
+            server = start_replay_server(recording, speed, live_port)
+            try:
+                result = await run_pipeline(config_path, duration, obs, DetectionProbe())
+            finally:
+                server.terminate()
+                server.wait()
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "recording": os.path.basename(recording),
+        "game_seconds": game_seconds,
+        "speed": speed,
+        **result,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="記録したゲームでトリガーのパイプライン全体を測るベンチマーク")
+    parser.add_argument("--recording", help="dump.py で記録したファイル（省略時は合成したゲームを使う）")
+    parser.add_argument("--minutes", type=float, default=10.0, help="合成するゲームの長さ（分）")
+    parser.add_argument("--speed", type=float, default=20.0, help="再生の速さ（1〜50倍）")
+    parser.add_argument("--tail", type=float, default=3.0, help="再生が終わってから待つ秒数")
+    parser.add_argument("--output", default="bench_pipeline.json", help="結果のJSONファイル")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_recording_") as tmp:
+        recording = args.recording
+        if recording is None:
+            recording = os.path.join(tmp, "synthetic.jsonl.gz")
+            make_recording(recording, args.minutes)
+        result = asyncio.run(bench(os.path.abspath(recording), args.speed, args.tail))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print(f"ゲーム {result['game_seconds']:.0f}秒を {args.speed:g}倍速で {result['wall_seconds']:.1f}秒かけて再生したよ")
+    print(f"HTTP {result['http_requests']}件 ({result['http_requests_per_sec']:.1f} req/s)  "
+          f"CPU {result['cpu_percent']:.1f}%  RSS {result['rss_peak_bytes'] / 2**20:.1f}MiB  "
+          f"保存 {result['saves_issued']}回（トリガー {result['save_triggers']}件）")
+    for name, stats in result["events"].items():
+        lag = stats.get("game_lag")
+        detail = f"  遅れ p50 {lag['p50']}s / p95 {lag['p95']}s（ゲーム内）" if lag else ""
+        print(f"  {name:<20} {stats['count']:5d}件{detail}")
+    print(f"結果を {args.output} に書いたよ〜")
+
+
+if __name__ == "__main__":
+    main_cli()
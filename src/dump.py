@@ -1,16 +1,14 @@
-import requests
+import asyncio
 import time
-import json
-import zipfile
 import os
 import signal
-import sys
 import argparse
 from datetime import datetime
 from threading import Event
+from utils.recording import DeltaRecordingWriter, KEYFRAME_INTERVAL
+from lol_api.client import get_client
 
-# Live Client API のベースURLと対象エンドポイント
-API_BASE = "https://127.0.0.1:2999/liveclientdata"
+# 対象エンドポイント
 ENDPOINTS = [
     "allgamedata",
     "eventdata",
@@ -19,74 +17,93 @@ ENDPOINTS = [
     "activeplayerabilities"
 ]
 
+# 1秒あたりの取得回数（Hz）
+RATE = 4.0
+# 1リクエストのタイムアウト（秒）
+REQUEST_TIMEOUT = 1.0
+
 # 出力先ディレクトリ（引数でファイル指定しないとき用）
 DUMP_DIR = "debug_zips"
 os.makedirs(DUMP_DIR, exist_ok=True)
 
-# メモリ上のバッファと終了イベント
-BUFFER = {ep: [] for ep in ENDPOINTS}
+# 終了イベント
 stop_event = Event()
 
-def poll_once():
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+def default_output_path():
+    now = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(DUMP_DIR, f"dump_{now}.jsonl.gz")
+
+async def fetch_timed(client, ep):
+    """
+    1エンドポイントを取得して、(レスポンス, かかった秒数) を返す。失敗したら例外のまま返すよ。
+    """
+    started = time.perf_counter()
+    try:
+        data = await client.get_async(ep, timeout=REQUEST_TIMEOUT)
+    except Exception as e:
+        data = e
+    return data, time.perf_counter() - started
+
+async def poll_once(recorder, client=None, captured_at=None):
+    """
+    全エンドポイントを同時に取得して、同じティックのレコードとして recorder に書くよ。
+    """
+    client = client or get_client()
+    captured_at = time.time() if captured_at is None else captured_at
+    results = await asyncio.gather(*(fetch_timed(client, ep) for ep in ENDPOINTS))
+
     game_ended = False
-    for ep in ENDPOINTS:
-        try:
-            res = requests.get(f"{API_BASE}/{ep}", timeout=1.0)
-            res.raise_for_status()
-            data = res.json()
-            BUFFER[ep].append((timestamp, data))
-            if ep == "allgamedata":
-                game_ended = data.get("gameData", {}).get("gameEnded", False)
-        except Exception as e:
-            print(f"[ERROR] {ep}: {e}")
+    for ep, (data, latency) in zip(ENDPOINTS, results):
+        if isinstance(data, Exception):
+            print(f"[ERROR] {ep}: {data}")
+            continue
+        recorder.write(ep, data, captured_at, latency=round(latency, 4))
+        if ep == "allgamedata":
+            game_ended = data.get("gameData", {}).get("gameEnded", False)
     if game_ended:
         print("[INFO] ゲーム終了を検知しました。終了処理を行います。")
         stop_event.set()
 
-def dump_zip(output_path=None):
-    if all(len(entries) == 0 for entries in BUFFER.values()):
-        print("[INFO] バッファ空なので保存スキップ")
-        return
-
-    if output_path is None:
-        now = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_path = os.path.join(DUMP_DIR, f"dump_{now}.zip")
-
-    with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for ep, entries in BUFFER.items():
-            for ts, data in entries:
-                zipf.writestr(f"{ep}/{ts}.json", json.dumps(data, indent=2))
-    print(f"[OK] ZIP保存完了: {output_path}")
-
-    for ep in BUFFER:
-        BUFFER[ep] = []
-
-def handle_exit(output_path=None, *args):
-    print("\n[INFO] 終了検知: 最後のZIP保存処理を開始します")
-    dump_zip(output_path)
+def handle_exit(*args):
+    print("\n[INFO] 終了検知: 記録を閉じます")
     stop_event.set()
 
 def parse_args():
     parser = argparse.ArgumentParser(description="LoL LiveClientData ダンパ")
-    parser.add_argument("output", nargs="?", help="保存先ZIPファイル名（省略時は自動）")
+    parser.add_argument("output", nargs="?", help="保存先ファイル名（.jsonl.gz、省略時は自動）")
+    parser.add_argument("--rate", type=float, default=RATE, help="1秒に何回取得するか（Hz）")
+    parser.add_argument("--keyframe-interval", type=float, default=KEYFRAME_INTERVAL,
+                        help="丸ごとのレコードを書く間隔（秒）")
     return parser.parse_args()
 
-def main_loop(output_path=None):
-    start = time.time()
+async def main_loop(output_path=None, rate=RATE, keyframe_interval=KEYFRAME_INTERVAL):
+    output_path = output_path or default_output_path()
+    # 前回との差分だけを書いて、ときどき丸ごとのキーフレームを挟むよ
+    recorder = DeltaRecordingWriter(output_path, keyframe_interval=keyframe_interval)
+    period = 1.0 / rate
+    # ティックの予定時刻は monotonic で決めて、取得にかかった時間の分ずれていかないようにする
+    start_mono = time.monotonic()
+    tick = 0
+    missed = 0
     try:
         while not stop_event.is_set():
-            poll_once()
-            time.sleep(1)
-            if time.time() - start >= 10:
-                dump_zip(output_path)
-                start = time.time()
+            await poll_once(recorder)
+            tick += 1
+            delay = start_mono + tick * period - time.monotonic()
+            if delay < 0:
+                # 間に合わなかったティックは詰め込まずに飛ばす
+                skipped = int(-delay // period) + 1
+                missed += skipped
+                tick += skipped
+                delay += skipped * period
+            await asyncio.sleep(delay)
     finally:
-        handle_exit(output_path)
+        recorder.close()
+        print(f"[OK] 記録完了: {output_path}（{recorder.records}件、間に合わなかったティック {missed}回）")
 
 if __name__ == "__main__":
     args = parse_args()
-    signal.signal(signal.SIGINT, lambda s, f: handle_exit(args.output))
-    signal.signal(signal.SIGTERM, lambda s, f: handle_exit(args.output))
-    print("[INFO] LoLダンプ開始。Ctrl+Cで終了できます")
-    main_loop(args.output)
+    signal.signal(signal.SIGINT, handle_exit)
+    signal.signal(signal.SIGTERM, handle_exit)
+    print(f"[INFO] LoLダンプ開始（{args.rate}Hz）。Ctrl+Cで終了できます")
+    asyncio.run(main_loop(args.output, args.rate, args.keyframe_interval))
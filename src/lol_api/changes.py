@@ -0,0 +1,198 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional
+from utils.event_dispatcher import EventDispatcher
+from utils.event_types import ChangeEventType
+from utils.metrics import TRACE_KEY, LatencyTrace
+from lol_api.fetcher import LiveClientSnapshot
+from lol_api.models import GameState, PlayerState
+
+# ゴールドが1ティックでこれだけ増えたら
+GOLD_SWING = 500.0
+# この値段以上のアイテムが増えたら完成したとみなす
+ITEM_MIN_PRICE = 2500
+
+
+class ChangeWatcher(ABC):
+    """
+    allgamedata の1項目を見張るもののひな形。
+    read で今の値を {プレイヤー名: 値} で取り出して、compare で前のティックの値と比べるよ。
+    変化があればイベントの中身（dict）を、なければ None を返してね。
+    どちらかを書き忘れると、最初のティックじゃなくて作ったときに TypeError になるよ。
+    """
+    event_type: ChangeEventType
+
+    @abstractmethod
+    def read(self, game: GameState) -> Dict[str, object]:
+        ...
+
+    @abstractmethod
+    def compare(self, previous, current) -> Optional[dict]:
+        ...
+
+
+class PlayerChangeWatcher(ChangeWatcher):
+    """
+    allPlayers の全員について、value で取り出した値を見張るもののひな形。
+    """
+    def read(self, game: GameState) -> Dict[str, object]:
+        return {p.name: self.value(p) for p in game.players}
+
+    @abstractmethod
+    def value(self, player: PlayerState):
+        ...
+
+
+class LevelUpWatcher(PlayerChangeWatcher):
+    event_type = ChangeEventType.LEVEL_UP
+
+    def value(self, player: PlayerState) -> int:
+        return player.level
+
+    def compare(self, previous: int, current: int) -> Optional[dict]:
+        if current <= previous:
+            return None
+        return {"Level": current, "Previous": previous}
+
+
+class ItemCompletedWatcher(PlayerChangeWatcher):
+    """
+    min_price 以上のアイテムが新しく増えたら出すよ。素材は値段で足切りする。
+    """
+    event_type = ChangeEventType.ITEM_COMPLETED
+
+    def __init__(self, min_price: int = ITEM_MIN_PRICE):
+        self.min_price = min_price
+
+    def value(self, player: PlayerState) -> frozenset:
+        return frozenset(i for i, price in zip(player.items, player.item_prices) if price >= self.min_price)
+
+    def compare(self, previous: frozenset, current: frozenset) -> Optional[dict]:
+        completed = current - previous
+        if not completed:
+            return None
+        return {"ItemIDs": sorted(completed)}
+
+
+class DeathTimerWatcher(PlayerChangeWatcher):
+    """
+    復活までの時間が増えたら（＝デスしたら）出すよ。死んでいる間に減っていくのは無視。
+    """
+    event_type = ChangeEventType.DEATH_TIMER
+
+    def value(self, player: PlayerState) -> float:
+        return player.respawn_timer if player.is_dead else 0.0
+
+    def compare(self, previous: float, current: float) -> Optional[dict]:
+        if current <= previous:
+            return None
+        return {"RespawnTimer": current, "Previous": previous}
+
+
+class KillScoreWatcher(PlayerChangeWatcher):
+    event_type = ChangeEventType.KILL_SCORE
+
+    def value(self, player: PlayerState) -> tuple:
+        return player.kills, player.deaths, player.assists
+
+    def compare(self, previous: tuple, current: tuple) -> Optional[dict]:
+        if current == previous:
+            return None
+        kills, deaths, assists = current
+        return {
+            "Kills": kills, "Deaths": deaths, "Assists": assists,
+            "Delta": {"kills": kills - previous[0], "deaths": deaths - previous[1], "assists": assists - previous[2]},
+        }
+
+
+class GoldSwingWatcher(ChangeWatcher):
+    """
+    ゴールドは自分の分しかAPIに出てこないので、自分だけを見るよ。
+    1ティックで threshold 以上増えたときだけ出す。減ったのはほとんど買い物なので無視するよ。
+    """
+    event_type = ChangeEventType.GOLD_SWING
+
+    def __init__(self, threshold: float = GOLD_SWING):
+        self.threshold = threshold
+
+    def read(self, game: GameState) -> Dict[str, object]:
+        me = game.active_player
+        return {me.name: me.gold} if me.name else {}
+
+    def compare(self, previous: float, current: float) -> Optional[dict]:
+        if current - previous < self.threshold:
+            return None
+        return {"Gold": current, "Delta": current - previous}
+
+
+class StateChangePoller:
+    """
+    allgamedata を前のティックと比べて、変化イベントを dispatch するよ。
+    誰も購読していない項目は読みもしないので、ハンドラが少なければ1ティックの手間も少ない。
+    """
+    # このポーラーが必要とするエンドポイント
+    endpoints = ("allgamedata",)
+
+    def __init__(self, dispatcher: EventDispatcher, watchers: Iterable[ChangeWatcher]):
+        self.dispatcher = dispatcher
+        self.watchers: List[ChangeWatcher] = list(watchers)
+        # 項目ごとの {プレイヤー名: 前のティックの値}
+        self._previous: Dict[ChangeEventType, Dict[str, object]] = {}
+
+    @classmethod
+    def from_config(cls, dispatcher: EventDispatcher, config: dict) -> "StateChangePoller":
+        """
+        config.json の "changes" セクションから作る。
+        """
+        changes = config.get("changes", {})
+        return cls(dispatcher, [
+            LevelUpWatcher(),
+            ItemCompletedWatcher(min_price=changes.get("item_min_price", ITEM_MIN_PRICE)),
+            DeathTimerWatcher(),
+            KillScoreWatcher(),
+            GoldSwingWatcher(threshold=changes.get("gold_swing", GOLD_SWING)),
+        ])
+
+    def reset(self) -> None:
+        """
+        新しいゲームでは前の値を全部忘れる。
+        """
+        self._previous.clear()
+
+    def active_watchers(self) -> List[ChangeWatcher]:
+        """
+        いま購読されている変化イベントの見張りだけ。
+        """
+        return [w for w in self.watchers if self.dispatcher.subscriptions_for(w.event_type)]
+
+    async def handle_snapshot(self, snapshot: LiveClientSnapshot) -> None:
+        watchers = self.active_watchers()
+        # 購読が外れた項目は前の値も捨てる（また購読されたら取り直してから比べる）
+        active = {w.event_type for w in watchers}
+        for event_type in [t for t in self._previous if t not in active]:
+            del self._previous[event_type]
+        if not watchers:
+            return
+
+        game = snapshot.game().unwrap()
+        for watcher in watchers:
+            current = watcher.read(game)
+            previous = self._previous.get(watcher.event_type)
+            self._previous[watcher.event_type] = current
+            if previous is None:
+                continue
+
+            for name, value in current.items():
+                if name not in previous:
+                    continue
+                change = watcher.compare(previous[name], value)
+                if change is None:
+                    continue
+                event_name = watcher.event_type.value
+                event = {
+                    "EventName": event_name,
+                    "EventTime": game.game_time,
+                    "PlayerName": name,
+                    **change,
+                    TRACE_KEY: LatencyTrace(event_name, snapshot.fetched_at),
+                }
+                await self.dispatcher.dispatch(watcher.event_type, event)
@@ -0,0 +1,115 @@
+import asyncio
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from requests.adapters import HTTPAdapter
+import urllib3
+from utils.json_codec import loads
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+LIVE_CLIENT_BASE_URL = "https://127.0.0.1:2999/liveclientdata"
+# 同時に張っておくkeep-alive接続の数（＝同時リクエスト数の上限）
+POOL_SIZE = 8
+# リクエストのタイムアウト（秒）
+REQUEST_TIMEOUT = 2.0
+
+
+class LiveClientAPI:
+    """
+    Live Client API用の共有HTTPクライアント。
+    keep-aliveの接続プールを使い回すから、毎回TCP+TLSのハンドシェイクをしなくて済むよ！
+
+    Attributes:
+        base_url (str): "https://127.0.0.1:2999/liveclientdata" みたいなベースURL。
+        session (requests.Session): 接続プールを持っているセッション。
+    """
+    def __init__(self, base_url: str = LIVE_CLIENT_BASE_URL, pool_size: int = POOL_SIZE,
+                 timeout: float = REQUEST_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.verify = False
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # セッションを使うスレッドはこのプール専用にしておく
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="live-client")
+
+    def get(self, endpoint: str, params: Optional[dict] = None, timeout: Optional[float] = None) -> dict:
+        """
+        エンドポイントをGETしてデコード済みのJSONを返す（ブロッキング）。
+
+        Raises:
+            requests.RequestException: 通信エラーやステータスエラーの場合。
+        """
+        response = self.session.get(
+            f"{self.base_url}/{endpoint}",
+            params=params,
+            timeout=timeout or self.timeout
+        )
+        response.raise_for_status()
+        # 速いデコーダに bytes のまま渡す
+        return loads(response.content)
+
+    async def get_async(self, endpoint: str, params: Optional[dict] = None,
+                        timeout: Optional[float] = None) -> dict:
+        """
+        get() を専用スレッドプールで実行する非同期版。
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: self.get(endpoint, params, timeout))
+
+    def is_running(self) -> bool:
+        """
+        /gamestats が200を返すかでLoLクライアントが起動しているか判定する。
+        """
+        try:
+            res = self.session.get(f"{self.base_url}/gamestats", timeout=1)
+            return res.status_code == 200
+        except Exception:
+            return False
+
+    async def is_running_async(self) -> bool:
+        """
+        is_running() をイベントループを止めずに実行する非同期版。
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.is_running)
+
+    def close(self) -> None:
+        self.session.close()
+        self._executor.shutdown(wait=False)
+
+
+_default_client: Optional[LiveClientAPI] = None
+
+
+def get_client() -> LiveClientAPI:
+    """
+    プロセス全体で共有するLiveClientAPIを返す。
+    """
+    global _default_client
+    if _default_client is None:
+        _default_client = LiveClientAPI()
+    return _default_client
+
+
+def configure_client(config: dict) -> LiveClientAPI:
+    """
+    config.json の "live_client" セクションで共有クライアントを作り直す。
+    リプレイ用のモックサーバに向けたいときなどに使うよ。
+    """
+    global _default_client
+    live_client = config.get("live_client", {})
+    if _default_client is not None:
+        _default_client.close()
+    _default_client = LiveClientAPI(
+        base_url=live_client.get("base_url", LIVE_CLIENT_BASE_URL),
+        pool_size=live_client.get("pool_size", POOL_SIZE),
+        timeout=live_client.get("timeout", REQUEST_TIMEOUT),
+    )
+    return _default_client
+
+
+def is_lol_client_running() -> bool:
+    return get_client().is_running()
@@ -0,0 +1,173 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+from utils.event_types import CustomEventType
+from lol_api.models import GameState
+from lol_api.teamfight import TeamFightDetector, TeamFightScoring, MIN_SAMPLE_INTERVAL
+
+# ゴールドスパイク: この秒数（ゲーム内時間）の間にこれだけ稼いだら
+GOLD_SPIKE_WINDOW = 10.0
+GOLD_SPIKE_THRESHOLD = 1000.0
+# カムバック: キル数でこれだけ負けていたチームが追いついたら
+COMEBACK_DEFICIT = 5
+
+
+class Detector(ABC):
+    """
+    カスタムイベントの検知器のひな形。
+    共有スナップショットの GameState を1ティックずつ受け取って、自分の状態を少しずつ更新するよ。
+    検知したらイベントの中身（dict）を、何もなければ None を返してね。
+    update を書き忘れると、最初のティックじゃなくて作ったときに TypeError になるよ。
+    """
+    event_type: CustomEventType
+
+    def reset(self) -> None:
+        """
+        新しいゲーム用に状態を捨てる。
+        """
+
+    @abstractmethod
+    def update(self, game: GameState) -> Optional[dict]:
+        ...
+
+
+class TeamFightEventDetector(Detector):
+    """
+    集団戦。TeamFightDetector が集団戦っぽいと言い始めたティックで1回だけ出すよ。
+    """
+    event_type = CustomEventType.TEAM_FIGHT
+
+    def __init__(self, scoring: Optional[TeamFightScoring] = None, min_interval: float = MIN_SAMPLE_INTERVAL):
+        self.detector = TeamFightDetector(scoring, min_interval=min_interval)
+        self._active = False
+
+    def reset(self) -> None:
+        self.detector.reset()
+        self._active = False
+
+    def update(self, game: GameState) -> Optional[dict]:
+        is_team_fight = self.detector.update(game.players, game.game_time)
+        started = is_team_fight and not self._active
+        self._active = is_team_fight
+        if not started:
+            return None
+        return {
+            "HealthChangeRatio": self.detector.health_change_ratio,
+            "WindowDeaths": self.detector.window_deaths,
+        }
+
+
+class GoldSpikeDetector(Detector):
+    """
+    ゴールドスパイク。自分が window 秒の間に threshold 以上稼いだら出すよ。
+    買い物で減った分は数えないで、増えた分だけを足していく。
+    """
+    event_type = CustomEventType.GOLD_SPIKE
+
+    def __init__(self, window: float = GOLD_SPIKE_WINDOW, threshold: float = GOLD_SPIKE_THRESHOLD):
+        self.window = window
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self) -> None:
+        self._last_gold: Optional[float] = None
+        # (ゲーム内時刻, そのティックで増えた分)
+        self._gains: Deque[Tuple[float, float]] = deque()
+        self._earned = 0.0
+
+    def update(self, game: GameState) -> Optional[dict]:
+        gold = game.active_player.gold
+        last, self._last_gold = self._last_gold, gold
+        if last is not None and gold > last:
+            self._gains.append((game.game_time, gold - last))
+            self._earned += gold - last
+        while self._gains and self._gains[0][0] <= game.game_time - self.window:
+            self._earned -= self._gains.popleft()[1]
+
+        if self._earned < self.threshold:
+            return None
+        earned = self._earned
+        # 同じ稼ぎで何度も出さないように、数え直す
+        self._gains.clear()
+        self._earned = 0.0
+        return {"GoldEarned": earned, "Window": self.window}
+
+
+class SoloBaronDetector(Detector):
+    """
+    ソロバロン。自分がアシストなしでバロンを倒したら出すよ。
+    前のティックから増えたイベントだけを見る。
+    """
+    event_type = CustomEventType.SOLO_BARAM
+
+    def __init__(self):
+        self._events_seen = 0
+
+    def reset(self) -> None:
+        self._events_seen = 0
+
+    def update(self, game: GameState) -> Optional[dict]:
+        if game.event_count < self._events_seen:
+            self._events_seen = 0
+        new_events = game.events_from(self._events_seen)
+        self._events_seen = game.event_count
+
+        names = game.active_player.names
+        for event in new_events:
+            if event.name == "BaronKill" and event.killer in names and not event.assisters:
+                return {"EventID": event.event_id, "EventTime": event.time, "KillerName": event.killer}
+        return None
+
+
+class ComebackDetector(Detector):
+    """
+    カムバック。自分のチームがキル数で deficit 以上負けていたところから追いついたら出すよ。
+    一度出したら、また deficit 以上離されるまでは出さない。
+    """
+    event_type = CustomEventType.COMEBACK
+
+    def __init__(self, deficit: int = COMEBACK_DEFICIT):
+        self.deficit = deficit
+        self.reset()
+
+    def reset(self) -> None:
+        self._max_deficit = 0
+
+    def update(self, game: GameState) -> Optional[dict]:
+        me = game.active_player_state()
+        if me is None:
+            return None
+        kills: Dict[str, int] = {}
+        for p in game.players:
+            kills[p.team] = kills.get(p.team, 0) + p.kills
+        ours = kills.get(me.team, 0)
+        theirs = sum(v for team, v in kills.items() if team != me.team)
+
+        self._max_deficit = max(self._max_deficit, theirs - ours)
+        if self._max_deficit < self.deficit or ours < theirs:
+            return None
+        deficit = self._max_deficit
+        self._max_deficit = 0
+        return {"MaxDeficit": deficit, "Kills": {"ours": ours, "theirs": theirs}}
+
+
+def detectors_from_config(config: dict):
+    """
+    config.json の "team_fight" と "detectors" セクションから検知器を全部作る。
+    集団戦の履歴の列数は "polling" の min_interval から決めるよ。
+    """
+    detectors = config.get("detectors", {})
+    gold_spike = detectors.get("gold_spike", {})
+    comeback = detectors.get("comeback", {})
+    return [
+        TeamFightEventDetector(
+            TeamFightScoring.from_config(config),
+            min_interval=config.get("polling", {}).get("min_interval", MIN_SAMPLE_INTERVAL),
+        ),
+        GoldSpikeDetector(
+            window=gold_spike.get("window", GOLD_SPIKE_WINDOW),
+            threshold=gold_spike.get("threshold", GOLD_SPIKE_THRESHOLD),
+        ),
+        SoloBaronDetector(),
+        ComebackDetector(deficit=comeback.get("deficit", COMEBACK_DEFICIT)),
+    ]
@@ -1,78 +1,111 @@
-import requests
-import asyncio
-from typing import Callable, Dict, List, Awaitable
+from typing import Optional
 from utils.logger import logger
 from utils.event_types import EventType  # 列挙型をインポート
 from utils.event_dispatcher import EventDispatcher
-import urllib3
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from utils.metrics import LatencyTrace, TRACE_KEY
+from lol_api.fetcher import LiveClientSnapshot
+from lol_api.scheduler import AdaptivePollScheduler
 
-EVENT_API_URL = "https://127.0.0.1:2999/liveclientdata/eventdata"
 
-def is_lol_client_running() -> bool:
-    try:
-        res = requests.get("https://127.0.0.1:2999/liveclientdata/gamestats", verify=False, timeout=1)
-        return res.status_code == 200
-    except:
-        return False
+class EventPollStats:
+    """
+    イベントポーリングのカウンタ。
+
+    Attributes:
+        received (int): 直近のポーリングで受け取ったイベント数。
+        seen (int): そのうち新しかったイベント数。
+        skipped (int): 新しかったけど未定義で無視したイベント数。
+        dispatched (int): dispatcherに渡したイベント数。
+        total_seen (int): 起動してからの seen の合計。
+        total_skipped (int): 起動してからの skipped の合計。
+        total_dispatched (int): 起動してからの dispatched の合計。
+    """
+    def __init__(self):
+        self.received = 0
+        self.seen = 0
+        self.skipped = 0
+        self.dispatched = 0
+        self.total_seen = 0
+        self.total_skipped = 0
+        self.total_dispatched = 0
+
+    def begin_poll(self, received: int) -> None:
+        self.received = received
+        self.seen = 0
+        self.skipped = 0
+        self.dispatched = 0
+
+    def end_poll(self) -> None:
+        self.total_seen += self.seen
+        self.total_skipped += self.skipped
+        self.total_dispatched += self.dispatched
 
 
 class LLEventPoller:
-    def __init__(self, dispatcher: EventDispatcher):
+    # このポーラーが必要とするエンドポイント
+    endpoints = ("eventdata",)
+
+    def __init__(self, dispatcher: EventDispatcher, scheduler: Optional[AdaptivePollScheduler] = None):
         self.dispatcher = dispatcher
-        self._stop_event = asyncio.Event()
+        self.scheduler = scheduler
+        self.stats = EventPollStats()
+        self._last_event_id = -1
 
-    async def poll_events_async(self) -> None:
+    def query_params(self) -> dict:
         """
-        LoLのイベントAPIをポーリングして、新しいイベントをdispatcherに渡すよ！
+        /eventdata に付けるクエリ。eventID以降のイベントだけ返してもらうよ。
         """
-        last_client_state = None  # ← 最初は未確認状態としておく
-        last_event_id = -1
-        logger.info("🎯 LLEventPollerが起動したよ〜！")
-
-        while not self._stop_event.is_set():
-            is_running = is_lol_client_running()
-
-            # 最初 or 状態変化時にログを出す！
-            if is_running != last_client_state:
-                if not is_running:
-                    logger.debug("LoLクライアントが起動してないみたい、ちょっと待つね〜")
-                else:
-                    logger.info("LoLクライアントを見つけたよ！ポーリング再開するね〜")
-                last_client_state = is_running
-
-            if not is_running:
-                await asyncio.sleep(1)
-                continue
+        return {"eventID": self._last_event_id + 1}
 
-            # LoLクライアントが起動している場合、イベントAPIをポーリングするよ！
-            logger.debug("LoLクライアントが起動してるから、イベントAPIをポーリングするよ〜")
-            try:
-                loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(None, lambda: requests.get(EVENT_API_URL, verify=False, timeout=2))
-                response.raise_for_status()
-                events_data = response.json()
-                new_events = events_data.get("Events", [])
+    def reset(self) -> None:
+        """
+        新しいゲームが始まったらイベントIDのカーソルを巻き戻すよ。
+        """
+        self._last_event_id = -1
 
-                for event in new_events:
-                    if event["EventID"] > last_event_id:
-                        last_event_id = event["EventID"]
+    async def handle_snapshot(self, snapshot: LiveClientSnapshot) -> None:
+        """
+        スナップショットのイベント一覧から新しいイベントだけをdispatcherに渡すよ！
+        eventIDクエリが効いていれば新しいイベントしか来ないけど、
+        効いていない場合に備えて末尾から新しい分だけを切り出すよ。
+        """
+        events_data = snapshot.get("eventdata").unwrap()
+        events = events_data.get("Events", [])
+        # 同じティックのallgamedataがあれば、イベント発生から取得までの遅れも測れる
+        game_time = snapshot.get("allgamedata").unwrap_or({}).get("gameData", {}).get("gameTime")
+        # Live Client のイベントにはチームが載っていないので、allPlayers から KillerTeam を付ける
+        game = snapshot.game()
+        teams = game.unwrap().player_teams() if game.is_some() else {}
+        self.stats.begin_poll(len(events))
 
-                        try:
-                            event_type = EventType(event["EventName"])
-                        except ValueError:
-                            logger.debug(f"未定義のイベント: {event['EventName']} は無視するね〜")
-                            continue
+        start = len(events)
+        while start > 0 and events[start - 1]["EventID"] > self._last_event_id:
+            start -= 1
 
-                        await self.dispatcher.dispatch(event_type, event)
+        for event in events[start:]:
+            self._last_event_id = event["EventID"]
+            self.stats.seen += 1
+            if self.scheduler:
+                self.scheduler.note_event(event["EventName"])
 
-            except Exception as e:
-                logger.warning(f"⚠️ LoLイベントポーリング失敗: {e}")
+            try:
+                event_type = EventType(event["EventName"])
+            except ValueError:
+                logger.debug(f"未定義のイベント: {event['EventName']} は無視するね〜")
+                self.stats.skipped += 1
+                continue
 
-            await asyncio.sleep(1)
+            killer_team = teams.get(event.get("KillerName"))
+            if killer_team is not None:
+                event.setdefault("KillerTeam", killer_team)
+            game_lag = game_time - event.get("EventTime", game_time) if game_time is not None else 0.0
+            event[TRACE_KEY] = LatencyTrace(event["EventName"], snapshot.fetched_at, game_lag)
+            await self.dispatcher.dispatch(event_type, event)
+            self.stats.dispatched += 1
 
-    def stop(self):
-        """
-        ポーリングを止めるよ！
-        """
-        self._stop_event.set()
\ No newline at end of file
+        self.stats.end_poll()
+        if self.stats.seen:
+            logger.debug(
+                f"イベント受信 {self.stats.received}件 / 新規 {self.stats.seen}件 / "
+                f"無視 {self.stats.skipped}件 / 配信 {self.stats.dispatched}件"
+            )
@@ -0,0 +1,233 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from utils.logger import logger
+from utils.option import Option, Some, None_
+from lol_api.client import LiveClientAPI, get_client
+from lol_api.liveness import ClientLiveness
+from lol_api.models import GameState
+
+# ポーリング間隔（秒）
+POLL_INTERVAL = 1.0
+# gameTime がこれ以上戻ったら新しいゲームとみなす（秒）
+GAME_TIME_REWIND = 1.0
+
+
+class LiveClientSnapshot:
+    """
+    1ティック分のLive Client APIのレスポンスをまとめたもの。
+    同じティックの購読者には全員同じインスタンスが渡されるよ！
+
+    Attributes:
+        tick (int): 何回目のティックか。
+        errors (Dict[str, str]): 取得に失敗したエンドポイントとエラー内容。
+        fetched_at (float): 取得し終わった時刻（time.monotonic）。
+    """
+    def __init__(self, tick: int, data: Dict[str, dict], errors: Dict[str, str],
+                 fetched_at: Optional[float] = None):
+        self.tick = tick
+        self.errors = errors
+        self.fetched_at = time.monotonic() if fetched_at is None else fetched_at
+        self._data = data
+        self._game: Optional[GameState] = None
+
+    def get(self, endpoint: str) -> Option[dict]:
+        """
+        エンドポイントのデコード済みレスポンスを取り出す。
+
+        Args:
+            endpoint (str): "allgamedata" などのエンドポイント名。
+
+        Returns:
+            Option[dict]: 取得できていればSome、失敗していればNone。
+        """
+        if endpoint in self._data:
+            return Some(self._data[endpoint])
+        return None_()
+
+    def game(self) -> Option[GameState]:
+        """
+        allgamedata を検知用の型に詰め直したもの。最初に呼ばれたときに1回だけ作って、
+        同じティックの購読者みんなで使い回すよ。
+        """
+        if self._game is None:
+            if "allgamedata" not in self._data:
+                return None_()
+            self._game = GameState.from_dict(self._data["allgamedata"])
+        return Some(self._game)
+
+    def has(self, endpoints: Iterable[str]) -> bool:
+        """
+        指定したエンドポイントが全部取得できているかどうか。
+        """
+        return all(ep in self._data for ep in endpoints)
+
+
+SnapshotHandler = Callable[[LiveClientSnapshot], Awaitable[None]]
+ParamsProvider = Callable[[], dict]
+
+
+class LiveClientFetcher:
+    """
+    Live Client APIを1ティックにつき各エンドポイント1回だけ取得して、
+    デコード済みのスナップショットを購読者全員に配るよ！
+    """
+    def __init__(self, client: Optional[LiveClientAPI] = None, interval: float = POLL_INTERVAL,
+                 liveness: Optional[ClientLiveness] = None,
+                 interval_provider: Optional[Callable[[], float]] = None):
+        self.client = client or get_client()
+        self.interval = interval
+        # 毎ティック次の間隔を決める関数（AdaptivePollScheduler.next_interval など）
+        self.interval_provider = interval_provider
+        self.liveness = liveness or ClientLiveness()
+        self._subscribers: List[Tuple[Tuple[str, ...], SnapshotHandler]] = []
+        self._endpoints: List[str] = []
+        self._params: Dict[str, ParamsProvider] = {}
+        self._reset_callbacks: List[Callable[[], None]] = []
+        self._down_callbacks: List[Callable[[], None]] = []
+        # 新しいゲームかどうかを見分けるための、前のスナップショットの gameTime とイベント数
+        self._last_game_time: Optional[float] = None
+        self._last_event_count = 0
+        self._tick = 0
+        self._stop_event = asyncio.Event()
+
+    @property
+    def endpoints(self) -> List[str]:
+        return list(self._endpoints)
+
+    def subscribe(self, endpoints: Iterable[str], handler: SnapshotHandler,
+                  params: Optional[Dict[str, ParamsProvider]] = None,
+                  on_reset: Optional[Callable[[], None]] = None,
+                  on_down: Optional[Callable[[], None]] = None) -> None:
+        """
+        スナップショットの購読者を登録する。
+        指定したエンドポイントが全部取れたティックでだけハンドラが呼ばれるよ。
+
+        Args:
+            endpoints (Iterable[str]): 必要なエンドポイント。
+            handler (SnapshotHandler): スナップショットを受け取る非同期関数。
+            params (Dict[str, ParamsProvider]): エンドポイントごとのクエリを毎ティック返す関数。
+            on_reset (Callable[[], None]): 新しいゲームになったと分かったときに呼ばれる関数。
+            on_down (Callable[[], None]): クライアントが応答しなくなったときに呼ばれる関数。
+                クラッシュやリメイクでは GameEnd が来ないので、後片付けはこっちでやってね。
+        """
+        endpoints = tuple(endpoints)
+        for ep in endpoints:
+            if ep not in self._endpoints:
+                self._endpoints.append(ep)
+        self._subscribers.append((endpoints, handler))
+        if params:
+            self._params.update(params)
+        if on_reset:
+            self._reset_callbacks.append(on_reset)
+        if on_down:
+            self._down_callbacks.append(on_down)
+
+    async def fetch_once(self) -> LiveClientSnapshot:
+        """
+        購読されている全エンドポイントを並列で1回ずつ取得する。
+        """
+        results = await asyncio.gather(
+            *(self.client.get_async(ep, self._params[ep]() if ep in self._params else None)
+              for ep in self._endpoints),
+            return_exceptions=True
+        )
+
+        data: Dict[str, dict] = {}
+        errors: Dict[str, str] = {}
+        for ep, result in zip(self._endpoints, results):
+            if isinstance(result, Exception):
+                errors[ep] = str(result)
+            else:
+                data[ep] = result
+
+        self._tick += 1
+        return LiveClientSnapshot(self._tick, data, errors)
+
+    async def publish(self, snapshot: LiveClientSnapshot) -> None:
+        """
+        スナップショットを購読者に配る。1人が失敗しても他の人には届けるよ。
+        """
+        for endpoints, handler in self._subscribers:
+            if not snapshot.has(endpoints):
+                continue
+            try:
+                await handler(snapshot)
+            except Exception as e:
+                logger.warning(f"⚠️ スナップショットの処理に失敗したよ: {e}")
+
+    async def run(self) -> None:
+        """
+        LoLクライアントが起動している間、スナップショットを取得して配り続けるよ！
+        起動しているかどうかはデータ取得の結果で判断して、止まっている間だけプローブするよ。
+        """
+        logger.info("🎯 LiveClientFetcherが起動したよ〜！")
+
+        while not self._stop_event.is_set():
+            if not self.liveness.is_up():
+                await self._probe()
+                continue
+
+            snapshot = await self.fetch_once()
+            if snapshot.errors and len(snapshot.errors) == len(self._endpoints):
+                self._update_liveness(False)
+            else:
+                self._update_liveness(True)
+                for ep, error in snapshot.errors.items():
+                    logger.warning(f"⚠️ {ep} の取得に失敗したよ: {error}")
+                if self.is_new_game(snapshot):
+                    self.reset_subscribers()
+                await self.publish(snapshot)
+
+            await asyncio.sleep(self.interval_provider() if self.interval_provider else self.interval)
+
+    async def _probe(self) -> None:
+        """
+        クライアントが止まっている間のプローブ。失敗するたびに間隔が伸びるよ。
+        """
+        is_running = await self.client.is_running_async()
+        self._update_liveness(is_running)
+        if not is_running:
+            await asyncio.sleep(self.liveness.probe_interval)
+
+    def _update_liveness(self, is_running: bool) -> None:
+        changed = self.liveness.record_success() if is_running else self.liveness.record_failure()
+
+        # 最初 or 状態変化時にログを出す！
+        if changed:
+            if not is_running:
+                logger.debug("LoLクライアントが起動してないみたい、ちょっと待つね〜")
+                for callback in self._down_callbacks:
+                    callback()
+            else:
+                logger.info("LoLクライアントを見つけたよ！ポーリング再開するね〜")
+
+    def is_new_game(self, snapshot: LiveClientSnapshot) -> bool:
+        """
+        前のスナップショットから別のゲームに変わったかどうか。
+        クライアントが一瞬応答しなかっただけなら同じゲームのままだよ。
+        gameTime が巻き戻るか、イベントの数が減ったら新しいゲームとみなす（allgamedata のティックだけで判定）。
+        """
+        game = snapshot.game()
+        if game.is_none():
+            return False
+        game = game.unwrap()
+        last_game_time, last_event_count = self._last_game_time, self._last_event_count
+        self._last_game_time, self._last_event_count = game.game_time, game.event_count
+        if last_game_time is None:
+            return False
+        return game.game_time < last_game_time - GAME_TIME_REWIND or game.event_count < last_event_count
+
+    def reset_subscribers(self) -> None:
+        """
+        新しいゲームになったので購読者の状態を巻き戻す。
+        """
+        logger.info("🆕 新しいゲームが始まったみたい、状態をリセットするね〜")
+        for callback in self._reset_callbacks:
+            callback()
+
+    def stop(self):
+        """
+        ポーリングを止めるよ！
+        """
+        self._stop_event.set()
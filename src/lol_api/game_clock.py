@@ -0,0 +1,103 @@
+from collections import deque
+from typing import Deque, Tuple
+from utils.option import Option, Some, None_
+from utils.logger import logger
+from lol_api.fetcher import LiveClientSnapshot
+
+# 直線を当てはめるのに使う直近のサンプル数
+WINDOW = 30
+# これだけサンプルが集まるまでは、ずれても取り直さない（傾きがまだ当てにならない）
+MIN_SAMPLES = 5
+# 当てはめた直線からこれ以上ずれたら、一時停止や巻き戻しとみなして取り直す（秒）
+MAX_RESIDUAL = 1.0
+
+
+class GameClock:
+    """
+    gameData.gameTime と time.monotonic の対応を覚えておく時計。
+    直近のサンプルに gameTime = offset + drift * monotonic の直線を最小二乗で当てはめるので、
+    ポーリングのばらつきがあっても「ゲーム内のこの時刻は手元の時計でいつか」が分かるよ。
+    """
+    # このポーラーが必要とするエンドポイント
+    endpoints = ("allgamedata",)
+
+    def __init__(self, window: int = WINDOW, max_residual: float = MAX_RESIDUAL):
+        self.window = max(window, 2)
+        self.max_residual = max_residual
+        # (monotonic, gameTime)
+        self._samples: Deque[Tuple[float, float]] = deque(maxlen=self.window)
+        self._fit: Option[Tuple[float, float, float]] = None_()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "GameClock":
+        """
+        config.json の "game_clock" セクションから作る。
+        """
+        game_clock = config.get("game_clock", {})
+        return cls(
+            window=game_clock.get("window", WINDOW),
+            max_residual=game_clock.get("max_residual", MAX_RESIDUAL),
+        )
+
+    @property
+    def drift(self) -> float:
+        """
+        手元の1秒でゲーム内時間が何秒進むか。まだ分からなければ1.0。
+        """
+        return self._fit.unwrap()[2] if self._fit.is_some() else 1.0
+
+    def reset(self) -> None:
+        """
+        新しいゲームではサンプルを全部捨てる。
+        """
+        self._samples.clear()
+        self._fit = None_()
+
+    def observe(self, game_time: float, at: float) -> None:
+        """
+        monotonic の at の時点で gameTime が game_time だったことを覚える。
+        """
+        expected = self.game_time_at(at)
+        if (len(self._samples) >= MIN_SAMPLES and expected.is_some()
+                and abs(expected.unwrap() - game_time) > self.max_residual):
+            logger.info(f"⏱️ ゲーム内時間が {game_time - expected.unwrap():+.1f}秒ずれたので時計を合わせ直すよ")
+            self._samples.clear()
+        self._samples.append((at, game_time))
+        self._fit = Some(self._fit_line())
+
+    def game_time_at(self, at: float) -> Option[float]:
+        """
+        monotonic の at の時点のゲーム内時間。
+        """
+        if self._fit.is_none():
+            return None_()
+        mean_at, mean_game, drift = self._fit.unwrap()
+        return Some(mean_game + (at - mean_at) * drift)
+
+    def to_monotonic(self, game_time: float) -> Option[float]:
+        """
+        ゲーム内時間 game_time になる（なった）monotonic の時刻。サンプルがなければNone。
+        """
+        if self._fit.is_none():
+            return None_()
+        mean_at, mean_game, drift = self._fit.unwrap()
+        return Some(mean_at + (game_time - mean_game) / drift)
+
+    async def handle_snapshot(self, snapshot: LiveClientSnapshot) -> None:
+        game = snapshot.game().unwrap()
+        self.observe(game.game_time, snapshot.fetched_at)
+
+    def _fit_line(self) -> Tuple[float, float, float]:
+        # 大きな monotonic の値で桁落ちしないように、平均を原点にして当てはめる
+        n = len(self._samples)
+        mean_at = sum(at for at, _ in self._samples) / n
+        mean_game = sum(g for _, g in self._samples) / n
+        var_at = sum((at - mean_at) ** 2 for at, _ in self._samples)
+        if var_at <= 0.0:
+            return mean_at, mean_game, 1.0
+        cov = sum((at - mean_at) * (g - mean_game) for at, g in self._samples)
+        drift = cov / var_at
+        # 一時停止中などで進んでいないときは、ふつうの速さで進むことにしておく
+        if drift <= 0.0:
+            drift = 1.0
+        return mean_at, mean_game, drift
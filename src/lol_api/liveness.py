@@ -0,0 +1,69 @@
+from enum import Enum
+
+# データ取得が何回続けて失敗したらクライアント停止とみなすか
+FAILURE_THRESHOLD = 2
+# 停止中のプローブ間隔（秒）の初期値と上限
+INITIAL_PROBE_INTERVAL = 1.0
+MAX_PROBE_INTERVAL = 30.0
+
+
+class ClientState(str, Enum):
+    UNKNOWN = "unknown"
+    UP = "up"
+    DOWN = "down"
+
+
+class ClientLiveness:
+    """
+    LoLクライアントが生きているかを管理するステートマシン。
+    起動中は実際のデータ取得の結果だけで判定して、止まっている間だけ
+    /gamestats への軽いプローブを指数バックオフで打つよ！
+
+    Attributes:
+        state (ClientState): 現在の状態。
+        probe_interval (float): 次のプローブまでの待ち時間（秒）。
+    """
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD,
+                 initial_probe_interval: float = INITIAL_PROBE_INTERVAL,
+                 max_probe_interval: float = MAX_PROBE_INTERVAL):
+        self.failure_threshold = failure_threshold
+        self.initial_probe_interval = initial_probe_interval
+        self.max_probe_interval = max_probe_interval
+        self.state = ClientState.UNKNOWN
+        self.probe_interval = initial_probe_interval
+        self._consecutive_failures = 0
+
+    def is_up(self) -> bool:
+        return self.state == ClientState.UP
+
+    def record_success(self) -> bool:
+        """
+        データ取得かプローブが成功したことを記録する。
+
+        Returns:
+            bool: 状態が変わった場合はTrue。
+        """
+        self._consecutive_failures = 0
+        self.probe_interval = self.initial_probe_interval
+        return self._transition(ClientState.UP)
+
+    def record_failure(self) -> bool:
+        """
+        データ取得かプローブが失敗したことを記録する。
+        起動中はしきい値回数まで様子を見て、停止中はプローブ間隔を倍にしていくよ。
+
+        Returns:
+            bool: 状態が変わった場合はTrue。
+        """
+        self._consecutive_failures += 1
+        if self.state == ClientState.DOWN:
+            self.probe_interval = min(self.probe_interval * 2, self.max_probe_interval)
+            return False
+        if self.state == ClientState.UP and self._consecutive_failures < self.failure_threshold:
+            return False
+        return self._transition(ClientState.DOWN)
+
+    def _transition(self, new_state: ClientState) -> bool:
+        changed = self.state != new_state
+        self.state = new_state
+        return changed
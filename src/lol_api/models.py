@@ -0,0 +1,190 @@
+from typing import Dict, FrozenSet, Optional, Tuple
+
+# allgamedata のうち、検知で使うところだけを持つ軽い型たち。
+# 大きなdictを毎ティックあちこちで辿らなくていいように、スナップショットごとに1回だけ作るよ。
+
+# プレイヤーの名前として扱うフィールド（Riot ID と旧来のサモナーネーム）
+NAME_FIELDS = ("riotId", "riotIdGameName", "summonerName")
+
+
+def player_names(player: dict) -> FrozenSet[str]:
+    """
+    activePlayer か allPlayers の1人分から、イベントの KillerName などに出てくる可能性のある名前を全部集める。
+    """
+    names = {player.get(field) for field in NAME_FIELDS}
+    # "Name#TAG" 形式の summonerName / riotId しかないときは Name の部分も足しておく
+    for name in list(names):
+        if isinstance(name, str) and "#" in name:
+            names.add(name.split("#", 1)[0])
+    return frozenset(n for n in names if isinstance(n, str) and n)
+
+
+class PlayerState:
+    """
+    allPlayers の1人分。
+
+    Attributes:
+        name (str): riotId（なければ summonerName）。
+        names (FrozenSet[str]): イベントの KillerName などと突き合わせるための名前。
+        health (float): 今の体力。
+        max_health (float): 最大体力（0にはならない）。
+        is_dead (bool): isDead がなければ体力0以下かどうかで決める。
+        items (Tuple[int, ...]): 持っているアイテムのID。
+        item_prices (Tuple[int, ...]): items と同じ順の、アイテムの値段。
+    """
+    __slots__ = ("name", "names", "team", "champion", "level", "health", "max_health", "is_dead",
+                 "respawn_timer", "kills", "deaths", "assists", "creep_score", "items",
+                 "item_prices")
+
+    def __init__(self, name: str, names: FrozenSet[str], team: str, champion: str, level: int,
+                 health: float, max_health: float, is_dead: bool, respawn_timer: float,
+                 kills: int, deaths: int, assists: int, creep_score: int, items: Tuple[int, ...],
+                 item_prices: Tuple[int, ...] = ()):
+        self.name = name
+        self.names = names
+        self.team = team
+        self.champion = champion
+        self.level = level
+        self.health = health
+        self.max_health = max_health
+        self.is_dead = is_dead
+        self.respawn_timer = respawn_timer
+        self.kills = kills
+        self.deaths = deaths
+        self.assists = assists
+        self.creep_score = creep_score
+        self.items = items
+        self.item_prices = item_prices
+
+    @classmethod
+    def from_dict(cls, p: dict) -> "PlayerState":
+        stats = p.get("championStats", {})
+        scores = p.get("scores", {})
+        health = stats.get("currentHealth", 0.0)
+        summoner_name = p.get("summonerName")
+        riot_id = p.get("riotId")
+        items = [item for item in p.get("items", []) if "itemID" in item]
+        return cls(
+            name=riot_id or summoner_name,
+            names=player_names(p),
+            team=p.get("team", ""),
+            champion=p.get("championName", ""),
+            level=p.get("level", 0),
+            health=health,
+            max_health=stats.get("maxHealth", 1.0) or 1.0,
+            is_dead=p.get("isDead", health <= 0),
+            respawn_timer=p.get("respawnTimer", 0.0),
+            kills=scores.get("kills", 0),
+            deaths=scores.get("deaths", 0),
+            assists=scores.get("assists", 0),
+            creep_score=scores.get("creepScore", 0),
+            items=tuple(item["itemID"] for item in items),
+            item_prices=tuple(item.get("price", 0) for item in items),
+        )
+
+
+class ActivePlayerState:
+    """
+    activePlayer（自分）の分。
+    """
+    __slots__ = ("name", "names", "level", "gold")
+
+    def __init__(self, name: Optional[str], names: FrozenSet[str], level: int, gold: float):
+        self.name = name
+        self.names = names
+        self.level = level
+        self.gold = gold
+
+    @classmethod
+    def from_dict(cls, a: dict) -> "ActivePlayerState":
+        return cls(
+            name=a.get("riotId") or a.get("summonerName"),
+            names=player_names(a),
+            level=a.get("level", 0),
+            gold=a.get("currentGold", 0.0),
+        )
+
+
+class GameEvent:
+    """
+    events.Events の1件分。
+    """
+    __slots__ = ("event_id", "name", "time", "killer", "victim", "assisters")
+
+    def __init__(self, event_id: int, name: str, time: float, killer: Optional[str],
+                 victim: Optional[str], assisters: Tuple[str, ...]):
+        self.event_id = event_id
+        self.name = name
+        self.time = time
+        self.killer = killer
+        self.victim = victim
+        self.assisters = assisters
+
+    @classmethod
+    def from_dict(cls, e: dict) -> "GameEvent":
+        return cls(
+            event_id=e.get("EventID", -1),
+            name=e.get("EventName", ""),
+            time=e.get("EventTime", 0.0),
+            killer=e.get("KillerName") or e.get("Acer"),
+            victim=e.get("VictimName"),
+            assisters=tuple(e.get("Assisters", ())),
+        )
+
+
+class GameState:
+    """
+    allgamedata 1回分を検知用に詰め直したもの。
+    イベントは毎ティック全部は詰め直さず、要る分だけ events_from で取り出すよ。
+
+    Attributes:
+        game_time (float): gameData.gameTime。
+        active_player (ActivePlayerState): 自分。
+        players (Tuple[PlayerState, ...]): 全プレイヤー。
+    """
+    __slots__ = ("game_time", "game_ended", "active_player", "players", "_raw_events")
+
+    def __init__(self, game_time: float, game_ended: bool, active_player: ActivePlayerState,
+                 players: Tuple[PlayerState, ...], raw_events: list):
+        self.game_time = game_time
+        self.game_ended = game_ended
+        self.active_player = active_player
+        self.players = players
+        self._raw_events = raw_events
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "GameState":
+        game_data = data.get("gameData", {})
+        return cls(
+            game_time=game_data.get("gameTime", 0.0),
+            game_ended=game_data.get("gameEnded", False),
+            active_player=ActivePlayerState.from_dict(data.get("activePlayer", {})),
+            players=tuple(PlayerState.from_dict(p) for p in data.get("allPlayers", [])),
+            raw_events=data.get("events", {}).get("Events", []),
+        )
+
+    @property
+    def event_count(self) -> int:
+        return len(self._raw_events)
+
+    def events_from(self, start: int) -> Tuple[GameEvent, ...]:
+        """
+        start 番目以降のイベント。
+        """
+        return tuple(GameEvent.from_dict(e) for e in self._raw_events[start:])
+
+    def player_teams(self) -> Dict[str, str]:
+        """
+        イベントに出てくるプレイヤー名からチームを引く表。
+        """
+        return {name: p.team for p in self.players for name in p.names}
+
+    def active_player_state(self) -> Optional[PlayerState]:
+        """
+        allPlayers の中の自分。
+        """
+        names = self.active_player.names
+        for p in self.players:
+            if p.names & names:
+                return p
+        return None
@@ -1,33 +1,77 @@
-import requests
-from datetime import datetime, timedelta
+from typing import FrozenSet
 from utils.option import Option, Some, None_
 from utils.logger import logger
+from lol_api.fetcher import LiveClientSnapshot
+from lol_api.models import NAME_FIELDS, player_names
 
-_active_player_cache: Option[str] = None_()
-_active_player_timestamp: Option[datetime] = None_()
 
-ACTIVE_PLAYER_URL = "https://127.0.0.1:2999/liveclientdata/activeplayer"
+class ActivePlayerCache:
+    """
+    1ゲームの間だけ有効な、自分（アクティブプレイヤー）の名前のキャッシュ。
+    共有フェッチャーのスナップショットから埋めて、GameStart / GameEnd で捨てるよ。
+    ハンドラから読むときは通信しないよ！
+    """
+    # allgamedata の activePlayer か、/activeplayer のどちらかがあれば埋められる
+    endpoints = ("allgamedata",)
+
+    def __init__(self):
+        self._name: Option[str] = None_()
+        self._names: Option[FrozenSet[str]] = None_()
+
+    def get(self) -> Option[str]:
+        """
+        表示用の名前（riotId があればそれ）を返す。
+        """
+        return self._name
+
+    def names(self) -> Option[FrozenSet[str]]:
+        """
+        イベントと突き合わせるための名前の集合を返す。
+        """
+        return self._names
+
+    def update(self, active_player: dict) -> None:
+        names = player_names(active_player)
+        if not names:
+            return
+        name = next((active_player[f] for f in NAME_FIELDS if active_player.get(f)), None)
+        if self._name.unwrap_or(None) != name:
+            logger.info(f"🙋 アクティブプレイヤーは {name} だよ")
+        self._name = Some(name)
+        self._names = Some(names)
+
+    def reset(self) -> None:
+        """
+        ゲームが変わったら捨てる。次のスナップショットでまた埋まるよ。
+        """
+        self._name = None_()
+        self._names = None_()
+
+    async def handle_snapshot(self, snapshot: LiveClientSnapshot) -> None:
+        if self._names.is_some():
+            return
+        active_player = snapshot.get("activeplayer").unwrap_or(None)
+        if active_player is None:
+            active_player = snapshot.get("allgamedata").unwrap_or({}).get("activePlayer")
+        if active_player:
+            self.update(active_player)
+
+    async def handle_game_event(self, event: dict) -> None:
+        """
+        GameStart / GameEnd イベントのハンドラ。
+        """
+        logger.debug(f"{event.get('EventName')} なのでアクティブプレイヤーを忘れるね")
+        self.reset()
+
+
+active_player = ActivePlayerCache()
+
 
 def get_active_player_name() -> Option[str]:
     """
+    キャッシュ済みのアクティブプレイヤー名を返す。通信はしないよ。
 
-    :rtype: object
+    Returns:
+        Option[str]: まだ分からなければNone。
     """
-    global _active_player_cache, _active_player_timestamp
-
-    now = datetime.now()
-    if _active_player_cache.is_some() and _active_player_timestamp.is_some():
-        if now - _active_player_timestamp.unwrap() < timedelta(minutes=1):
-            return _active_player_cache
-
-    try:
-        res = requests.get(ACTIVE_PLAYER_URL, verify=False, timeout=2)
-        res.raise_for_status()
-        data = res.json()
-        summoner = data["summonerName"]
-        _active_player_cache = Some(summoner)
-        _active_player_timestamp = Some(now)
-        return _active_player_cache
-    except Exception as e:
-        logger.warning(f"⚠️ ActivePlayerの取得に失敗したよ: {e}")
-        return None_()
+    return active_player.get()
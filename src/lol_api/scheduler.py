@@ -0,0 +1,128 @@
+import time
+from typing import Callable, Dict
+from utils.logger import logger
+from lol_api.fetcher import LiveClientSnapshot
+
+# ポーリング間隔（秒）のデフォルト
+DEFAULT_MIN_INTERVAL = 0.25
+DEFAULT_BASE_INTERVAL = 1.0
+DEFAULT_MAX_INTERVAL = 2.0
+# 盛り上がりを検知してから速いポーリングを続ける時間（秒）
+ACTIVITY_HOLD = 10.0
+# ミニオンが湧くまでのショップタイム（ゲーム内秒）
+SHOP_PHASE_END = 65.0
+# オブジェクトが湧く何秒前から、湧いてから何秒後まで速めにポーリングするか
+OBJECTIVE_LEAD_TIME = 30.0
+OBJECTIVE_TAIL_TIME = 10.0
+# オブジェクトの初回スポーン時間とリスポーン間隔（ゲーム内秒）
+OBJECTIVE_FIRST_SPAWN: Dict[str, float] = {"DragonKill": 300.0, "BaronKill": 1200.0}
+OBJECTIVE_RESPAWN: Dict[str, float] = {"DragonKill": 300.0, "BaronKill": 360.0}
+# 速いポーリングに切り替えるイベント
+ACTIVITY_EVENTS = {"ChampionKill", "Multikill", "Ace", "DragonKill", "BaronKill", "HeraldKill"}
+
+
+class AdaptivePollScheduler:
+    """
+    ゲームの状況に合わせてポーリング間隔を決めるスケジューラ。
+    キルや体力の大きな変化があった直後は速く、ロード中・ショップタイム・
+    自分が死んでいる間はゆっくりポーリングするよ！
+
+    Attributes:
+        min_interval (float): 一番速いときの間隔（秒）。
+        base_interval (float): 普段の間隔（秒）。
+        max_interval (float): 一番ゆっくりのときの間隔（秒）。
+    """
+    def __init__(self, min_interval: float = DEFAULT_MIN_INTERVAL,
+                 max_interval: float = DEFAULT_MAX_INTERVAL,
+                 base_interval: float = DEFAULT_BASE_INTERVAL,
+                 activity_hold: float = ACTIVITY_HOLD,
+                 clock: Callable[[], float] = time.monotonic):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.base_interval = min(max(base_interval, min_interval), max_interval)
+        self.activity_hold = activity_hold
+        self._clock = clock
+        self._active_until = 0.0
+        self._last_health_ratio = 0.0
+        self._game_time = 0.0
+        self._player_dead = False
+        self._next_objective: Dict[str, float] = dict(OBJECTIVE_FIRST_SPAWN)
+        self._events_seen = 0
+        self._last_reason = ""
+
+    @classmethod
+    def from_config(cls, config: dict) -> "AdaptivePollScheduler":
+        """
+        config.json の "polling" セクションから作る。
+        """
+        polling = config.get("polling", {})
+        return cls(
+            min_interval=polling.get("min_interval", DEFAULT_MIN_INTERVAL),
+            max_interval=polling.get("max_interval", DEFAULT_MAX_INTERVAL),
+            base_interval=polling.get("base_interval", DEFAULT_BASE_INTERVAL),
+        )
+
+    def note_activity(self) -> None:
+        """
+        盛り上がりを検知したので、しばらく速くポーリングする。
+        """
+        self._active_until = self._clock() + self.activity_hold
+
+    def note_event(self, event_name: str) -> None:
+        if event_name in ACTIVITY_EVENTS:
+            self.note_activity()
+
+    def note_health_change(self, ratio: float, threshold: float) -> None:
+        """
+        体力変化の割合が上がってきていて、しきい値の半分を超えたら盛り上がりとみなす。
+        """
+        if ratio > self._last_health_ratio and ratio >= threshold / 2:
+            self.note_activity()
+        self._last_health_ratio = ratio
+
+    async def handle_snapshot(self, snapshot: LiveClientSnapshot) -> None:
+        """
+        allgamedataからゲームのフェーズ（ロード中・死亡中・オブジェクトの湧き時間）を読み取るよ。
+        """
+        game = snapshot.game().unwrap()
+        self._game_time = game.game_time
+        me = game.active_player_state()
+        self._player_dead = me.is_dead if me is not None else False
+
+        if game.event_count < self._events_seen:
+            # 新しいゲームが始まった
+            self._events_seen = 0
+            self._next_objective = dict(OBJECTIVE_FIRST_SPAWN)
+        for event in game.events_from(self._events_seen):
+            if event.name in OBJECTIVE_RESPAWN:
+                self._next_objective[event.name] = event.time + OBJECTIVE_RESPAWN[event.name]
+        self._events_seen = game.event_count
+
+    def next_interval(self) -> float:
+        """
+        次のポーリングまでの待ち時間を返す。
+        優先順は 盛り上がり中 > ロード中 > ショップタイム > デス中 > オブジェクト湧き > 通常 だよ。
+        """
+        if self._clock() < self._active_until:
+            interval, reason = self.min_interval, "盛り上がり中"
+        elif self._game_time <= 0:
+            interval, reason = self.max_interval, "ロード中"
+        elif self._game_time < SHOP_PHASE_END:
+            interval, reason = self.max_interval, "ショップタイム"
+        elif self._player_dead:
+            interval, reason = self.max_interval, "デス中"
+        elif self._objective_soon():
+            interval, reason = (self.min_interval + self.base_interval) / 2, "オブジェクト湧き"
+        else:
+            interval, reason = self.base_interval, "通常"
+
+        if reason != self._last_reason:
+            logger.debug(f"ポーリング間隔を {interval:.2f}秒 にするね（{reason}）")
+            self._last_reason = reason
+        return interval
+
+    def _objective_soon(self) -> bool:
+        # 湧いてからしばらくたったオブジェクトは、倒されるまで「もうすぐ」ではない
+        return any(spawn - OBJECTIVE_LEAD_TIME <= self._game_time <= spawn + OBJECTIVE_TAIL_TIME
+                   for spawn in self._next_objective.values())
+
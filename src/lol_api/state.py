@@ -1,33 +1,91 @@
-import asyncio
-import requests
+import json
+import logging
+from typing import Optional
 from utils.logger import fileonly_logger
 from utils.event_dispatcher import EventDispatcher
 from utils.event_types import CustomEventType
-import urllib3
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from utils.recording import json_diff, RECORD_SEPARATORS
+from lol_api.fetcher import LiveClientSnapshot
+
+# ゲーム状態ログの書き方
+STATE_LOG_CHANGES = "changes"  # 最初に丸ごと、その後は変わったところだけ
+STATE_LOG_SAMPLE = "sample"    # sample_every ティックに1回だけ丸ごと
+STATE_LOG_FULL = "full"        # 毎ティック丸ごと
+STATE_LOG_OFF = "off"
+STATE_LOG_MODES = (STATE_LOG_CHANGES, STATE_LOG_SAMPLE, STATE_LOG_FULL, STATE_LOG_OFF)
+SAMPLE_EVERY = 10
+
+
+class _CompactJSON:
+    """
+    ログが実際に書かれるとき（書き込みスレッド）に初めてJSONにするための包み。
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self) -> str:
+        return json.dumps(self.value, ensure_ascii=False, separators=RECORD_SEPARATORS)
 
-ALL_GAME_DATA_URL = "https://127.0.0.1:2999/liveclientdata/allgamedata"
-POLL_INTERVAL = 1.0
 
 class GameStatePoller:
-    def __init__(self, dispatcher: EventDispatcher):
+    # このポーラーが必要とするエンドポイント
+    endpoints = ("allgamedata",)
+
+    def __init__(self, dispatcher: EventDispatcher, mode: str = STATE_LOG_CHANGES, sample_every: int = SAMPLE_EVERY):
+        if mode not in STATE_LOG_MODES:
+            raise ValueError(f"未知のstate_logモード: {mode}")
         self.dispatcher = dispatcher
-        self._stop_event = asyncio.Event()
-
-    async def poll_events_async(self):
-        while not self._stop_event.is_set():
-            try:
-                loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(
-                    None,
-                    lambda: requests.get(ALL_GAME_DATA_URL, verify=False, timeout=2)
-                )
-                response.raise_for_status()
-                data = response.json()
-
-                fileonly_logger.debug("🔎 ゲーム状態: %s", data)
-                await self.dispatcher.dispatch(CustomEventType.GAME_STATE_UPDATE, data)
-
-            except Exception as e:
-                fileonly_logger.warning(f"[GameStatePoller] allgamedata取得失敗: {e}")
-            await asyncio.sleep(POLL_INTERVAL)
+        self.mode = mode
+        self.sample_every = max(sample_every, 1)
+        self._last: Optional[dict] = None
+        self._ticks = 0
+
+    @classmethod
+    def from_config(cls, dispatcher: EventDispatcher, config: dict) -> "GameStatePoller":
+        """
+        config.json の "state_log" セクションから作る。
+        """
+        state_log = config.get("state_log", {})
+        return cls(
+            dispatcher,
+            mode=state_log.get("mode", STATE_LOG_CHANGES),
+            sample_every=state_log.get("sample_every", SAMPLE_EVERY),
+        )
+
+    def reset(self) -> None:
+        """
+        新しいゲームでは最初にまた丸ごと書くよ。
+        """
+        self._last = None
+        self._ticks = 0
+
+    async def handle_snapshot(self, snapshot: LiveClientSnapshot) -> None:
+        try:
+            data = snapshot.get("allgamedata").unwrap()
+            self._log_state(data)
+            await self.dispatcher.dispatch(CustomEventType.GAME_STATE_UPDATE, data)
+
+        except Exception as e:
+            fileonly_logger.warning(f"[GameStatePoller] allgamedata処理失敗: {e}")
+
+    def _log_state(self, data: dict) -> None:
+        # ログに出ないなら差分を取る手間もかけない
+        if self.mode == STATE_LOG_OFF or not fileonly_logger.isEnabledFor(logging.DEBUG):
+            return
+
+        tick = self._ticks
+        self._ticks += 1
+        if self.mode == STATE_LOG_FULL:
+            fileonly_logger.debug("🔎 ゲーム状態: %s", _CompactJSON(data))
+        elif self.mode == STATE_LOG_SAMPLE:
+            if tick % self.sample_every == 0:
+                fileonly_logger.debug("🔎 ゲーム状態: %s", _CompactJSON(data))
+        elif self._last is None:
+            fileonly_logger.debug("🔎 ゲーム状態: %s", _CompactJSON(data))
+        else:
+            ops = json_diff(self._last, data)
+            if ops:
+                fileonly_logger.debug("🔎 ゲーム状態の変化: %s", _CompactJSON(ops))
+        self._last = data
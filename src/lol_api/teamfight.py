@@ -0,0 +1,212 @@
+from array import array
+import math
+from typing import Dict, Optional, Sequence
+from lol_api.models import PlayerState
+
+# 1ゲームのプレイヤー数の上限
+MAX_PLAYERS = 10
+# 履歴の長さ（ゲーム内秒）
+HISTORY_SECONDS = 10.0
+# サンプルが来る一番短い間隔（秒）。リングバッファの列数はこれで決めるよ
+MIN_SAMPLE_INTERVAL = 0.25
+# 体力変化の割合合計のしきい値（例: 30%）
+HEALTH_CHANGE_THRESHOLD = 0.3
+# 両チームともウィンドウ内にこの人数以上デスしたら集団戦
+MIN_DEATHS_PER_TEAM = 2
+
+TEAMS = ("ORDER", "CHAOS")
+
+
+class TeamFightScoring:
+    """
+    集団戦判定のしきい値。config.json の "team_fight" セクションで変えられるよ。
+
+    Attributes:
+        window (float): 何秒分（ゲーム内時間）の履歴で判定するか。ポーリング間隔が変わっても同じ長さだよ。
+        health_change_threshold (float): 全員分の体力変化割合の合計がこれ以上なら集団戦。
+        min_deaths_per_team (int): 両チームのウィンドウ内デス数がこれ以上なら集団戦。
+    """
+    def __init__(self, window: float = HISTORY_SECONDS,
+                 health_change_threshold: float = HEALTH_CHANGE_THRESHOLD,
+                 min_deaths_per_team: int = MIN_DEATHS_PER_TEAM):
+        self.window = window
+        self.health_change_threshold = health_change_threshold
+        self.min_deaths_per_team = min_deaths_per_team
+
+    @classmethod
+    def from_config(cls, config: dict) -> "TeamFightScoring":
+        team_fight = config.get("team_fight", {})
+        return cls(
+            window=team_fight.get("window", HISTORY_SECONDS),
+            health_change_threshold=team_fight.get("health_change_threshold", HEALTH_CHANGE_THRESHOLD),
+            min_deaths_per_team=team_fight.get("min_deaths_per_team", MIN_DEATHS_PER_TEAM),
+        )
+
+
+class HealthMatrix:
+    """
+    プレイヤー × サンプル数の固定長リングバッファ。
+    体力・最大体力・レベル・生存フラグを1本の配列に詰めて持つから、
+    毎ティック新しいオブジェクトを作らずに済むよ。列ごとにゲーム内時刻も覚えておく。
+
+    Attributes:
+        samples (int): 1プレイヤーあたりの履歴の長さ（列数）。
+        head (int): 次に書き込む列。
+        count (int): ウィンドウに残っている列の数（最大 samples）。
+    """
+    def __init__(self, players: int = MAX_PLAYERS, samples: int = int(HISTORY_SECONDS / MIN_SAMPLE_INTERVAL) + 1):
+        self.players = players
+        self.samples = samples
+        size = players * samples
+        self.health = array("d", [0.0]) * size
+        self.max_health = array("d", [1.0]) * size
+        self.level = array("i", [0]) * size
+        self.alive = array("b", [1]) * size
+        self.times = array("d", [0.0]) * samples
+        self.head = 0
+        self.count = 0
+
+    def clear(self) -> None:
+        for i in range(self.players * self.samples):
+            self.health[i] = 0.0
+            self.max_health[i] = 1.0
+            self.level[i] = 0
+            self.alive[i] = 1
+        for i in range(self.samples):
+            self.times[i] = 0.0
+        self.head = 0
+        self.count = 0
+
+    def oldest_column(self) -> int:
+        return (self.head - self.count) % self.samples
+
+    def previous_column(self) -> int:
+        return (self.head - 1) % self.samples
+
+    def drop_oldest(self) -> None:
+        self.count -= 1
+
+    def advance(self) -> None:
+        # 呼ぶ前に drop_oldest で空きを作っておくこと
+        self.head = (self.head + 1) % self.samples
+        self.count += 1
+
+
+class TeamFightDetector:
+    """
+    HealthMatrix の上でウィンドウ内の体力変化とチームごとのデス数を数えるよ。
+    ウィンドウはゲーム内時刻で区切って、はみ出した列はデス数ごとウィンドウから外す。
+    デス数はリングバッファの列ごとの値を足し引きするだけなので、外す列が1つなら1ティックO(1)！
+    サンプルが min_interval より速く来てリングが埋まったときは、一番古い列を早めに外すよ。
+
+    Attributes:
+        health_change_ratio (float): ウィンドウの一番古い列から今までの体力変化割合の合計。
+        window_deaths (Dict[str, int]): チームごとのウィンドウ内デス数。
+    """
+    def __init__(self, scoring: Optional[TeamFightScoring] = None, players: int = MAX_PLAYERS,
+                 min_interval: float = MIN_SAMPLE_INTERVAL):
+        self.scoring = scoring or TeamFightScoring()
+        samples = math.ceil(self.scoring.window / max(min_interval, 0.01)) + 1
+        self.matrix = HealthMatrix(players, samples)
+        # 列ごとのチーム別デス数（チーム × サンプル数）
+        self._team_deaths = array("i", [0]) * (len(TEAMS) * samples)
+        self._window_deaths = array("i", [0]) * len(TEAMS)
+        self._slots: Dict[str, int] = {}
+        self.health_change_ratio = 0.0
+
+    @property
+    def window_deaths(self) -> Dict[str, int]:
+        return {team: self._window_deaths[i] for i, team in enumerate(TEAMS)}
+
+    def reset(self) -> None:
+        """
+        新しいゲーム用に履歴を全部捨てる。
+        """
+        self.matrix.clear()
+        for i in range(len(self._team_deaths)):
+            self._team_deaths[i] = 0
+        for i in range(len(self._window_deaths)):
+            self._window_deaths[i] = 0
+        self._slots.clear()
+        self.health_change_ratio = 0.0
+
+    def update(self, players: Sequence[PlayerState], game_time: float) -> bool:
+        """
+        allPlayers の1ティック分（ゲーム内時刻 game_time）を取り込んで、集団戦っぽいかどうかを返す。
+        """
+        m = self.matrix
+        n = m.samples
+        # window 秒より古い列と、リングが埋まっていれば一番古い列を外して、今の列の場所を空ける
+        while m.count > 0 and m.times[m.oldest_column()] < game_time - self.scoring.window:
+            self._drop_oldest()
+        if m.count == n:
+            self._drop_oldest()
+        col = m.head
+        oldest = m.oldest_column()
+        prev = m.previous_column()
+        has_history = m.count > 0
+        blue_deaths = 0
+        red_deaths = 0
+        ratio = 0.0
+
+        for p in players:
+            name = p.name
+            # 途中から現れたプレイヤーはまだ比べる履歴がない
+            known = name in self._slots
+            slot = self._slot_for(name)
+            if slot < 0:
+                continue
+            base = slot * n
+            health = p.health
+            max_health = p.max_health
+            alive = not p.is_dead
+
+            if has_history and known:
+                ratio += abs(m.health[base + oldest] - health) / max_health
+                if m.alive[base + prev] and not alive:
+                    if p.team == "ORDER":
+                        blue_deaths += 1
+                    elif p.team == "CHAOS":
+                        red_deaths += 1
+
+            m.health[base + col] = health
+            m.max_health[base + col] = max_health
+            m.level[base + col] = p.level
+            m.alive[base + col] = alive
+
+        self._push_deaths(0, blue_deaths, col)
+        self._push_deaths(1, red_deaths, col)
+        m.times[col] = game_time
+        m.advance()
+        self.health_change_ratio = ratio
+
+        scoring = self.scoring
+        return (
+            (self._window_deaths[0] >= scoring.min_deaths_per_team
+             and self._window_deaths[1] >= scoring.min_deaths_per_team)
+            or ratio >= scoring.health_change_threshold
+        )
+
+    def _push_deaths(self, team_index: int, deaths: int, col: int) -> None:
+        i = team_index * self.matrix.samples + col
+        self._window_deaths[team_index] += deaths
+        self._team_deaths[i] = deaths
+
+    def _drop_oldest(self) -> None:
+        # 一番古い列のデス数をウィンドウから外す
+        m = self.matrix
+        col = m.oldest_column()
+        for team_index in range(len(TEAMS)):
+            i = team_index * m.samples + col
+            self._window_deaths[team_index] -= self._team_deaths[i]
+            self._team_deaths[i] = 0
+        m.drop_oldest()
+
+    def _slot_for(self, name: str) -> int:
+        slot = self._slots.get(name)
+        if slot is None:
+            if len(self._slots) >= self.matrix.players:
+                return -1
+            slot = len(self._slots)
+            self._slots[name] = slot
+        return slot
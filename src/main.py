@@ -1,31 +1,71 @@
 import asyncio
 import threading
-from utils.logger import logger
+import time
+from typing import List
+from utils.logger import logger, configure_fileonly_log
 from utils.config import load_config, create_default_config
-from utils.event_dispatcher import EventDispatcher
-from utils.event_types import EventType, CustomEventType
-from obs.obs_client import trigger_replay_buffer
-from lol_api.player import get_active_player_name
+from utils.event_dispatcher import EventDispatcher, field_equals
+from utils.event_types import EventType, CustomEventType, ChangeEventType
+from utils.metrics import TRACE_KEY, LatencyTrace, metrics
+from utils.result import Result
+from obs.obs_client import trigger_replay_buffer, configure_targets
+from obs.save_scheduler import ReplaySaveScheduler
+from obs.replay_buffer import ReplayBufferLifecycle
+from lol_api.client import configure_client
+from lol_api.player import active_player
+from lol_api.game_clock import GameClock
+from lol_api.fetcher import LiveClientFetcher
+from lol_api.scheduler import AdaptivePollScheduler
+from lol_api.detectors import detectors_from_config
 from lol_api.events import LLEventPoller
 from lol_api.custom_events import CustomEventPoller
+from lol_api.changes import StateChangePoller
 from lol_api.state import GameStatePoller
 
 CONFIG = {}
 dispatcher = EventDispatcher()
 
+async def save_clip(traces: List[LatencyTrace]) -> Result[str, str]:
+    """
+    リプレイを保存して、設定されていればレイテンシのヒストグラムを書き出す関数
+    :param traces: 保存のきっかけになったイベントのトレース
+    :return: 保存されたファイルのパス
+    """
+    result = await trigger_replay_buffer(traces)
+    metrics_file = CONFIG.get("metrics_file")
+    if metrics_file and result.is_ok():
+        metrics.write_json(metrics_file)
+    return result
+
+# 近いタイミングの保存トリガーは1回の保存にまとめるよ
+save_scheduler = ReplaySaveScheduler(save_clip)
+# イベントのゲーム内時刻を手元の時計に直すのに使うよ
+game_clock = GameClock()
+
 async def trigger_replay(event: dict, delay: float, message: str):
     """
     リプレイを保存するトリガーを発火させる関数
     :param event: イベントデータ
     :param delay: リプレイ保存までの遅延時間
     :param message: リプレイ保存のメッセージ
-    :return: None
+    :return: None（保存は予約するだけで、終わるのは待たない）
     """
-    active_player = get_active_player_name()
-    if active_player.is_some() and event.get("KillerName") == active_player.unwrap():
+    trace = event.get(TRACE_KEY)
+    if trace is not None:
+        trace.mark("dispatched")
+
+    # 自分が関わったイベントかどうかは登録時のフィルタで絞り込み済みだよ
+    # ポーリングで気づいた時刻じゃなくて、イベントが起きたゲーム内時刻の delay 秒後に保存する
+    event_time = event.get("EventTime")
+    deadline = None
+    if event_time is not None:
+        deadline = game_clock.to_monotonic(event_time + delay).unwrap_or(None)
+    if deadline is None:
         logger.info(f"💥 {message} {delay}秒後にリプレイを保存するね〜")
-        await asyncio.sleep(delay)
-        await trigger_replay_buffer()
+    else:
+        logger.info(f"💥 {message} ゲーム内 {event_time + delay:.1f}秒（{deadline - time.monotonic():.1f}秒後）にリプレイを保存するね〜")
+    # 保存が終わるまで待つと、その間ほかのイベントの取得や検知が止まっちゃうので予約だけして戻る
+    save_scheduler.book(delay, message, trace, deadline=deadline)
 
 def make_replay_handler(message: str):
     """
@@ -51,16 +91,21 @@ handle_herald_steal = make_replay_handler("ヘラルドを盗んだよ！")
 handle_baron_steal = make_replay_handler("バロンを盗んだよ！")
 handle_ace = make_replay_handler("自分がエースしたよ！")
 handle_teambattle = make_replay_handler("集団戦が起きたよ！")
+handle_gold_spike = make_replay_handler("一気に稼いだよ！")
+handle_solo_baron = make_replay_handler("ソロバロンしたよ！")
+handle_comeback = make_replay_handler("カムバックしたよ！")
+handle_level_up = make_replay_handler("レベルアップしたよ！")
+handle_item_completed = make_replay_handler("アイテムが完成したよ！")
+handle_gold_swing = make_replay_handler("ゴールドが一気に増えたよ！")
 
-async def main_async():
-    global CONFIG
-
-    CONFIG = load_config()
-    if not CONFIG:
-        create_default_config()
-        CONFIG = load_config()
-
-    trigger_events = CONFIG.get("trigger_events", {})
+def register_triggers(dispatcher: EventDispatcher, config: dict) -> None:
+    """
+    config.json の "trigger_events" で有効なイベントに、リプレイ保存のハンドラを登録する関数
+    :param dispatcher: 登録先のディスパッチャー
+    :param config: 設定
+    :return: None
+    """
+    trigger_events = config.get("trigger_events", {})
     handlers = {
         "ChampionKill": (EventType.CHAMPION_KILL, handle_champion_kill),
         "Multikill": (EventType.MULTIKILL, handle_multikill),
@@ -73,19 +118,90 @@ async def main_async():
 
         # カスタムイベント
         "Teambattle": (CustomEventType.TEAM_FIGHT, handle_teambattle),
+        "GoldSpike": (CustomEventType.GOLD_SPIKE, handle_gold_spike),
+        "SoloBaron": (CustomEventType.SOLO_BARAM, handle_solo_baron),
+        "Comeback": (CustomEventType.COMEBACK, handle_comeback),
+
+        # スナップショットの差分から作る変化イベント
+        "LevelUp": (ChangeEventType.LEVEL_UP, handle_level_up),
+        "ItemCompleted": (ChangeEventType.ITEM_COMPLETED, handle_item_completed),
+        "GoldSwing": (ChangeEventType.GOLD_SWING, handle_gold_swing),
     }
 
+    # 自分がデスしたときは被害者、エースはAcer、変化イベントはPlayerName、それ以外は自分がキラーのイベントだけを受け取る
     for event_name, (event_type, handler) in handlers.items():
         if trigger_events.get(event_name, False):
-            dispatcher.register(event_type, handler)
+            if isinstance(event_type, CustomEventType):
+                dispatcher.register(event_type, handler)
+            elif isinstance(event_type, ChangeEventType):
+                dispatcher.register(event_type, handler, predicate=field_equals("PlayerName", active_player.names))
+            elif event_type == EventType.PLAYER_DEATH:
+                dispatcher.register(event_type, handler, victim=active_player.names)
+            elif event_type == EventType.ACE:
+                dispatcher.register(event_type, handler, predicate=field_equals("Acer", active_player.names))
+            else:
+                dispatcher.register(event_type, handler, killer=active_player.names)
             logger.info(f"イベント '{event_name}' にハンドラを登録したよ〜")
 
-    poller = LLEventPoller(dispatcher)
-    custom_poller = CustomEventPoller(dispatcher)
-    game_state_poller = GameStatePoller(dispatcher)
-    asyncio.create_task(poller.poll_events_async())
-    asyncio.create_task(custom_poller.poll_events_async())
-    asyncio.create_task(game_state_poller.poll_events_async())
+async def main_async():
+    global CONFIG, save_scheduler, dispatcher, game_clock
+
+    CONFIG = load_config()
+    if not CONFIG:
+        create_default_config()
+        CONFIG = load_config()
+
+    configure_client(CONFIG)
+    configure_fileonly_log(CONFIG)
+    # 保存先のOBSには全部起動時に繋いでおいて、切れても裏で再接続し続ける
+    obs_targets = configure_targets(CONFIG)
+    obs_targets.start()
+    # リプレイバッファの長さが replay_delay に足りているかは起動時にOBSごとに確かめておく
+    replay_buffers = [ReplayBufferLifecycle.from_config(client, CONFIG) for client in obs_targets.clients.values()]
+    for replay_buffer in replay_buffers:
+        asyncio.create_task(replay_buffer.check())
+    save_scheduler = ReplaySaveScheduler.from_config(save_clip, CONFIG)
+    game_clock = GameClock.from_config(CONFIG)
+    # ハンドラはキュー越しに裏で動かして、ポーリングを止めないようにするよ
+    dispatcher = EventDispatcher.from_config(CONFIG)
+
+    register_triggers(dispatcher, CONFIG)
+
+    # 自分の名前はゲームごとに1回だけスナップショットから覚えて、ゲームが変わったら忘れる
+    dispatcher.register(EventType.GAME_START, active_player.handle_game_event)
+    dispatcher.register(EventType.GAME_END, active_player.handle_game_event)
+    # リプレイバッファはゲームの間だけ動かす
+    manage_replay_buffer = CONFIG.get("replay_buffer", {}).get("manage", False)
+    if manage_replay_buffer:
+        for replay_buffer in replay_buffers:
+            dispatcher.register(EventType.GAME_START, replay_buffer.handle_game_event)
+            dispatcher.register(EventType.GAME_END, replay_buffer.handle_game_event)
+
+    # 各ポーラーは共有フェッチャーのスナップショットを受け取るだけにするよ
+    # ポーリング間隔はゲームの状況に合わせてスケジューラが決めるよ
+    scheduler = AdaptivePollScheduler.from_config(CONFIG)
+    fetcher = LiveClientFetcher(interval_provider=scheduler.next_interval)
+    fetcher.subscribe(["allgamedata"], scheduler.handle_snapshot)
+    fetcher.subscribe(game_clock.endpoints, game_clock.handle_snapshot, on_reset=game_clock.reset)
+    if manage_replay_buffer:
+        for replay_buffer in replay_buffers:
+            fetcher.subscribe(replay_buffer.endpoints, replay_buffer.handle_snapshot,
+                              on_reset=replay_buffer.reset, on_down=replay_buffer.handle_client_down)
+    fetcher.subscribe(active_player.endpoints, active_player.handle_snapshot, on_reset=active_player.reset)
+    event_poller = LLEventPoller(dispatcher, scheduler)
+    fetcher.subscribe(
+        event_poller.endpoints, event_poller.handle_snapshot,
+        params={"eventdata": event_poller.query_params}, on_reset=event_poller.reset
+    )
+    # カスタムイベントの検知器はみんな同じ GameState を共有するよ
+    custom_poller = CustomEventPoller(dispatcher, detectors_from_config(CONFIG), scheduler)
+    fetcher.subscribe(custom_poller.endpoints, custom_poller.handle_snapshot, on_reset=custom_poller.reset)
+    # 前のティックとの差分は、購読されている項目だけ取るよ
+    change_poller = StateChangePoller.from_config(dispatcher, CONFIG)
+    fetcher.subscribe(change_poller.endpoints, change_poller.handle_snapshot, on_reset=change_poller.reset)
+    game_state_poller = GameStatePoller.from_config(dispatcher, CONFIG)
+    fetcher.subscribe(game_state_poller.endpoints, game_state_poller.handle_snapshot, on_reset=game_state_poller.reset)
+    asyncio.create_task(fetcher.run())
 
     logger.info("LoL OBS Replay Trigger が起動したよ〜！終了するには Ctrl+C を押してね〜")
 
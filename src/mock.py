@@ -1,13 +1,33 @@
 import os
 import json
 import glob
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from urllib.parse import urlparse
+import time
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
 from threading import Lock
+from typing import Callable, Optional
+from utils.recording import RecordingReader
 
 DUMP_DIR = "../dump"
 MOCK_HOST = "127.0.0.1"
 MOCK_PORT = 2999
+# リクエストごとのログを出すかどうか（ベンチマーク時はオフにする）
+VERBOSE = True
+# リプレイ再生の速さの範囲
+MIN_SPEED = 1.0
+MAX_SPEED = 50.0
+
+# 記録に無いエンドポイントは allgamedata のこの部分から作る
+DERIVED_ENDPOINTS = {
+    "activeplayer": lambda d: d["activePlayer"],
+    "activeplayername": lambda d: d["activePlayer"]["summonerName"],
+    "activeplayerabilities": lambda d: d["activePlayer"]["abilities"],
+    "activeplayerrunes": lambda d: d["activePlayer"]["fullRunes"],
+    "playerlist": lambda d: d["allPlayers"],
+    "eventdata": lambda d: d["events"],
+    "gamestats": lambda d: d["gameData"],
+}
 
 # スレッドセーフなファイルインデックス管理用
 class FileRotator:
@@ -30,21 +50,116 @@ rotators = {
     "/liveclientdata/eventdata": FileRotator(os.path.join(DUMP_DIR, "eventdata_*.json"))
 }
 
+class ReplaySource:
+    """
+    dump.py で記録したゲームを先読みして、再生位置の時点のレスポンスを返すよ。
+    再生位置は start() してからの経過時間 × speed で進んで、最後まで行ったら最後の状態のまま止まる。
+    （ぐるっと先頭に戻らないので、イベントIDが巻き戻ったりしないよ）
+
+    Attributes:
+        speed (float): 再生の速さ（1〜50倍）。
+        start_at (float): 記録の中で再生を始める時刻。
+    """
+    def __init__(self, path: str, speed: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        if not MIN_SPEED <= speed <= MAX_SPEED:
+            raise ValueError(f"speed は {MIN_SPEED}〜{MAX_SPEED} の間にしてね: {speed}")
+        self.reader = RecordingReader(path)
+        self.speed = speed
+        self.start_at = self.reader.start
+        self._clock = clock
+        self._started: Optional[float] = None
+        self._lock = Lock()
+        # エンドポイントごとに、最後に返したレコードの添字とエンコード済みのボディ
+        self._encoded = {}
+
+    def start(self) -> None:
+        self._started = self._clock()
+
+    def position(self) -> float:
+        """
+        今の再生位置（記録の中の時刻）。
+        """
+        if self._started is None:
+            self.start()
+        return min(self.start_at + (self._clock() - self._started) * self.speed, self.reader.end)
+
+    def finished(self) -> bool:
+        return self.position() >= self.reader.end
+
+    def response(self, endpoint: str, query: Optional[dict] = None) -> Optional[bytes]:
+        """
+        今の再生位置でのレスポンスのボディ。まだ記録が始まっていない・知らないエンドポイントなら None。
+        """
+        query = query or {}
+        t = self.position()
+        source = endpoint if endpoint in self.reader.endpoints else "allgamedata"
+        if source != endpoint and endpoint not in DERIVED_ENDPOINTS:
+            return None
+
+        with self._lock:
+            index = self.reader.index_at(source, t)
+            if index < 0:
+                return None
+            cached = self._encoded.get(endpoint)
+            if cached is not None and cached[0] == index and "eventID" not in query:
+                return cached[1]
+            data = self.reader.get(source, index)
+
+        try:
+            if source != endpoint:
+                data = DERIVED_ENDPOINTS[endpoint](data)
+        except KeyError:
+            return None
+        if endpoint == "eventdata" and "eventID" in query:
+            # 本物と同じく、指定したID以降のイベントだけを返す
+            since = int(query["eventID"])
+            data = {**data, "Events": [e for e in data.get("Events", []) if e.get("EventID", 0) >= since]}
+            return json.dumps(data).encode("utf-8")
+
+        body = json.dumps(data).encode("utf-8")
+        with self._lock:
+            self._encoded[endpoint] = (index, body)
+        return body
+
+
+# リプレイ再生中ならここに入る（Noneなら FileRotator でファイルを順番に返す）
+replay: Optional[ReplaySource] = None
+
 class MockHandler(BaseHTTPRequestHandler):
+    # 本物のLive Client APIと同じくkeep-aliveできるようにしておく
+    protocol_version = "HTTP/1.1"
+    # ヘッダとボディが別パケットになってもNagleで40ms待たされないように
+    disable_nagle_algorithm = True
+
     def do_GET(self):
         parsed_path = urlparse(self.path)
         path = parsed_path.path
 
-        if path in rotators:
+        if replay is not None and path.startswith("/liveclientdata/"):
+            query = {k: v[0] for k, v in parse_qs(parsed_path.query).items()}
+            data = replay.response(path[len("/liveclientdata/"):], query)
+            if data is None:
+                self.send_error(404, "Data not found")
+                return
+            self.send_response(200)
+            self.send_header("Content-type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            if VERBOSE:
+                print(f"📤 {path} に {replay.position() - replay.start_at:.1f}秒時点のデータを返したよ〜")
+        elif path in rotators:
             file = rotators[path].next()
             if file and os.path.exists(file):
                 with open(file, "r", encoding="utf-8") as f:
-                    data = f.read()
+                    data = f.read().encode("utf-8")
                 self.send_response(200)
                 self.send_header("Content-type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
                 self.end_headers()
-                self.wfile.write(data.encode("utf-8"))
-                print(f"📤 {path} に {file} を返したよ〜")
+                self.wfile.write(data)
+                if VERBOSE:
+                    print(f"📤 {path} に {file} を返したよ〜")
             else:
                 self.send_error(404, "Data not found")
         else:
@@ -53,13 +168,31 @@ class MockHandler(BaseHTTPRequestHandler):
     def log_message(self, format, *args):
         return  # 標準ログを抑制（必要なら消してね）
 
-def run_mock_server():
-    httpd = HTTPServer((MOCK_HOST, MOCK_PORT), MockHandler)
-    print(f"🚀 HTTPモックサーバ起動！http://{MOCK_HOST}:{MOCK_PORT}/")
+def run_mock_server(port=MOCK_PORT):
+    # keep-alive接続を張りっぱなしにされても他の接続を待たせないようスレッドで捌く
+    httpd = ThreadingHTTPServer((MOCK_HOST, port), MockHandler)
+    print(f"🚀 HTTPモックサーバ起動！http://{MOCK_HOST}:{port}/")
+    if replay is not None:
+        replay.start()
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
         print("⏹️ モックサーバ停止されたよ〜")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Live Client API のモックサーバ")
+    parser.add_argument("--replay", help="dump.py で記録したファイル（.jsonl.gz）を再生する")
+    parser.add_argument("--speed", type=float, default=1.0, help=f"再生の速さ（{MIN_SPEED:g}〜{MAX_SPEED:g}倍）")
+    parser.add_argument("--skip", type=float, default=0.0, help="記録の先頭から何秒飛ばして再生するか")
+    parser.add_argument("--port", type=int, default=MOCK_PORT)
+    parser.add_argument("--quiet", action="store_true", help="リクエストごとのログを出さない")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    run_mock_server()
+    args = parse_args()
+    VERBOSE = not args.quiet
+    if args.replay:
+        replay = ReplaySource(args.replay, speed=args.speed)
+        replay.start_at += args.skip
+        print(f"🎞️ {args.replay} を {args.speed:g}倍速で再生するよ（{replay.reader.end - replay.reader.start:.0f}秒ぶん）")
+    run_mock_server(args.port)
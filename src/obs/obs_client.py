@@ -1,64 +1,432 @@
 import asyncio
+import base64
+import hashlib
 import websockets
 import json
+import time
+import uuid
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
 from utils.logger import logger
-from utils.option import Option, Some, None_
+from utils.metrics import LatencyTrace, metrics, record_traces
 from utils.result import Result, Ok, Err
 
 OBS_WS_URL = "ws://localhost:4455"
+# 名前を付けなかったつなぎ先の名前
+DEFAULT_TARGET = "default"
+# リクエストのレスポンスを待つ時間（秒）
+REQUEST_TIMEOUT = 10.0
+# SaveReplayBufferのあと、ReplayBufferSavedイベントを待つ時間（秒）
+SAVE_CONFIRM_TIMEOUT = 30.0
+# WebSocketのping間隔（秒）。応答がなければ切断とみなして再接続するよ
+HEARTBEAT_INTERVAL = 10.0
+# 再接続の待ち時間（秒）の初期値と上限
+RECONNECT_INITIAL_DELAY = 1.0
+RECONNECT_MAX_DELAY = 30.0
+# これだけ繋がっていたら安定していたとみなして、再接続の待ち時間を初期値に戻す（秒）
+RECONNECT_STABLE_AFTER = 30.0
 
-obs_ws: Option[websockets.WebSocketClientProtocol] = None_()
+# OBS WebSocket v5 のオペコード
+OP_HELLO = 0
+OP_IDENTIFY = 1
+OP_IDENTIFIED = 2
+OP_EVENT = 5
+OP_REQUEST = 6
+OP_REQUEST_RESPONSE = 7
+OP_REQUEST_BATCH = 8
+OP_REQUEST_BATCH_RESPONSE = 9
 
+# Identifyで購読するイベントのカテゴリ（Outputs: ReplayBufferSaved など）
+EVENT_SUB_OUTPUTS = 1 << 6
 
-async def get_obs_connection() -> Result[websockets.WebSocketClientProtocol, str]:
-    global obs_ws
+EventHandler = Callable[[dict], None]
 
-    if obs_ws.is_none() or not obs_ws.unwrap().open:
+
+class OBSClient:
+    """
+    OBS WebSocket v5 のクライアント。
+    受信は裏で動く1本のタスクがまとめて担当して、レスポンスはrequestIdで
+    呼び出し元に振り分けるから、いくつリクエストを同時に投げても大丈夫だよ！
+
+    Attributes:
+        url (str): OBS WebSocketのURL。
+        password (str): OBS WebSocketのパスワード（認証なしなら空）。
+        name (str): ログに出すつなぎ先の名前。
+    """
+    def __init__(self, url: str = OBS_WS_URL, password: str = "", request_timeout: float = REQUEST_TIMEOUT,
+                 name: str = DEFAULT_TARGET):
+        self.url = url
+        self.password = password
+        self.name = name
+        self.request_timeout = request_timeout
+        self._ws = None
+        self._reader: Optional[asyncio.Task] = None
+        self._keeper: Optional[asyncio.Task] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._event_handlers: Dict[str, List[EventHandler]] = {}
+        self._connect_lock = asyncio.Lock()
+        # ReplayBufferSavedを待っている保存（OBSは保存を順番に処理するので先頭から対応づける）
+        self._saved_waiters: Deque[asyncio.Future] = deque()
+        self.on_event("ReplayBufferSaved", self._on_replay_buffer_saved)
+
+    def is_connected(self) -> bool:
+        return self._ws is not None and self._reader is not None and not self._reader.done()
+
+    def on_event(self, event_type: str, handler: EventHandler) -> None:
+        """
+        OBSから届くイベント（op 5）のハンドラを登録する。
+        """
+        self._event_handlers.setdefault(event_type, []).append(handler)
+
+    async def connect(self) -> Result[None, str]:
+        """
+        まだ繋がっていなければ接続してIdentifyまで済ませる。
+        """
+        async with self._connect_lock:
+            if self.is_connected():
+                return Ok(None)
+            ws = None
+            try:
+                ws = await websockets.connect(
+                    self.url, ping_interval=HEARTBEAT_INTERVAL, ping_timeout=HEARTBEAT_INTERVAL
+                )
+                logger.info(f"OBS（{self.name}）との接続が確立されたよ〜！")
+
+                # OBSが黙ったままでもずっと待たないように、ハンドシェイクにもタイムアウトをつける
+                hello = json.loads(await asyncio.wait_for(ws.recv(), self.request_timeout))
+                if hello.get("op") != OP_HELLO:
+                    raise ConnectionError(f"Helloが来なかったよ: {hello}")
+
+                identify = {"rpcVersion": 1, "eventSubscriptions": EVENT_SUB_OUTPUTS}
+                auth = hello.get("d", {}).get("authentication")
+                if auth:
+                    if not self.password:
+                        raise ConnectionError("OBSがパスワードを要求してるけど設定されてないよ")
+                    identify["authentication"] = make_auth_string(self.password, auth["salt"], auth["challenge"])
+
+                await ws.send(json.dumps({"op": OP_IDENTIFY, "d": identify}))
+                identified = json.loads(await asyncio.wait_for(ws.recv(), self.request_timeout))
+                if identified.get("op") != OP_IDENTIFIED:
+                    raise ConnectionError(f"Identifyに失敗したよ: {identified}")
+                logger.info(f"OBSからのIdentifyレスポンス: {identified}")
+
+                self._ws = ws
+                self._reader = asyncio.create_task(self._read_loop(ws))
+                return Ok(None)
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                logger.error(f"❌ OBS（{self.name}）接続またはIdentifyエラー: {error}")
+                # 認証やハンドシェイクで失敗したソケットは閉じておく
+                if ws is not None:
+                    try:
+                        await ws.close()
+                    except Exception:
+                        pass
+                self._ws = None
+                return Err(error)
+
+    async def _read_loop(self, ws) -> None:
+        """
+        受信したメッセージをopごとに振り分け続ける。切れたら待っている人全員にエラーを返すよ。
+        """
         try:
-            ws = await websockets.connect(OBS_WS_URL)
-            logger.info("OBSとの接続が確立されたよ〜！")
-
-            identify_payload = json.dumps({
-                "op": 1,
-                "d": {
-                    "rpcVersion": 1,
-                    "authentication": ""
-                }
-            })
-
-            await ws.send(identify_payload)
-            response = await ws.recv()
-            logger.info(f"OBSからのIdentifyレスポンス: {response}")
-
-            obs_ws = Some(ws)
+            while True:
+                message = json.loads(await ws.recv())
+                op = message.get("op")
+                d = message.get("d", {})
+                if op in (OP_REQUEST_RESPONSE, OP_REQUEST_BATCH_RESPONSE):
+                    future = self._pending.pop(d.get("requestId"), None)
+                    if future is not None and not future.done():
+                        future.set_result(d)
+                elif op == OP_EVENT:
+                    self._handle_event(d)
         except Exception as e:
-            logger.error(f"❌ OBS接続またはIdentifyエラー: {e}")
-            obs_ws = None_()
-            return Err(str(e))
+            logger.warning(f"⚠️ OBS（{self.name}）との接続が切れたよ: {e}")
+        finally:
+            if self._ws is ws:
+                self._ws = None
+            for future in list(self._pending.values()) + list(self._saved_waiters):
+                if not future.done():
+                    future.set_exception(ConnectionError("OBSとの接続が切れました"))
+            self._pending.clear()
+            self._saved_waiters.clear()
+
+    def _handle_event(self, d: dict) -> None:
+        for handler in self._event_handlers.get(d.get("eventType"), []):
+            try:
+                handler(d.get("eventData", {}))
+            except Exception as e:
+                logger.error(f"OBSイベント '{d.get('eventType')}' の処理中にエラー発生: {e}")
+
+    async def _send_and_wait(self, op: int, d: dict) -> Result[dict, str]:
+        connection_result = await self.connect()
+        if connection_result.is_err():
+            return Err(connection_result.unwrap_err())
+
+        request_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self._ws.send(json.dumps({"op": op, "d": {**d, "requestId": request_id}}))
+            return Ok(await asyncio.wait_for(future, self.request_timeout))
+        except Exception as e:
+            return Err(str(e) or type(e).__name__)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def call(self, request_type: str, request_data: Optional[dict] = None) -> Result[dict, str]:
+        """
+        リクエストを1つ送ってレスポンスを待つ。他のリクエストとは並行に進むよ。
+
+        Returns:
+            Result[dict, str]: 成功ならresponseData、失敗ならエラー内容。
+        """
+        d = {"requestType": request_type}
+        if request_data is not None:
+            d["requestData"] = request_data
+        result = await self._send_and_wait(OP_REQUEST, d)
+        if result.is_err():
+            return result
+        return _unwrap_response(result.unwrap())
+
+    async def call_batch(self, requests: List[Tuple[str, Optional[dict]]],
+                         halt_on_failure: bool = False) -> Result[List[Result[dict, str]], str]:
+        """
+        複数のリクエストを1つのバッチ（op 8）にまとめて送る。
+
+        Returns:
+            Result[List[Result[dict, str]], str]: リクエストごとの結果のリスト。
+        """
+        batch = []
+        for request_type, request_data in requests:
+            item = {"requestType": request_type}
+            if request_data is not None:
+                item["requestData"] = request_data
+            batch.append(item)
+
+        result = await self._send_and_wait(
+            OP_REQUEST_BATCH, {"haltOnFailure": halt_on_failure, "requests": batch}
+        )
+        if result.is_err():
+            return result
+        return Ok([_unwrap_response(r) for r in result.unwrap().get("results", [])])
+
+    def _on_replay_buffer_saved(self, data: dict) -> None:
+        while self._saved_waiters:
+            waiter = self._saved_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(data.get("savedReplayPath", ""))
+                return
+
+    async def save_replay_buffer(self, traces: Optional[List[LatencyTrace]] = None,
+                                 confirm_timeout: float = SAVE_CONFIRM_TIMEOUT) -> Result[str, str]:
+        """
+        リプレイバッファを保存して、ReplayBufferSavedイベントでファイルが書き出されたのを確認するよ。
+
+        Args:
+            traces (List[LatencyTrace]): この保存のきっかけになったイベントのトレース。
+            confirm_timeout (float): ReplayBufferSavedを待つ秒数。
+
+        Returns:
+            Result[str, str]: 成功なら保存されたファイルのパス。
+        """
+        traces = traces or []
+        # レスポンスより先にイベントが届いても取りこぼさないよう、送る前に待ち受ける
+        waiter = asyncio.get_running_loop().create_future()
+        self._saved_waiters.append(waiter)
+        try:
+            requested_at = time.monotonic()
+            for trace in traces:
+                trace.mark("save_requested", requested_at)
 
-    return Ok(obs_ws.unwrap())
+            result = await self.call("SaveReplayBuffer")
+            if result.is_err():
+                return Err(result.unwrap_err())
+            acked_at = time.monotonic()
+            for trace in traces:
+                trace.mark("save_acked", acked_at)
 
+            try:
+                path = await asyncio.wait_for(asyncio.shield(waiter), confirm_timeout)
+            except asyncio.TimeoutError:
+                return Err("ReplayBufferSavedイベントが届かなかったよ")
+            except Exception as e:
+                return Err(str(e))
 
-async def trigger_replay_buffer() -> Result[None, str]:
-    connection_result = await get_obs_connection()
+            saved_at = time.monotonic()
+            metrics.observe("obs.save_request", acked_at - requested_at)
+            metrics.observe("obs.file_written", saved_at - acked_at)
+            for trace in traces:
+                trace.mark("saved", saved_at)
+                trace.saved_path = path
+            record_traces(traces)
+            return Ok(path)
+        finally:
+            if waiter in self._saved_waiters:
+                self._saved_waiters.remove(waiter)
 
-    if connection_result.is_ok():
+    def start(self) -> None:
+        """
+        裏で接続を張っておいて、切れたらバックオフしながら張り直し続けるよ。
+        これで最初のリプレイ保存も接続待ちなしで送れる！
+        """
+        if self._keeper is None or self._keeper.done():
+            self._keeper = asyncio.create_task(self._keep_connected())
+
+    async def _keep_connected(self) -> None:
+        delay = RECONNECT_INITIAL_DELAY
+        while True:
+            result = await self.connect()
+            if result.is_ok():
+                connected_at = time.monotonic()
+                # 切れるまで待つ
+                await asyncio.gather(self._reader, return_exceptions=True)
+                # Identify のあとすぐ切られる（OBSの再起動中など）ときは、待ち時間を戻さずに伸ばし続ける
+                if time.monotonic() - connected_at >= RECONNECT_STABLE_AFTER:
+                    delay = RECONNECT_INITIAL_DELAY
+                logger.info(f"OBS（{self.name}）に{delay:.0f}秒後に再接続するね〜")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    async def close(self) -> None:
+        if self._keeper is not None:
+            self._keeper.cancel()
+            await asyncio.gather(self._keeper, return_exceptions=True)
+            self._keeper = None
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+
+def make_auth_string(password: str, salt: str, challenge: str) -> str:
+    """
+    OBS WebSocket v5 の認証文字列を作る。
+    base64(sha256(base64(sha256(password + salt)) + challenge))
+    """
+    secret = base64.b64encode(hashlib.sha256((password + salt).encode("utf-8")).digest())
+    return base64.b64encode(hashlib.sha256(secret + challenge.encode("utf-8")).digest()).decode("utf-8")
+
+
+def _unwrap_response(d: dict) -> Result[dict, str]:
+    status = d.get("requestStatus", {})
+    if not status.get("result", False):
+        return Err(f"{d.get('requestType')} 失敗 (code={status.get('code')}): {status.get('comment', '')}")
+    return Ok(d.get("responseData", {}))
+
+
+class OBSTargets:
+    """
+    保存先のOBSをまとめたもの（ゲーム用PCと配信・録画用PCなど）。
+    保存は全部のOBSに同時に送って、どれか1つで保存できた時点で結果を返すよ。
+    遅いOBSや落ちているOBSは裏で最後まで待つだけなので、他のOBSの保存を待たせない！
+
+    Attributes:
+        clients (Dict[str, OBSClient]): 名前ごとのクライアント。
+        primary (OBSClient): 最初に設定したクライアント。レイテンシのトレースはこれの保存で取るよ。
+    """
+    def __init__(self, clients: List[OBSClient]):
+        if not clients:
+            raise ValueError("OBSのつなぎ先が1つもないよ")
+        names = [client.name for client in clients]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"OBSのつなぎ先の名前がかぶってるよ: {', '.join(duplicates)}")
+        self.clients: Dict[str, OBSClient] = {client.name: client for client in clients}
+        self.primary = clients[0]
+        self._background: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "OBSTargets":
+        """
+        config.json の "obs" セクションから作る。
+        "targets" があればそのリスト、なければ "url" / "password" の1台だけ。
+        """
+        obs = config.get("obs", {})
+        targets = obs.get("targets") or [obs]
+        clients = []
+        for i, target in enumerate(targets):
+            name = target.get("name") or (DEFAULT_TARGET if i == 0 else f"obs{i + 1}")
+            clients.append(OBSClient(url=target.get("url", OBS_WS_URL), password=target.get("password", ""), name=name))
+        return cls(clients)
+
+    def start(self) -> None:
+        for client in self.clients.values():
+            client.start()
+
+    async def save_replay_buffer(self, traces: Optional[List[LatencyTrace]] = None) -> Result[str, str]:
+        """
+        全部のOBSでリプレイバッファを保存する。
+
+        Returns:
+            Result[str, str]: 最初に保存できたOBSのファイルのパス。全部失敗したらエラーをまとめたもの。
+        """
+        pending = {
+            asyncio.create_task(self._save(client, traces if client is self.primary else None))
+            for client in self.clients.values()
+        }
+        errors = []
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name, result = task.result()
+                if result.is_ok():
+                    # 残りのOBSは裏で待って、結果はそれぞれログとメトリクスに残す
+                    for rest in pending:
+                        self._background.add(rest)
+                        rest.add_done_callback(self._background.discard)
+                    return result
+                errors.append(f"{name}: {result.unwrap_err()}")
+        return Err(" / ".join(errors))
+
+    async def _save(self, client: OBSClient, traces: Optional[List[LatencyTrace]]) -> Tuple[str, Result[str, str]]:
+        started = time.monotonic()
         try:
-            ws = connection_result.unwrap()
-            request_payload = json.dumps({
-                "op": 6,
-                "d": {
-                    "requestType": "SaveReplayBuffer",
-                    "requestId": "saveReplay"
-                }
-            })
-
-            await ws.send(request_payload)
-            response = await ws.recv()
-            logger.info(f"🎬 リプレイ保存のレスポンス: {response}")
-            return Ok(None)
+            result = await client.save_replay_buffer(traces)
         except Exception as e:
-            logger.error(f"❌ リプレイ保存リクエストエラー: {e}")
-            return Err(str(e))
-    else:
+            result = Err(str(e) or type(e).__name__)
+        elapsed = time.monotonic() - started
+
+        if result.is_ok():
+            metrics.observe(f"obs.target.{client.name}.saved", elapsed)
+            logger.info(f"🎬 [{client.name}] リプレイを保存したよ〜（{elapsed:.2f}秒）: {result.unwrap()}")
+        else:
+            metrics.observe(f"obs.target.{client.name}.failed", elapsed)
+            logger.error(f"❌ [{client.name}] リプレイ保存に失敗したよ（{elapsed:.2f}秒）: {result.unwrap_err()}")
+        return client.name, result
+
+    async def close(self) -> None:
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        for client in self.clients.values():
+            await client.close()
+
+
+default_targets = OBSTargets([OBSClient()])
+default_client = default_targets.primary
+
+
+def configure_targets(config: dict) -> OBSTargets:
+    """
+    設定ファイルの内容で保存先のOBSを作り直す。default_client は最初のつなぎ先になるよ。
+    """
+    global default_targets, default_client
+    default_targets = OBSTargets.from_config(config)
+    default_client = default_targets.primary
+    return default_targets
+
+
+async def get_obs_connection() -> Result[OBSClient, str]:
+    connection_result = await default_client.connect()
+    if connection_result.is_err():
         return Err(connection_result.unwrap_err())
+    return Ok(default_client)
+
+
+async def trigger_replay_buffer(traces: Optional[List[LatencyTrace]] = None) -> Result[str, str]:
+    result = await default_targets.save_replay_buffer(traces)
+
+    if result.is_err():
+        logger.error(f"❌ リプレイ保存リクエストエラー: {result.unwrap_err()}")
+    return result
@@ -0,0 +1,199 @@
+import asyncio
+import time
+from typing import Callable, Optional
+from utils.logger import logger
+from utils.result import Result, Ok, Err
+from obs.obs_client import OBSClient
+from obs.save_scheduler import MAX_EXTENSION
+from lol_api.fetcher import LiveClientSnapshot
+
+# OBSのリプレイバッファの出力名
+REPLAY_BUFFER_OUTPUT = "Replay Buffer"
+# GameEnd のあと、リプレイバッファを止めるまで待つ秒数
+STOP_GRACE = 30.0
+# 開始に失敗したら（OBSが落ちているなど）、次に試すまでの秒数
+RETRY_INTERVAL = 10.0
+
+
+class ReplayBufferLifecycle:
+    """
+    OBSのリプレイバッファをゲームの間だけ動かすよ。
+    GameStart か、LoLクライアントが見つかって最初のスナップショットで開始して、
+    GameEnd か、クライアントが応答しなくなってから stop_grace 秒たったら止める。
+    ゲームの外ではエンコードもメモリも使わない！
+
+    Attributes:
+        active (bool): リプレイバッファが動いているはずかどうか。
+    """
+    # このポーラーが必要とするエンドポイント
+    endpoints = ("allgamedata",)
+
+    def __init__(self, client: OBSClient, replay_delay: float = 5.0, stop_grace: float = STOP_GRACE,
+                 retry_interval: float = RETRY_INTERVAL, max_extension: float = MAX_EXTENSION,
+                 clock: Callable[[], float] = time.monotonic):
+        self.client = client
+        self.replay_delay = replay_delay
+        # 保存をまとめると、最初のイベントから最大 replay_delay + max_extension 秒後に保存される
+        self.max_extension = max_extension
+        # 最後のまとめた保存が終わる前に止めないように、replay_delay + max_extension よりは待つ
+        self.stop_grace = max(stop_grace, replay_delay + max_extension)
+        self.retry_interval = retry_interval
+        self._clock = clock
+        self.active = False
+        self._ended = False
+        # クライアントが応答しなくなって止める予定を入れたかどうか
+        self._down = False
+        self._next_attempt = 0.0
+        self._lock = asyncio.Lock()
+        self._starting: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Task] = None
+        client.on_event("ReplayBufferStateChanged", self._on_state_changed)
+
+    @classmethod
+    def from_config(cls, client: OBSClient, config: dict) -> "ReplayBufferLifecycle":
+        """
+        config.json の "replay_buffer" セクションと、replay_delay、replay_save.max_extension から作る。
+        """
+        replay_buffer = config.get("replay_buffer", {})
+        return cls(
+            client,
+            replay_delay=config.get("replay_delay", 5.0),
+            stop_grace=replay_buffer.get("stop_grace", STOP_GRACE),
+            max_extension=config.get("replay_save", {}).get("max_extension", MAX_EXTENSION),
+        )
+
+    def _on_state_changed(self, data: dict) -> None:
+        self.active = bool(data.get("outputActive", False))
+
+    async def check(self) -> Result[dict, str]:
+        """
+        起動時に、リプレイバッファが動いているかと、長さが replay_delay + max_extension に足りているかを確かめる。
+
+        Returns:
+            Result[dict, str]: 成功なら {"active": bool, "max_time_sec": int}。
+        """
+        result = await self.client.call_batch([
+            ("GetReplayBufferStatus", None),
+            ("GetOutputSettings", {"outputName": REPLAY_BUFFER_OUTPUT}),
+        ])
+        if result.is_err():
+            logger.warning(f"⚠️ [{self.client.name}] リプレイバッファの状態を確認できなかったよ: {result.unwrap_err()}")
+            return Err(result.unwrap_err())
+        status, settings = result.unwrap()
+        if status.is_err():
+            logger.warning(f"⚠️ [{self.client.name}] リプレイバッファが使えないみたい: {status.unwrap_err()}")
+            return Err(status.unwrap_err())
+
+        self.active = status.unwrap().get("outputActive", False)
+        max_time_sec = settings.unwrap_or({}).get("outputSettings", {}).get("max_time_sec")
+        name = self.client.name
+        # まとめた保存がいちばん遅れたときでも、最初のイベントの瞬間が残っていてほしい
+        latest_save = self.replay_delay + self.max_extension
+        if max_time_sec is None:
+            logger.warning(f"⚠️ [{name}] リプレイバッファの長さが分からなかったよ")
+        elif max_time_sec <= latest_save:
+            logger.warning(f"⚠️ [{name}] リプレイバッファ（{max_time_sec}秒）が replay_delay + max_extension"
+                           f"（{latest_save}秒）より短いから、イベントの瞬間がクリップに入らないことがあるよ")
+        else:
+            logger.info(f"🎞️ [{name}] リプレイバッファは {max_time_sec}秒、"
+                        f"保存がいちばん遅れてもイベントの前 {max_time_sec - latest_save:.1f}秒まで残るよ")
+        return Ok({"active": self.active, "max_time_sec": max_time_sec})
+
+    async def start(self) -> Result[None, str]:
+        """
+        リプレイバッファが止まっていれば開始する。止める予定があれば取り消すよ。
+        """
+        self._cancel_stop()
+        async with self._lock:
+            if self.active:
+                return Ok(None)
+            now = self._clock()
+            if now < self._next_attempt:
+                return Err("開始の再試行を待っているよ")
+
+            status = await self.client.call("GetReplayBufferStatus")
+            if status.is_ok() and status.unwrap().get("outputActive", False):
+                self.active = True
+                return Ok(None)
+            result = await self.client.call("StartReplayBuffer") if status.is_ok() else status
+            if result.is_err():
+                self._next_attempt = now + self.retry_interval
+                logger.warning(f"⚠️ [{self.client.name}] リプレイバッファを開始できなかったよ: {result.unwrap_err()}")
+                return Err(result.unwrap_err())
+            self.active = True
+            logger.info(f"🔴 [{self.client.name}] リプレイバッファを開始したよ〜")
+            return Ok(None)
+
+    async def stop(self) -> Result[None, str]:
+        """
+        リプレイバッファが動いていれば止める。
+        """
+        async with self._lock:
+            status = await self.client.call("GetReplayBufferStatus")
+            if status.is_ok() and not status.unwrap().get("outputActive", False):
+                self.active = False
+                return Ok(None)
+            result = await self.client.call("StopReplayBuffer") if status.is_ok() else status
+            if result.is_err():
+                logger.warning(f"⚠️ [{self.client.name}] リプレイバッファを止められなかったよ: {result.unwrap_err()}")
+                return Err(result.unwrap_err())
+            self.active = False
+            logger.info(f"⏹️ [{self.client.name}] ゲームが終わったのでリプレイバッファを止めたよ〜")
+            return Ok(None)
+
+    def reset(self) -> None:
+        """
+        LoLクライアントが（また）見つかったら、次のスナップショットで開始できるようにする。
+        """
+        self._ended = False
+        self._next_attempt = 0.0
+
+    async def handle_game_event(self, event: dict) -> None:
+        name = event.get("EventName")
+        if name == "GameStart":
+            self._ended = False
+            await self.start()
+        elif name == "GameEnd":
+            self._ended = True
+            self._down = False
+            self._cancel_stop()
+            logger.info(f"ゲームが終わったよ、{self.stop_grace}秒後に [{self.client.name}] のリプレイバッファを止めるね〜")
+            self._stopping = asyncio.create_task(self._stop_later())
+
+    def handle_client_down(self) -> None:
+        """
+        クライアントが応答しなくなったら、stop_grace 秒後に止める。
+        クラッシュやリメイクでは GameEnd が来ないので、これがないと動きっぱなしになっちゃう。
+        """
+        if self._ended or not (self.active or (self._starting is not None and not self._starting.done())):
+            return
+        self._down = True
+        self._cancel_stop()
+        logger.info(f"LoLクライアントが応答しないよ、{self.stop_grace}秒後に [{self.client.name}] のリプレイバッファを止めるね〜")
+        self._stopping = asyncio.create_task(self._stop_later())
+
+    async def handle_snapshot(self, snapshot: LiveClientSnapshot) -> None:
+        # クライアントが戻ってきたら、応答しなかった間に入れた止める予定は取り消す
+        if self._down:
+            self._down = False
+            self._cancel_stop()
+        # ゲームの途中で起動したときや、クライアントが戻ってきたとき用。開始はポーリングを止めないように裏でやる
+        if self.active or self._ended or (self._starting is not None and not self._starting.done()):
+            return
+        if snapshot.game().unwrap().game_ended:
+            return
+        self._starting = asyncio.create_task(self.start())
+
+    async def _stop_later(self) -> None:
+        await asyncio.sleep(self.stop_grace)
+        await self.stop()
+
+    def _cancel_stop(self) -> None:
+        if self._stopping is not None and not self._stopping.done():
+            self._stopping.cancel()
+        self._stopping = None
+
+    async def close(self) -> None:
+        self._cancel_stop()
+        if self._starting is not None:
+            await asyncio.gather(self._starting, return_exceptions=True)
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional
+from utils.logger import logger
+from utils.metrics import LatencyTrace
+from utils.result import Result, Err
+
+# 最初のトリガーから何秒以内に来たトリガーを同じ保存にまとめるか
+MERGE_WINDOW = 5.0
+# まとめることで保存時刻を最初の予定から最大何秒まで後ろにずらすか
+MAX_EXTENSION = 10.0
+
+# まとめたトリガーのトレースを受け取って保存し、保存先のパスを返す関数
+SaveFunc = Callable[[List[LatencyTrace]], Awaitable[Result[str, str]]]
+
+
+class PendingSave:
+    """
+    まだ実行されていないリプレイ保存。
+
+    Attributes:
+        first_at (float): 最初のトリガーが来た時刻。
+        deadline (float): 保存を実行する時刻。
+        cap (float): deadline をこれ以上後ろにはずらさない時刻。
+        reasons (List[str]): まとめられたトリガーのメッセージ。
+        traces (List[LatencyTrace]): まとめられたトリガーのレイテンシ計測用トレース。
+    """
+    def __init__(self, first_at: float, deadline: float, cap: float, reason: str):
+        self.first_at = first_at
+        self.deadline = deadline
+        self.cap = cap
+        self.reasons: List[str] = [reason]
+        self.traces: List[LatencyTrace] = []
+        self.fired = False
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class ReplaySaveScheduler:
+    """
+    近いタイミングのリプレイ保存トリガーを1回の保存にまとめるスケジューラ。
+    マルチキルや続く集団戦で、ほとんど同じ内容のクリップを何本も書き出さないようにするよ！
+
+    Attributes:
+        requested (int): 受け付けたトリガーの数。
+        issued (int): 実際にOBSへ送った保存の数。
+    """
+    def __init__(self, save: SaveFunc,
+                 merge_window: float = MERGE_WINDOW, max_extension: float = MAX_EXTENSION,
+                 clock: Callable[[], float] = time.monotonic):
+        self._save = save
+        self.merge_window = merge_window
+        self.max_extension = max_extension
+        self._clock = clock
+        self._pending: Optional[PendingSave] = None
+        self.requested = 0
+        self.issued = 0
+
+    @classmethod
+    def from_config(cls, save: SaveFunc, config: dict) -> "ReplaySaveScheduler":
+        """
+        config.json の "replay_save" セクションから作る。
+        """
+        replay_save = config.get("replay_save", {})
+        return cls(
+            save,
+            merge_window=replay_save.get("merge_window", MERGE_WINDOW),
+            max_extension=replay_save.get("max_extension", MAX_EXTENSION),
+        )
+
+    async def request(self, delay: float, reason: str = "",
+                      trace: Optional[LatencyTrace] = None,
+                      deadline: Optional[float] = None) -> Result[str, str]:
+        """
+        delay秒後のリプレイ保存を予約して、保存が終わるまで待つ。
+
+        Returns:
+            Result[str, str]: まとめられた保存の結果（成功なら保存されたファイルのパス）。
+        """
+        # まとめられた他のトリガーがキャンセルされても保存自体は止めない
+        return await asyncio.shield(self.book(delay, reason, trace, deadline))
+
+    def book(self, delay: float, reason: str = "",
+             trace: Optional[LatencyTrace] = None,
+             deadline: Optional[float] = None) -> "asyncio.Future[Result[str, str]]":
+        """
+        delay秒後のリプレイ保存を予約するだけで、保存は待たずにすぐ戻る。
+        待っている保存があればそれにまとめるよ。
+
+        Args:
+            deadline: 保存したい時刻（clock と同じ時計）。渡されたら delay の代わりに使う。
+                もう過ぎていればすぐに保存するよ。
+
+        Returns:
+            asyncio.Future: まとめられた保存の結果が入るFuture。
+        """
+        self.requested += 1
+        now = self._clock()
+        desired = now + delay if deadline is None else max(deadline, now)
+        pending = self._pending
+
+        if (pending is not None and not pending.fired
+                and now - pending.first_at <= self.merge_window and desired <= pending.cap):
+            pending.deadline = max(pending.deadline, desired)
+            pending.reasons.append(reason)
+            logger.info(f"🧩 リプレイ保存をまとめたよ（{len(pending.reasons)}件）")
+        else:
+            pending = PendingSave(now, desired, desired + self.max_extension, reason)
+            self._pending = pending
+            asyncio.create_task(self._run(pending))
+        if trace is not None:
+            pending.traces.append(trace)
+        return pending.future
+
+    async def _run(self, pending: PendingSave) -> None:
+        # 待っている間に deadline が延びたらその分また待つ
+        while True:
+            remaining = pending.deadline - self._clock()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(remaining)
+
+        pending.fired = True
+        if self._pending is pending:
+            self._pending = None
+
+        self.issued += 1
+        try:
+            result = await self._save(pending.traces)
+        except Exception as e:
+            logger.error(f"❌ リプレイ保存でエラー発生: {e}")
+            result = Err(str(e))
+        pending.future.set_result(result)
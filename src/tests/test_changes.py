@@ -0,0 +1,145 @@
+# tests/test_changes.py
+
+import pytest
+
+from utils.event_dispatcher import EventDispatcher
+from utils.event_types import ChangeEventType
+from utils.metrics import TRACE_KEY
+from lol_api.fetcher import LiveClientSnapshot
+from lol_api.changes import ChangeWatcher, PlayerChangeWatcher, StateChangePoller, GoldSwingWatcher, ItemCompletedWatcher, LevelUpWatcher, DeathTimerWatcher
+
+
+def snapshot(tick, level=1, gold=0.0, items=(), dead=False, respawn=0.0):
+    return LiveClientSnapshot(tick, {"allgamedata": {
+        "activePlayer": {"summonerName": "Akari", "currentGold": gold},
+        "allPlayers": [
+            {"summonerName": "Akari", "team": "ORDER", "level": level, "isDead": dead, "respawnTimer": respawn,
+             "items": [{"itemID": i, "price": price} for i, price in items]},
+            {"summonerName": "Kokage", "team": "CHAOS", "level": 1},
+        ],
+        "gameData": {"gameTime": float(tick)},
+    }}, {})
+
+
+def collect(dispatcher, event_type):
+    received = []
+
+    async def handler(event):
+        received.append(event)
+    dispatcher.register(event_type, handler)
+    return received
+
+
+@pytest.mark.asyncio
+async def test_level_up_is_emitted_per_player():
+    dispatcher = EventDispatcher()
+    received = collect(dispatcher, ChangeEventType.LEVEL_UP)
+    poller = StateChangePoller(dispatcher, [LevelUpWatcher()])
+
+    await poller.handle_snapshot(snapshot(1, level=1))
+    await poller.handle_snapshot(snapshot(2, level=1))
+    await poller.handle_snapshot(snapshot(3, level=2))
+
+    (event,) = received
+    assert (event["EventName"], event["PlayerName"], event["Level"], event["Previous"]) == ("LevelUp", "Akari", 2, 1)
+    assert event["EventTime"] == 3.0
+    assert TRACE_KEY in event
+
+
+@pytest.mark.asyncio
+async def test_unsubscribed_fields_are_not_read():
+    class CountingWatcher(LevelUpWatcher):
+        reads = 0
+
+        def read(self, game):
+            CountingWatcher.reads += 1
+            return super().read(game)
+
+    dispatcher = EventDispatcher()
+    poller = StateChangePoller(dispatcher, [CountingWatcher()])
+    await poller.handle_snapshot(snapshot(1))
+    assert CountingWatcher.reads == 0
+
+    received = collect(dispatcher, "LevelUp")
+    await poller.handle_snapshot(snapshot(2, level=1))
+    # 購読したばかりのティックは前の値を取るだけ
+    assert received == []
+    await poller.handle_snapshot(snapshot(3, level=2))
+    assert CountingWatcher.reads == 2
+    assert len(received) == 1
+
+
+@pytest.mark.asyncio
+async def test_item_completion_ignores_components():
+    dispatcher = EventDispatcher()
+    received = collect(dispatcher, ChangeEventType.ITEM_COMPLETED)
+    poller = StateChangePoller(dispatcher, [ItemCompletedWatcher(min_price=2500)])
+
+    await poller.handle_snapshot(snapshot(1, items=[(1055, 450)]))
+    await poller.handle_snapshot(snapshot(2, items=[(1055, 450), (1038, 1300)]))
+    await poller.handle_snapshot(snapshot(3, items=[(1055, 450), (3031, 3400)]))
+
+    (event,) = received
+    assert event["ItemIDs"] == [3031]
+
+
+@pytest.mark.asyncio
+async def test_gold_swing_and_death_timer():
+    dispatcher = EventDispatcher()
+    gold = collect(dispatcher, ChangeEventType.GOLD_SWING)
+    deaths = collect(dispatcher, ChangeEventType.DEATH_TIMER)
+    poller = StateChangePoller(dispatcher, [GoldSwingWatcher(threshold=500), DeathTimerWatcher()])
+
+    await poller.handle_snapshot(snapshot(1, gold=100.0))
+    await poller.handle_snapshot(snapshot(2, gold=300.0))
+    await poller.handle_snapshot(snapshot(3, gold=1000.0, dead=True, respawn=20.0))
+    await poller.handle_snapshot(snapshot(4, gold=1000.0, dead=True, respawn=19.0))
+
+    assert [(e["Gold"], e["Delta"]) for e in gold] == [(1000.0, 700.0)]
+    assert [(e["PlayerName"], e["RespawnTimer"]) for e in deaths] == [("Akari", 20.0)]
+
+
+@pytest.mark.asyncio
+async def test_big_purchase_is_not_a_gold_swing():
+    dispatcher = EventDispatcher()
+    gold = collect(dispatcher, ChangeEventType.GOLD_SWING)
+    poller = StateChangePoller(dispatcher, [GoldSwingWatcher(threshold=500)])
+
+    await poller.handle_snapshot(snapshot(1, gold=3500.0))
+    # 3400G のアイテムを買って一気に減っても出さない
+    await poller.handle_snapshot(snapshot(2, gold=100.0, items=[(3031, 3400)]))
+    await poller.handle_snapshot(snapshot(3, gold=700.0, items=[(3031, 3400)]))
+
+    assert [(e["Gold"], e["Delta"]) for e in gold] == [(700.0, 600.0)]
+
+
+@pytest.mark.asyncio
+async def test_reset_forgets_previous_frame():
+    dispatcher = EventDispatcher()
+    received = collect(dispatcher, ChangeEventType.LEVEL_UP)
+    poller = StateChangePoller.from_config(dispatcher, {})
+
+    await poller.handle_snapshot(snapshot(1, level=5))
+    poller.reset()
+    await poller.handle_snapshot(snapshot(2, level=1))
+    await poller.handle_snapshot(snapshot(3, level=1))
+    assert received == []
+
+
+def test_watcher_missing_a_method_fails_when_built():
+    class NoCompare(ChangeWatcher):
+        event_type = ChangeEventType.LEVEL_UP
+
+        def read(self, game):
+            return {}
+
+    class NoValue(PlayerChangeWatcher):
+        event_type = ChangeEventType.LEVEL_UP
+
+        def compare(self, previous, current):
+            return None
+
+    with pytest.raises(TypeError):
+        NoCompare()
+    with pytest.raises(TypeError):
+        NoValue()
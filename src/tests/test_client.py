@@ -0,0 +1,44 @@
+# tests/test_client.py
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from lol_api.client import LiveClientAPI
+
+
+def test_get_reuses_session():
+    client = LiveClientAPI(base_url="https://127.0.0.1:2999/liveclientdata")
+    mock_res = MagicMock()
+    mock_res.content = b"{\"ok\": true}"
+
+    with patch.object(client.session, "get", return_value=mock_res) as mock_get:
+        assert client.get("eventdata") == {"ok": True}
+        assert client.get("eventdata", params={"eventID": 3}) == {"ok": True}
+
+    assert mock_get.call_count == 2
+    url = mock_get.call_args.args[0]
+    assert url == "https://127.0.0.1:2999/liveclientdata/eventdata"
+    assert mock_get.call_args.kwargs["params"] == {"eventID": 3}
+
+
+@pytest.mark.asyncio
+async def test_get_async_returns_json():
+    client = LiveClientAPI()
+    mock_res = MagicMock()
+    mock_res.content = b"{\"Events\": []}"
+
+    with patch.object(client.session, "get", return_value=mock_res):
+        assert await client.get_async("eventdata") == {"Events": []}
+
+
+def test_is_running_false_on_error():
+    client = LiveClientAPI()
+    with patch.object(client.session, "get", side_effect=Exception("refused")):
+        assert client.is_running() is False
+
+
+def test_json_codec_decodes_bytes_and_str():
+    from utils.json_codec import loads, BACKEND
+    assert BACKEND in ("orjson", "msgspec", "json")
+    assert loads(b'{"a": [1, 2.5, null]}') == {"a": [1, 2.5, None]}
+    assert loads('{"名前": "Akari"}') == {"名前": "Akari"}
@@ -0,0 +1,125 @@
+# tests/test_detectors.py
+
+import pytest
+
+from utils.event_types import CustomEventType
+from lol_api.fetcher import LiveClientSnapshot
+from lol_api.models import GameState
+from lol_api.teamfight import TeamFightScoring
+from lol_api.custom_events import CustomEventPoller
+from lol_api.detectors import (
+    Detector, TeamFightEventDetector, GoldSpikeDetector, SoloBaronDetector, ComebackDetector, detectors_from_config,
+)
+
+
+def all_game_data(game_time=100.0, gold=0.0, kills=(0, 0), events=(), health=1000.0):
+    return {
+        "activePlayer": {"summonerName": "Akari", "currentGold": gold},
+        "allPlayers": [
+            {"summonerName": "Akari", "team": "ORDER", "scores": {"kills": kills[0]},
+             "championStats": {"currentHealth": health, "maxHealth": 1000.0}},
+            {"summonerName": "Kokage", "team": "CHAOS", "scores": {"kills": kills[1]},
+             "championStats": {"currentHealth": 1000.0, "maxHealth": 1000.0}},
+        ],
+        "events": {"Events": list(events)},
+        "gameData": {"gameTime": game_time},
+    }
+
+
+def game(**kwargs):
+    return GameState.from_dict(all_game_data(**kwargs))
+
+
+def test_gold_spike_counts_only_gains_in_window():
+    detector = GoldSpikeDetector(window=10, threshold=1000)
+    assert detector.update(game(game_time=0, gold=0)) is None
+    assert detector.update(game(game_time=2, gold=600)) is None
+    # 買い物で減った分は差し引かない
+    assert detector.update(game(game_time=3, gold=100)) is None
+    assert detector.update(game(game_time=5, gold=600)) == {"GoldEarned": 1100, "Window": 10}
+    # 出したあとは数え直し
+    assert detector.update(game(game_time=6, gold=700)) is None
+
+
+def test_gold_spike_forgets_old_gains():
+    detector = GoldSpikeDetector(window=10, threshold=1000)
+    detector.update(game(game_time=0, gold=0))
+    detector.update(game(game_time=1, gold=600))
+    assert detector.update(game(game_time=12, gold=1100)) is None
+
+
+def test_solo_baron_needs_own_kill_without_assists():
+    detector = SoloBaronDetector()
+    baron = {"EventID": 1, "EventName": "BaronKill", "EventTime": 1200.0, "KillerName": "Akari", "Assisters": []}
+    helped = dict(baron, EventID=2, Assisters=["Kokage"])
+
+    assert detector.update(game(events=[helped])) is None
+    assert detector.update(game(events=[helped, baron]))["EventID"] == 1
+    # 同じイベントは2回出さない
+    assert detector.update(game(events=[helped, baron])) is None
+
+
+def test_comeback_fires_once_after_catching_up():
+    detector = ComebackDetector(deficit=3)
+    assert detector.update(game(kills=(1, 4))) is None
+    assert detector.update(game(kills=(3, 4))) is None
+    assert detector.update(game(kills=(4, 4))) == {"MaxDeficit": 3, "Kills": {"ours": 4, "theirs": 4}}
+    assert detector.update(game(kills=(5, 4))) is None
+
+
+def test_team_fight_is_edge_triggered():
+    detector = TeamFightEventDetector(TeamFightScoring(window=3, health_change_threshold=0.3))
+    assert detector.update(game(health=1000.0)) is None
+    assert detector.update(game(health=500.0)) is not None
+    assert detector.update(game(health=100.0)) is None
+
+
+def test_detectors_from_config_reads_sections():
+    detectors = detectors_from_config({"detectors": {"gold_spike": {"threshold": 500}, "comeback": {"deficit": 2}}})
+    gold_spike = next(d for d in detectors if isinstance(d, GoldSpikeDetector))
+    comeback = next(d for d in detectors if isinstance(d, ComebackDetector))
+    assert gold_spike.threshold == 500
+    assert comeback.deficit == 2
+
+
+class RecordingDispatcher:
+    def __init__(self):
+        self.events = []
+
+    async def dispatch(self, event_type, data):
+        self.events.append((event_type, data))
+
+
+@pytest.mark.asyncio
+async def test_poller_dispatches_detector_event_type():
+    dispatcher = RecordingDispatcher()
+    poller = CustomEventPoller(dispatcher, [GoldSpikeDetector(window=10, threshold=1000)])
+
+    await poller.handle_snapshot(LiveClientSnapshot(1, {"allgamedata": all_game_data(game_time=1, gold=0)}, {}))
+    await poller.handle_snapshot(LiveClientSnapshot(2, {"allgamedata": all_game_data(game_time=2, gold=1500)}, {}))
+
+    (event_type, event), = dispatcher.events
+    assert event_type == CustomEventType.GOLD_SPIKE
+    assert event["EventName"] == "gold_spike"
+    assert "KillerName" not in event
+    assert event["GoldEarned"] == 1500
+
+
+@pytest.mark.asyncio
+async def test_poller_keeps_killer_name_from_detector():
+    dispatcher = RecordingDispatcher()
+    poller = CustomEventPoller(dispatcher, [SoloBaronDetector()])
+    baron = {"EventID": 1, "EventName": "BaronKill", "EventTime": 1200.0, "KillerName": "Akari", "Assisters": []}
+
+    await poller.handle_snapshot(LiveClientSnapshot(1, {"allgamedata": all_game_data(events=[baron])}, {}))
+
+    (_, event), = dispatcher.events
+    assert event["KillerName"] == "Akari"
+
+
+def test_detector_without_update_fails_when_built():
+    class Forgetful(Detector):
+        event_type = CustomEventType.GOLD_SPIKE
+
+    with pytest.raises(TypeError):
+        Forgetful()
@@ -1,11 +1,12 @@
 import pytest
-import zipfile
 import tempfile
 import shutil
 import os
-import json
+import asyncio
+import time
 from unittest.mock import patch
-from dump import poll_once, dump_zip, BUFFER
+from dump import poll_once, main_loop, ENDPOINTS, stop_event
+from utils.recording import RecordingWriter, read_records
 
 @pytest.fixture
 def temp_output_dir():
@@ -13,46 +14,65 @@ def temp_output_dir():
     yield path
     shutil.rmtree(path)
 
-@patch("dump.requests.get")
-def test_poll_once_collects_data(mock_get):
-    # モックレスポンスを設定
-    def mock_response(url, timeout):
-        class MockResp:
-            def raise_for_status(self): pass
-            def json(self):
-                if "allgamedata" in url:
-                    return {"gameData": {"gameEnded": False}}
-                return {"data": "test"}
-        return MockResp()
-    mock_get.side_effect = mock_response
-
-    # バッファクリア
-    for ep in BUFFER:
-        BUFFER[ep] = []
-
-    poll_once()
-
-    # 各エンドポイントにデータが1件追加されたか確認
-    for ep in BUFFER:
-        assert len(BUFFER[ep]) == 1
-        ts, data = BUFFER[ep][0]
-        assert isinstance(ts, str)
-        assert isinstance(data, dict)
-
-@patch("dump.BUFFER", {ep: [("20250101_000000_000", {"foo": "bar"})] for ep in [
-    "allgamedata", "eventdata", "playerlist", "activeplayer", "activeplayerabilities"
-]})
-def test_dump_zip_creates_valid_zip(temp_output_dir):
-    zip_path = os.path.join(temp_output_dir, "test_output.zip")
-    dump_zip(zip_path)
-
-    assert os.path.exists(zip_path)
-    with zipfile.ZipFile(zip_path, 'r') as zipf:
-        names = zipf.namelist()
-        # すべてのエンドポイント分のファイルがあるか
-        for ep in BUFFER.keys():
-            expected = f"{ep}/20250101_000000_000.json"
-            assert expected in names
-            with zipf.open(expected) as f:
-                content = json.load(f)
-                assert content["foo"] == "bar"
+class FakeClient:
+    def __init__(self, delay=0.05, failing=()):
+        self.delay = delay
+        self.failing = failing
+
+    async def get_async(self, ep, timeout=None):
+        await asyncio.sleep(self.delay)
+        if ep in self.failing:
+            raise ConnectionError(ep)
+        if ep == "allgamedata":
+            return {"gameData": {"gameEnded": False}}
+        return {"data": "test"}
+
+@pytest.mark.asyncio
+async def test_poll_once_fetches_concurrently(temp_output_dir):
+    path = os.path.join(temp_output_dir, "dump.jsonl.gz")
+    with RecordingWriter(path) as recorder:
+        started = time.perf_counter()
+        await poll_once(recorder, FakeClient(delay=0.05, failing=("playerlist",)), captured_at=123.0)
+        elapsed = time.perf_counter() - started
+
+    # 5本を順番に取ると0.25秒かかるけど、同時に取るので1本分で済む
+    assert elapsed < 0.15
+    records = list(read_records(path))
+    assert [r["ep"] for r in records] == [ep for ep in ENDPOINTS if ep != "playerlist"]
+    for record in records:
+        # 同じティックのレコードは同じ取得時刻で、リクエストごとのレイテンシつき
+        assert record["t"] == 123.0
+        assert 0.04 <= record["latency"] < 0.15
+        assert isinstance(record["data"], dict)
+    assert not stop_event.is_set()
+
+@pytest.mark.asyncio
+async def test_main_loop_keeps_fixed_rate(temp_output_dir):
+    path = os.path.join(temp_output_dir, "dump.jsonl.gz")
+    with patch("dump.get_client", return_value=FakeClient(delay=0.02)):
+        loop = asyncio.create_task(main_loop(path, rate=20))
+        await asyncio.sleep(0.5)
+        stop_event.set()
+        await loop
+    stop_event.clear()
+
+    times = sorted({r["t"] for r in read_records(path)})
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    # 取得に0.02秒かかっても間隔は0.05秒のまま（ずれが積み重ならない）
+    assert 8 <= len(times) <= 11
+    assert abs(sum(gaps) / len(gaps) - 0.05) < 0.01
+
+def test_recording_appends_and_survives_truncation(temp_output_dir):
+    path = os.path.join(temp_output_dir, "dump.jsonl.gz")
+    with RecordingWriter(path) as recorder:
+        recorder.write("eventdata", {"Events": []}, captured_at=1.0)
+    # 同じファイルに書き足しても前の分は消えない
+    recorder = RecordingWriter(path, flush_interval=0)
+    recorder.write("allgamedata", {"foo": "bar"}, captured_at=2.0, latency=0.01)
+    recorder.write("allgamedata", {"foo": "baz"}, captured_at=3.0)
+
+    # close せずに落ちた状態（最後の gzip メンバーが閉じていない）でも読める
+    records = list(read_records(path))
+    assert [r["t"] for r in records] == [1.0, 2.0, 3.0]
+    assert records[1] == {"t": 2.0, "ep": "allgamedata", "data": {"foo": "bar"}, "latency": 0.01}
+    recorder.close()
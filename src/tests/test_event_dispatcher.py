@@ -2,6 +2,7 @@
 
 import pytest
 import asyncio
+from unittest.mock import patch
 from utils.event_dispatcher import EventDispatcher
 from utils.event_types import EventType
 
@@ -64,4 +65,186 @@ async def test_dispatch_handles_exception(caplog):
     await dispatcher.dispatch("ErrorEvent", {})
     await asyncio.sleep(0.1)
 
-    assert any("RuntimeError" in r.message for r in caplog.records)
\ No newline at end of file
+    assert any("RuntimeError" in r.message for r in caplog.records)
+
+@pytest.mark.asyncio
+async def test_queued_dispatch_does_not_wait_for_handler():
+    dispatcher = EventDispatcher(queue_size=4)
+    done = asyncio.Event()
+
+    async def slow_handler(event):
+        await asyncio.sleep(0.05)
+        done.set()
+
+    dispatcher.register("SlowEvent", slow_handler)
+    await asyncio.wait_for(dispatcher.dispatch("SlowEvent", {}), timeout=0.01)
+    assert not done.is_set()
+    await asyncio.wait_for(done.wait(), timeout=1)
+    await dispatcher.close()
+
+
+@pytest.mark.asyncio
+async def test_queued_slow_handler_does_not_block_others():
+    dispatcher = EventDispatcher(queue_size=4)
+    release = asyncio.Event()
+    calls = []
+
+    async def stuck_handler(event):
+        await release.wait()
+
+    async def fast_handler(event):
+        calls.append(event["n"])
+
+    dispatcher.register("Event", stuck_handler)
+    dispatcher.register("Event", fast_handler)
+    for n in range(3):
+        await dispatcher.dispatch("Event", {"n": n})
+    await asyncio.sleep(0.01)
+
+    assert calls == [0, 1, 2]
+    release.set()
+    await dispatcher.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("overflow, expected", [
+    ("drop_oldest", [0, 2, 3]),
+    ("drop_newest", [0, 1, 2]),
+    ("merge", [0, 1, 3]),
+])
+async def test_queued_overflow_policies(overflow, expected):
+    dispatcher = EventDispatcher(queue_size=2, overflow=overflow)
+    release = asyncio.Event()
+    calls = []
+
+    async def handler(event):
+        await release.wait()
+        calls.append(event["n"])
+
+    dispatcher.register("Event", handler)
+    # 0番はワーカーが取り出して処理中、残りがキューにたまる
+    await dispatcher.dispatch("Event", {"n": 0})
+    await asyncio.sleep(0)
+    for n in range(1, 4):
+        await dispatcher.dispatch("Event", {"n": n})
+    release.set()
+    await asyncio.sleep(0.01)
+
+    assert calls == expected
+    await dispatcher.close()
+
+
+@pytest.mark.asyncio
+async def test_queued_block_applies_backpressure():
+    dispatcher = EventDispatcher(queue_size=1, overflow="block")
+    release = asyncio.Event()
+    calls = []
+
+    async def handler(event):
+        await release.wait()
+        calls.append(event["n"])
+
+    dispatcher.register("Event", handler)
+    await dispatcher.dispatch("Event", {"n": 0})
+    await asyncio.sleep(0)
+    await dispatcher.dispatch("Event", {"n": 1})
+    blocked = asyncio.create_task(dispatcher.dispatch("Event", {"n": 2}))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    release.set()
+    await asyncio.wait_for(blocked, timeout=1)
+    await asyncio.sleep(0.01)
+    assert calls == [0, 1, 2]
+    await dispatcher.close()
+
+
+@pytest.mark.asyncio
+async def test_queued_handler_exception_is_logged(caplog):
+    dispatcher = EventDispatcher(queue_size=4)
+
+    async def faulty_handler(event):
+        raise RuntimeError("Oops!")
+
+    dispatcher.register("ErrorEvent", faulty_handler)
+    await dispatcher.dispatch("ErrorEvent", {})
+    await asyncio.sleep(0.01)
+
+    assert any("RuntimeError" in r.message for r in caplog.records)
+    await dispatcher.close()
+
+
+def test_from_config_and_unknown_policy():
+    dispatcher = EventDispatcher.from_config({"dispatcher": {"queue_size": 8, "concurrency": 2, "overflow": "merge"}})
+    assert (dispatcher.queue_size, dispatcher.concurrency, dispatcher.overflow) == (8, 2, "merge")
+    # セクションがない古い config.json でも、dispatch がハンドラを待たないキューありになる
+    default = EventDispatcher.from_config({})
+    assert (default.queue_size, default.concurrency, default.overflow) == (32, 4, "drop_oldest")
+    with pytest.raises(ValueError):
+        EventDispatcher(overflow="explode")
+
+
+@pytest.mark.asyncio
+async def test_enum_and_string_names_share_subscriptions():
+    dispatcher = EventDispatcher()
+    calls = []
+
+    async def handler(event):
+        calls.append(event)
+
+    dispatcher.register(EventType.CHAMPION_KILL, handler)
+    await dispatcher.dispatch("ChampionKill", {"n": 1})
+    assert calls == [{"n": 1}]
+
+
+@pytest.mark.asyncio
+async def test_filters_skip_non_matching_events():
+    from utils.option import Some, None_
+    dispatcher = EventDispatcher()
+    active_player = Some("Akari")
+    calls = []
+
+    async def handler(event):
+        calls.append(event["n"])
+
+    dispatcher.register("ChampionKill", handler, killer=lambda: active_player)
+    dispatcher.register("ChampionKill", handler, victim="Akari", predicate=lambda e: e["n"] > 2)
+    dispatcher.register("Ace", handler, team="ORDER")
+    dispatcher.register("ChampionKill", handler, team="CHAOS")
+
+    with patch("utils.event_dispatcher.asyncio.create_task", wraps=asyncio.create_task) as create_task:
+        await dispatcher.dispatch("ChampionKill", {"n": 1, "KillerName": "Someone", "VictimName": "Akari"})
+        assert create_task.call_count == 0
+
+    await dispatcher.dispatch("ChampionKill", {"n": 2, "KillerName": "Akari", "VictimName": "Someone"})
+    await dispatcher.dispatch("ChampionKill", {"n": 3, "KillerName": "Someone", "VictimName": "Akari"})
+    await dispatcher.dispatch("Ace", {"n": 4, "AcingTeam": "ORDER"})
+    await dispatcher.dispatch("Ace", {"n": 5, "AcingTeam": "CHAOS"})
+    # アクティブプレイヤーがまだ分からないときは自分のキル扱いしない
+    active_player = None_()
+    await dispatcher.dispatch("ChampionKill", {"n": 6, "KillerName": None})
+    # ChampionKill は LLEventPoller が付けた KillerTeam で比べる
+    await dispatcher.dispatch("ChampionKill", {"n": 7, "KillerName": "Kokage", "KillerTeam": "CHAOS"})
+    await dispatcher.dispatch("ChampionKill", {"n": 8, "KillerName": "Someone", "KillerTeam": "ORDER"})
+
+    assert calls == [2, 3, 4, 7]
+
+
+@pytest.mark.asyncio
+async def test_wildcard_subscription():
+    dispatcher = EventDispatcher()
+    calls = []
+
+    async def handler(event):
+        calls.append(event["n"])
+
+    dispatcher.register("*Steal", handler)
+    await dispatcher.dispatch(EventType.DRAGON_STEAL, {"n": 1})
+    await dispatcher.dispatch(EventType.BARON_STEAL, {"n": 2})
+    await dispatcher.dispatch(EventType.DRAGON_KILL, {"n": 3})
+
+    # 後から登録したワイルドカードもちゃんと効く
+    dispatcher.register("Dragon*", handler)
+    await dispatcher.dispatch(EventType.DRAGON_KILL, {"n": 4})
+
+    assert calls == [1, 2, 4]
@@ -0,0 +1,199 @@
+# tests/test_fetcher.py
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from lol_api.client import LiveClientAPI
+from lol_api.fetcher import LiveClientFetcher
+
+
+def fake_client(side_effect=None):
+    client = MagicMock(spec=LiveClientAPI)
+
+    async def get_async(endpoint, params=None, timeout=None):
+        return {"url": f"/{endpoint}"}
+
+    client.get_async = AsyncMock(side_effect=side_effect or get_async)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_fetch_once_fetches_each_endpoint_once():
+    client = fake_client()
+    fetcher = LiveClientFetcher(client)
+    fetcher.subscribe(["allgamedata"], MagicMock())
+    fetcher.subscribe(["allgamedata", "eventdata"], MagicMock())
+
+    snapshot = await fetcher.fetch_once()
+
+    assert client.get_async.await_count == 2
+    assert snapshot.get("allgamedata").unwrap()["url"].endswith("/allgamedata")
+    assert snapshot.get("eventdata").is_some()
+
+
+@pytest.mark.asyncio
+async def test_publish_shares_same_snapshot():
+    fetcher = LiveClientFetcher(fake_client())
+    received = []
+
+    async def handler_a(snapshot):
+        received.append(snapshot.get("allgamedata").unwrap())
+
+    async def handler_b(snapshot):
+        received.append(snapshot.get("allgamedata").unwrap())
+
+    fetcher.subscribe(["allgamedata"], handler_a)
+    fetcher.subscribe(["allgamedata"], handler_b)
+
+    snapshot = await fetcher.fetch_once()
+    await fetcher.publish(snapshot)
+
+    assert len(received) == 2
+    assert received[0] is received[1]
+
+
+@pytest.mark.asyncio
+async def test_publish_skips_subscriber_when_endpoint_failed():
+    fetcher = LiveClientFetcher(fake_client(side_effect=Exception("No connection")))
+    called = False
+
+    async def handler(snapshot):
+        nonlocal called
+        called = True
+
+    fetcher.subscribe(["eventdata"], handler)
+
+    snapshot = await fetcher.fetch_once()
+    await fetcher.publish(snapshot)
+
+    assert "eventdata" in snapshot.errors
+    assert called is False
+
+
+@pytest.mark.asyncio
+async def test_run_probes_only_while_client_is_down():
+    client = fake_client()
+    client.is_running_async = AsyncMock(return_value=True)
+    fetcher = LiveClientFetcher(client, interval=0.01)
+    ticks = []
+
+    async def handler(snapshot):
+        ticks.append(snapshot.tick)
+        if len(ticks) >= 3:
+            fetcher.stop()
+
+    fetcher.subscribe(["eventdata"], handler)
+    await fetcher.run()
+
+    # 起動確認は最初の1回だけで、あとはデータ取得の結果で判定する
+    client.is_running_async.assert_awaited_once()
+    assert ticks == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_fetch_once_passes_endpoint_params():
+    client = fake_client()
+    fetcher = LiveClientFetcher(client)
+    fetcher.subscribe(["eventdata"], MagicMock(), params={"eventdata": lambda: {"eventID": 5}})
+
+    await fetcher.fetch_once()
+
+    client.get_async.assert_awaited_once_with("eventdata", {"eventID": 5})
+
+
+class FakeGame:
+    """
+    allgamedata と eventID付きの eventdata を返す偽クライアント。outage の間のティックは失敗する。
+    """
+    def __init__(self, events, outage=()):
+        self.events = events
+        self.outage = set(outage)
+        self.game_time = 100.0
+        self.calls = 0
+
+    async def get_async(self, endpoint, params=None, timeout=None):
+        if endpoint == "allgamedata":
+            self.calls += 1
+            self.game_time += 1.0
+        if self.calls in self.outage:
+            raise TimeoutError("timed out")
+        if endpoint == "allgamedata":
+            return {"gameData": {"gameTime": self.game_time}, "events": {"Events": self.events}}
+        start = (params or {}).get("eventID", 0)
+        return {"Events": [e for e in self.events if e["EventID"] >= start]}
+
+
+@pytest.mark.asyncio
+async def test_short_outage_keeps_cursor_and_state():
+    from lol_api.events import LLEventPoller
+
+    game = FakeGame([{"EventID": i, "EventName": "ChampionKill", "EventTime": float(i)} for i in range(5)],
+                    outage=(3, 4))
+    client = fake_client(side_effect=game.get_async)
+    client.is_running_async = AsyncMock(return_value=True)
+    fetcher = LiveClientFetcher(client, interval=0.0)
+    dispatcher = MagicMock()
+    dispatcher.dispatch = AsyncMock()
+    poller = LLEventPoller(dispatcher)
+    resets = []
+    downs = []
+
+    async def stop_after(snapshot):
+        if game.calls >= 8:
+            fetcher.stop()
+
+    fetcher.subscribe(["allgamedata"], stop_after, on_reset=lambda: resets.append(True),
+                      on_down=lambda: downs.append(True))
+    fetcher.subscribe(poller.endpoints, poller.handle_snapshot,
+                      params={"eventdata": poller.query_params}, on_reset=poller.reset)
+    await fetcher.run()
+
+    # 2ティック続けて失敗して一度DOWNになっても、同じゲームなので巻き戻さない
+    assert fetcher.liveness.is_up()
+    assert downs == [True]
+    assert resets == []
+    assert [c.args[1]["EventID"] for c in dispatcher.dispatch.await_args_list] == [0, 1, 2, 3, 4]
+
+
+def test_rewound_game_time_or_fewer_events_is_new_game():
+    from lol_api.fetcher import LiveClientSnapshot
+
+    def snapshot(game_time, events):
+        return LiveClientSnapshot(1, {"allgamedata": {"gameData": {"gameTime": game_time},
+                                                      "events": {"Events": [{}] * events}}}, {})
+
+    fetcher = LiveClientFetcher(fake_client())
+    assert fetcher.is_new_game(snapshot(1500.0, 40)) is False
+    assert fetcher.is_new_game(snapshot(1500.5, 40)) is False
+    assert fetcher.is_new_game(snapshot(3.0, 1)) is True
+    assert fetcher.is_new_game(snapshot(10.0, 0)) is True
+    assert fetcher.is_new_game(snapshot(12.0, 2)) is False
+
+
+@pytest.mark.asyncio
+async def test_slow_event_handler_does_not_stall_other_subscribers():
+    import asyncio
+    from utils.event_dispatcher import EventDispatcher
+
+    dispatcher = EventDispatcher.from_config({})
+    dispatcher.register("ChampionKill", lambda event: asyncio.sleep(3.0))
+    client = fake_client()
+    client.is_running_async = AsyncMock(return_value=True)
+    fetcher = LiveClientFetcher(client, interval=0.01)
+    ticks = []
+
+    async def dispatch_kill(snapshot):
+        await dispatcher.dispatch("ChampionKill", {"EventName": "ChampionKill"})
+
+    async def count(snapshot):
+        ticks.append(snapshot.tick)
+
+    fetcher.subscribe(["eventdata"], dispatch_kill)
+    fetcher.subscribe(["allgamedata"], count)
+    run = asyncio.create_task(fetcher.run())
+    await asyncio.sleep(0.2)
+    fetcher.stop()
+    await asyncio.wait_for(run, 1.0)
+    await dispatcher.close()
+
+    assert len(ticks) >= 5
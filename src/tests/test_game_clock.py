@@ -0,0 +1,51 @@
+# tests/test_game_clock.py
+
+import pytest
+
+from lol_api.fetcher import LiveClientSnapshot
+from lol_api.game_clock import GameClock
+
+
+def test_unknown_until_first_sample():
+    clock = GameClock()
+    assert clock.to_monotonic(100.0).is_none()
+    clock.observe(100.0, at=1000.0)
+    assert clock.to_monotonic(105.0).unwrap() == 1005.0
+
+
+def test_fit_averages_out_poll_jitter():
+    clock = GameClock(window=10)
+    # 取得時刻が ±0.4秒ばらついても、真ん中の直線に寄る
+    jitter = [0.4, -0.4, 0.2, -0.2, 0.3, -0.3, 0.1, -0.1]
+    for i, j in enumerate(jitter):
+        clock.observe(100.0 + i, at=5000.0 + i + j)
+    assert clock.to_monotonic(110.0).unwrap() == pytest.approx(5010.0, abs=0.2)
+    assert clock.drift == pytest.approx(1.0, abs=0.1)
+
+
+def test_fit_follows_replay_speed():
+    clock = GameClock()
+    for i in range(5):
+        clock.observe(100.0 + 10 * i, at=50.0 + i)
+    assert clock.drift == pytest.approx(10.0)
+    assert clock.to_monotonic(150.0).unwrap() == pytest.approx(55.0)
+
+
+def test_jump_restarts_fit():
+    clock = GameClock(max_residual=1.0)
+    for i in range(5):
+        clock.observe(100.0 + i, at=10.0 + i)
+    # 一時停止明けなどで大きくずれたら古いサンプルは捨てる
+    clock.observe(100.0, at=30.0)
+    assert clock.to_monotonic(102.0).unwrap() == pytest.approx(32.0)
+
+    clock.reset()
+    assert clock.to_monotonic(102.0).is_none()
+
+
+@pytest.mark.asyncio
+async def test_handle_snapshot_uses_fetch_time():
+    clock = GameClock()
+    snapshot = LiveClientSnapshot(1, {"allgamedata": {"gameData": {"gameTime": 60.0}}}, {}, fetched_at=200.0)
+    await clock.handle_snapshot(snapshot)
+    assert clock.game_time_at(201.0).unwrap() == 61.0
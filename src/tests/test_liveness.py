@@ -0,0 +1,31 @@
+# tests/test_liveness.py
+
+from lol_api.liveness import ClientLiveness, ClientState
+
+def test_success_marks_up():
+    liveness = ClientLiveness()
+    assert liveness.state == ClientState.UNKNOWN
+    assert liveness.record_success() is True
+    assert liveness.is_up()
+    assert liveness.record_success() is False
+
+def test_single_failure_while_up_is_tolerated():
+    liveness = ClientLiveness(failure_threshold=2)
+    liveness.record_success()
+    assert liveness.record_failure() is False
+    assert liveness.is_up()
+    assert liveness.record_failure() is True
+    assert liveness.state == ClientState.DOWN
+
+def test_probe_interval_backs_off_and_resets():
+    liveness = ClientLiveness(initial_probe_interval=1.0, max_probe_interval=4.0)
+    liveness.record_failure()
+    assert liveness.state == ClientState.DOWN
+    intervals = []
+    for _ in range(4):
+        liveness.record_failure()
+        intervals.append(liveness.probe_interval)
+    assert intervals == [2.0, 4.0, 4.0, 4.0]
+
+    liveness.record_success()
+    assert liveness.probe_interval == 1.0
@@ -3,21 +3,77 @@
 import pytest
 import asyncio
 from unittest.mock import patch, AsyncMock, MagicMock
-from main import trigger_replay, dispatcher, CONFIG
+from main import trigger_replay, register_triggers, dispatcher, CONFIG
+from utils.event_dispatcher import EventDispatcher
+from utils.event_types import EventType, CustomEventType, ChangeEventType
+from lol_api.player import active_player
 from utils.option import Some, None_
 
-@patch("main.get_active_player_name", return_value=Some("Akari"))
 @patch("main.trigger_replay_buffer", new_callable=AsyncMock)
 @pytest.mark.asyncio
-async def test_trigger_replay_calls_obs(mock_trigger, mock_player):
+async def test_trigger_replay_calls_obs(mock_trigger):
     event = {"KillerName": "Akari"}
     await trigger_replay(event, delay=0.01, message="test message")
+    # 予約するだけですぐ戻って、保存は裏で行われる
+    mock_trigger.assert_not_awaited()
+    await asyncio.sleep(0.05)
     mock_trigger.assert_awaited_once()
 
-@patch("main.get_active_player_name", return_value=Some("NotAkari"))
-@patch("main.trigger_replay_buffer", new_callable=AsyncMock)
 @pytest.mark.asyncio
-async def test_trigger_replay_not_matching_player(mock_trigger, mock_player):
-    event = {"KillerName": "SomeoneElse"}
-    await trigger_replay(event, delay=0.01, message="test message")
-    mock_trigger.assert_not_awaited()
+async def test_trigger_replay_not_matching_player():
+    # 自分じゃないキルは登録時のフィルタで落とされて、ハンドラまで届かない
+    local_dispatcher = EventDispatcher()
+    handler = AsyncMock()
+    local_dispatcher.register(EventType.CHAMPION_KILL, handler, killer=lambda: Some("NotAkari"))
+
+    await local_dispatcher.dispatch(EventType.CHAMPION_KILL, {"KillerName": "SomeoneElse"})
+    handler.assert_not_awaited()
+
+@patch("main.trigger_replay", new_callable=AsyncMock)
+@pytest.mark.asyncio
+async def test_register_triggers_filters_each_kind_of_event(mock_trigger):
+    local_dispatcher = EventDispatcher()
+    register_triggers(local_dispatcher, {"trigger_events": {
+        "ChampionKill": True, "PlayerDeath": True, "Ace": True, "LevelUp": True, "Teambattle": True,
+        "Multikill": False,
+    }})
+    active_player.update({"riotId": "Akari#JP1"})
+    try:
+        cases = [
+            # キルは自分がキラーのときだけ
+            (EventType.CHAMPION_KILL, {"KillerName": "Akari", "VictimName": "Kokage"}, "自分がキルしたよ！"),
+            (EventType.CHAMPION_KILL, {"KillerName": "Kokage", "VictimName": "Akari"}, None),
+            # デスは自分が被害者のときだけ
+            (EventType.PLAYER_DEATH, {"KillerName": "Kokage", "VictimName": "Akari"}, "自分がデスしたよ！"),
+            (EventType.PLAYER_DEATH, {"KillerName": "Akari", "VictimName": "Kokage"}, None),
+            # エースは Acer で見る
+            (EventType.ACE, {"Acer": "Akari#JP1", "AcingTeam": "ORDER"}, "自分がエースしたよ！"),
+            (EventType.ACE, {"Acer": "Kokage", "AcingTeam": "CHAOS"}, None),
+            # 変化イベントは PlayerName で見る
+            (ChangeEventType.LEVEL_UP, {"PlayerName": "Akari#JP1", "Level": 6}, "レベルアップしたよ！"),
+            (ChangeEventType.LEVEL_UP, {"PlayerName": "Kokage", "Level": 6}, None),
+            # カスタムイベントは絞り込まない
+            (CustomEventType.TEAM_FIGHT, {"HealthChangeRatio": 0.5}, "集団戦が起きたよ！"),
+            # 無効にしたイベントは登録しない
+            (EventType.MULTIKILL, {"KillerName": "Akari", "KillStreak": 2}, None),
+        ]
+        for event_type, event, message in cases:
+            mock_trigger.reset_mock()
+            await local_dispatcher.dispatch(event_type, event)
+            if message is None:
+                mock_trigger.assert_not_awaited()
+            else:
+                assert mock_trigger.await_args.args[2] == message
+    finally:
+        active_player.reset()
+
+@patch("main.save_scheduler")
+@patch("main.game_clock")
+@pytest.mark.asyncio
+async def test_trigger_replay_schedules_at_event_time(mock_clock, mock_scheduler):
+    mock_clock.to_monotonic.return_value = Some(1234.5)
+
+    await trigger_replay({"EventTime": 90.0}, delay=5.0, message="kill")
+
+    mock_clock.to_monotonic.assert_called_once_with(95.0)
+    assert mock_scheduler.book.call_args.kwargs["deadline"] == 1234.5
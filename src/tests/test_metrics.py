@@ -0,0 +1,29 @@
+# tests/test_metrics.py
+
+from utils.metrics import Histogram, LatencyTrace, MetricsRegistry
+
+def test_histogram_buckets_and_quantiles():
+    h = Histogram(buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 0.5, 3.0):
+        h.observe(v)
+    d = h.to_dict()
+    assert d["count"] == 4
+    assert d["buckets"] == {"0.1": 1, "1.0": 2, "+Inf": 1}
+    assert d["p50"] == 1.0
+    assert d["max"] == 3.0
+
+def test_latency_trace_stages():
+    trace = LatencyTrace("Ace", detected_at=10.0, game_lag=0.4)
+    trace.mark("dispatched", 10.1)
+    trace.mark("save_requested", 15.1)
+    trace.mark("save_acked", 15.2)
+    trace.mark("saved", 16.0)
+    latencies = trace.stage_latencies()
+    assert latencies["detection"] == 0.4
+    assert round(latencies["save_requested"], 3) == 5.0
+    assert round(latencies["total"], 3) == 6.4
+
+def test_registry_snapshot():
+    registry = MetricsRegistry()
+    registry.observe("latency.total", 1.5)
+    assert registry.snapshot()["latency.total"]["count"] == 1
@@ -0,0 +1,91 @@
+import json
+import threading
+import pytest
+import requests
+from http.server import ThreadingHTTPServer
+from unittest.mock import patch
+import mock
+from mock import ReplaySource
+from utils.recording import DeltaRecordingWriter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_allgamedata(t):
+    events = [{"EventID": n, "EventName": "ChampionKill", "EventTime": n * 10.0} for n in range(t // 10)]
+    return {
+        "activePlayer": {"summonerName": "Akari", "currentGold": t * 3.0},
+        "allPlayers": [{"summonerName": "Akari"}],
+        "events": {"Events": events},
+        "gameData": {"gameTime": float(t)},
+    }
+
+
+@pytest.fixture
+def recording(tmp_path):
+    path = str(tmp_path / "game.jsonl.gz")
+    with DeltaRecordingWriter(path, keyframe_interval=20.0) as recorder:
+        for t in range(100):
+            recorder.write("allgamedata", make_allgamedata(t), captured_at=500.0 + t)
+    return path
+
+
+def test_replay_follows_clock_with_speed(recording):
+    clock = FakeClock()
+    source = ReplaySource(recording, speed=10.0, clock=clock)
+    source.start()
+
+    assert json.loads(source.response("gamestats")) == {"gameTime": 0.0}
+    clock.now = 4.2
+    assert json.loads(source.response("gamestats")) == {"gameTime": 42.0}
+    assert json.loads(source.response("activeplayer"))["currentGold"] == 126.0
+    assert source.response("unknownendpoint") is None
+
+    # 最後まで行ったら先頭に戻らず最後の状態のまま
+    clock.now = 100.0
+    assert source.finished()
+    assert json.loads(source.response("gamestats")) == {"gameTime": 99.0}
+
+
+def test_replay_honors_event_id(recording):
+    clock = FakeClock()
+    source = ReplaySource(recording, speed=1.0, clock=clock)
+    source.start()
+    clock.now = 35.0
+
+    events = json.loads(source.response("eventdata"))["Events"]
+    assert [e["EventID"] for e in events] == [0, 1, 2]
+    events = json.loads(source.response("eventdata", {"eventID": "2"}))["Events"]
+    assert [e["EventID"] for e in events] == [2]
+
+
+def test_replay_speed_is_limited(recording):
+    with pytest.raises(ValueError):
+        ReplaySource(recording, speed=100.0)
+
+
+def test_replay_served_over_http(recording):
+    clock = FakeClock()
+    source = ReplaySource(recording, speed=1.0, clock=clock)
+    source.start()
+    clock.now = 12.0
+
+    with patch("mock.replay", source), patch("mock.VERBOSE", False):
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), mock.MockHandler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        host, port = httpd.server_address
+        try:
+            res = requests.get(f"http://{host}:{port}/liveclientdata/allgamedata", timeout=2)
+            missing = requests.get(f"http://{host}:{port}/liveclientdata/nothing", timeout=2)
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+
+    assert res.json() == make_allgamedata(12)
+    assert missing.status_code == 404
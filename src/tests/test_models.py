@@ -0,0 +1,52 @@
+from lol_api.fetcher import LiveClientSnapshot
+from lol_api.models import ActivePlayerState, GameState, PlayerState
+
+
+ALL_GAME_DATA = {
+    "activePlayer": {"summonerName": "Akari#JP1", "riotId": "Akari#JP1", "riotIdGameName": "Akari",
+                     "currentGold": 1234.5, "level": 7},
+    "allPlayers": [
+        {"summonerName": "Akari", "riotId": "Akari#JP1", "team": "ORDER", "level": 7, "isDead": True,
+         "respawnTimer": 12.5, "championStats": {"currentHealth": 0.0, "maxHealth": 900.0},
+         "items": [{"itemID": 3031}, {"itemID": 1055}], "scores": {"kills": 3, "deaths": 1, "creepScore": 80}},
+        {"summonerName": "Kokage", "team": "CHAOS"},
+    ],
+    "events": {"Events": [{"EventID": 0, "EventName": "GameStart", "EventTime": 0.0},
+                          {"EventID": 1, "EventName": "ChampionKill", "EventTime": 90.0,
+                           "KillerName": "Kokage", "VictimName": "Akari", "Assisters": []}]},
+    "gameData": {"gameTime": 100.0},
+}
+
+
+def test_game_state_keeps_detector_fields():
+    game = GameState.from_dict(ALL_GAME_DATA)
+
+    assert game.game_time == 100.0
+    assert game.active_player.gold == 1234.5
+    akari, kokage = game.players
+    assert (akari.name, akari.is_dead, akari.respawn_timer, akari.items) == ("Akari#JP1", True, 12.5, (3031, 1055))
+    assert (kokage.name, kokage.max_health, kokage.is_dead) == ("Kokage", 1.0, True)
+    assert game.active_player_state() is akari
+
+    assert game.event_count == 2
+    (kill,) = game.events_from(1)
+    assert (kill.event_id, kill.name, kill.killer, kill.victim) == (1, "ChampionKill", "Kokage", "Akari")
+
+
+def test_names_include_name_part_of_riot_id():
+    player = PlayerState.from_dict({"riotId": "Kokage#KR1", "team": "CHAOS"})
+    me = ActivePlayerState.from_dict({"summonerName": "Akari#JP1"})
+
+    assert player.names == {"Kokage#KR1", "Kokage"}
+    assert me.names == {"Akari#JP1", "Akari"}
+
+
+def test_states_use_slots():
+    player = PlayerState.from_dict({"summonerName": "Akari"})
+    assert not hasattr(player, "__dict__")
+
+
+def test_snapshot_decodes_game_once():
+    snapshot = LiveClientSnapshot(1, {"allgamedata": ALL_GAME_DATA}, {})
+    assert snapshot.game().unwrap() is snapshot.game().unwrap()
+    assert LiveClientSnapshot(1, {}, {}).game().is_none()
@@ -1,29 +1,87 @@
+import asyncio
+import json
 import pytest
 from unittest.mock import AsyncMock, patch
-from obs.obs_client import get_obs_connection, trigger_replay_buffer
-from utils.result import Result
+from obs.obs_client import OBSClient, OBSTargets, get_obs_connection, trigger_replay_buffer, make_auth_string
+from utils.metrics import LatencyTrace, metrics
 
 
-@pytest.mark.asyncio
-async def test_get_obs_connection_success():
-    fake_ws = AsyncMock()
-    fake_ws.open = True
+class FakeOBS:
+    """
+    OBS WebSocketサーバのふりをする偽物のソケット。
+    """
+    def __init__(self, failing_requests=(), delays=None, auth=None):
+        self.incoming = asyncio.Queue()
+        self.sent = []
+        self.failing_requests = failing_requests
+        self.delays = delays or {}
+        self.closed = False
+        hello = {"rpcVersion": 1}
+        if auth:
+            hello["authentication"] = auth
+        self.incoming.put_nowait(json.dumps({"op": 0, "d": hello}))
+
+    async def send(self, raw):
+        message = json.loads(raw)
+        self.sent.append(message)
+        op, d = message["op"], message["d"]
+        if op == 1:
+            self.incoming.put_nowait(json.dumps({"op": 2, "d": {"negotiatedRpcVersion": 1}}))
+        elif op == 6:
+            asyncio.get_running_loop().call_later(
+                self.delays.get(d["requestType"], 0),
+                self.incoming.put_nowait, json.dumps({"op": 7, "d": self._response(d)})
+            )
+            if d["requestType"] == "SaveReplayBuffer" and "SaveReplayBuffer" not in self.failing_requests:
+                asyncio.get_running_loop().call_later(
+                    self.delays.get(d["requestType"], 0) + 0.01,
+                    self.push_event, "ReplayBufferSaved", {"savedReplayPath": f"/clips/{len(self.sent)}.mkv"}
+                )
+        elif op == 8:
+            results = [self._response(r) for r in d["requests"]]
+            self.incoming.put_nowait(json.dumps({"op": 9, "d": {"requestId": d["requestId"], "results": results}}))
+
+    def _response(self, d):
+        ok = d["requestType"] not in self.failing_requests
+        return {
+            "requestType": d["requestType"],
+            "requestId": d.get("requestId"),
+            "requestStatus": {"result": ok, "code": 100 if ok else 500},
+            "responseData": {"echo": d["requestType"]},
+        }
+
+    def push_event(self, event_type, data):
+        self.incoming.put_nowait(json.dumps({"op": 5, "d": {"eventType": event_type, "eventData": data}}))
+
+    async def recv(self):
+        item = await self.incoming.get()
+        if isinstance(item, Exception):
+            raise item
+        return item
 
-    async def mock_recv():
-        return '{"op":2,"d":{"rpcVersion":1}}'
+    async def close(self):
+        self.closed = True
+        self.incoming.put_nowait(ConnectionError("closed"))
 
-    fake_ws.recv = mock_recv
 
-    with patch("obs.obs_client.websockets.connect", return_value=fake_ws):
+@pytest.mark.asyncio
+async def test_get_obs_connection_success():
+    fake_ws = FakeOBS()
+
+    with patch("obs.obs_client.default_client", OBSClient()), \
+            patch("obs.obs_client.websockets.connect", new=AsyncMock(return_value=fake_ws)):
         result = await get_obs_connection()
+        assert result.is_ok()
+        assert result.unwrap().is_connected()
+        await result.unwrap().close()
 
-    assert result.is_ok()
-    assert result.unwrap() == fake_ws
+    assert fake_ws.sent[0]["op"] == 1
 
 
 @pytest.mark.asyncio
 async def test_get_obs_connection_failure():
-    with patch("obs.obs_client.websockets.connect", side_effect=Exception("Connection failed")):
+    with patch("obs.obs_client.default_client", OBSClient()), \
+            patch("obs.obs_client.websockets.connect", side_effect=Exception("Connection failed")):
         result = await get_obs_connection()
     assert result.is_err()
     assert "Connection failed" in result.unwrap_err()
@@ -31,30 +89,265 @@ async def test_get_obs_connection_failure():
 
 @pytest.mark.asyncio
 async def test_trigger_replay_buffer_success():
-    fake_ws = AsyncMock()
-    fake_ws.open = True
-    fake_ws.recv = AsyncMock(side_effect=[
-        '{"op":2,"d":{"rpcVersion":1}}',  # Identify response
-        '{"op":7,"d":{"requestId":"saveReplay","requestType":"SaveReplayBuffer"}}'  # SaveReplayBuffer response
-    ])
-
-    with patch("obs.obs_client.websockets.connect", return_value=fake_ws):
+    fake_ws = FakeOBS()
+    client = OBSClient()
+
+    with patch("obs.obs_client.default_targets", OBSTargets([client])), \
+            patch("obs.obs_client.websockets.connect", new=AsyncMock(return_value=fake_ws)):
         result = await trigger_replay_buffer()
+        await client.close()
 
-    assert result.is_ok()
-    fake_ws.send.assert_any_call(
-        '{"op": 6, "d": {"requestType": "SaveReplayBuffer", "requestId": "saveReplay"}}'
-    )
+    assert result.unwrap() == "/clips/2.mkv"
+    request = fake_ws.sent[1]
+    assert request["op"] == 6
+    assert request["d"]["requestType"] == "SaveReplayBuffer"
+    assert request["d"]["requestId"]
 
 
 @pytest.mark.asyncio
 async def test_trigger_replay_buffer_failure():
-    fake_ws = AsyncMock()
-    fake_ws.open = True
-    fake_ws.recv = AsyncMock(side_effect=Exception("Send failed"))
+    fake_ws = FakeOBS(failing_requests=("SaveReplayBuffer",))
+    client = OBSClient()
 
-    with patch("obs.obs_client.websockets.connect", return_value=fake_ws):
+    with patch("obs.obs_client.default_targets", OBSTargets([client])), \
+            patch("obs.obs_client.websockets.connect", new=AsyncMock(return_value=fake_ws)):
         result = await trigger_replay_buffer()
+        await client.close()
+
+    assert result.is_err()
+    assert "SaveReplayBuffer" in result.unwrap_err()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_correlated_by_id():
+    # 先に送ったリクエストのほうが遅く返ってきて、間にイベントも挟まる
+    fake_ws = FakeOBS(delays={"GetVersion": 0.05})
+    client = OBSClient()
+    events = []
+    client.on_event("ReplayBufferSaved", events.append)
+
+    with patch("obs.obs_client.websockets.connect", new=AsyncMock(return_value=fake_ws)):
+        await client.connect()
+        fake_ws.push_event("ReplayBufferSaved", {"savedReplayPath": "/tmp/a.mkv"})
+        slow, fast = await asyncio.gather(client.call("GetVersion"), client.call("GetStats"))
+        await client.close()
+
+    assert slow.unwrap() == {"echo": "GetVersion"}
+    assert fast.unwrap() == {"echo": "GetStats"}
+    assert events == [{"savedReplayPath": "/tmp/a.mkv"}]
+
+
+@pytest.mark.asyncio
+async def test_call_batch_returns_result_per_request():
+    fake_ws = FakeOBS(failing_requests=("StopReplayBuffer",))
+    client = OBSClient()
+
+    with patch("obs.obs_client.websockets.connect", new=AsyncMock(return_value=fake_ws)):
+        result = await client.call_batch([("GetReplayBufferStatus", None), ("StopReplayBuffer", None)])
+        await client.close()
+
+    first, second = result.unwrap()
+    assert first.unwrap() == {"echo": "GetReplayBufferStatus"}
+    assert second.is_err()
+    assert fake_ws.sent[1]["op"] == 8
+
+
+@pytest.mark.asyncio
+async def test_pending_requests_fail_when_connection_drops():
+    fake_ws = FakeOBS(delays={"SaveReplayBuffer": 10})
+    client = OBSClient()
+
+    with patch("obs.obs_client.websockets.connect", new=AsyncMock(return_value=fake_ws)):
+        await client.connect()
+        call = asyncio.create_task(client.call("SaveReplayBuffer"))
+        await asyncio.sleep(0.01)
+        await client.close()
+        result = await call
+
+    assert result.is_err()
+    assert not client.is_connected()
+
+
+@pytest.mark.asyncio
+async def test_save_waits_for_replay_buffer_saved_and_records_latency():
+    fake_ws = FakeOBS()
+    client = OBSClient()
+    trace = LatencyTrace("ChampionKill", detected_at=0.0, game_lag=0.5)
+    before = metrics.histogram("latency.total.ChampionKill").count
+
+    with patch("obs.obs_client.websockets.connect", new=AsyncMock(return_value=fake_ws)):
+        trace.mark("dispatched")
+        result = await client.save_replay_buffer([trace])
+        await client.close()
+
+    assert result.unwrap() == "/clips/2.mkv"
+    assert trace.saved_path == "/clips/2.mkv"
+    assert trace.marks["save_requested"] <= trace.marks["save_acked"] <= trace.marks["saved"]
+    assert metrics.histogram("latency.total.ChampionKill").count == before + 1
+
+
+@pytest.mark.asyncio
+async def test_save_fails_without_replay_buffer_saved():
+    fake_ws = FakeOBS()
+    fake_ws.push_event = lambda *args: None
+    client = OBSClient()
+
+    with patch("obs.obs_client.websockets.connect", new=AsyncMock(return_value=fake_ws)):
+        result = await client.save_replay_buffer(confirm_timeout=0.05)
+        await client.close()
+
+    assert result.is_err()
+
+
+def test_make_auth_string():
+    # base64(sha256(base64(sha256("supersecretpassword" + salt)) + challenge))
+    auth = make_auth_string("supersecretpassword", "lM1GncleQOaCu9lT1yeUZhFYnqhsLLP1G5lAGo3ixaI=",
+                            "+IxH4CnCiqpX1rM9scsNynZzbOe4KhDeYcTNS3PDaeY=")
+    assert auth == "1Ct943GAT+6YQUUX47Ia/ncufilbe6+oD6lY+5kaCu4="
+
+
+@pytest.mark.asyncio
+async def test_connect_sends_authentication():
+    auth = {"challenge": "+IxH4CnCiqpX1rM9scsNynZzbOe4KhDeYcTNS3PDaeY=",
+            "salt": "lM1GncleQOaCu9lT1yeUZhFYnqhsLLP1G5lAGo3ixaI="}
+    fake_ws = FakeOBS(auth=auth)
+    client = OBSClient(password="supersecretpassword")
+
+    with patch("obs.obs_client.websockets.connect", new=AsyncMock(return_value=fake_ws)):
+        result = await client.connect()
+        await client.close()
+
+    assert result.is_ok()
+    assert fake_ws.sent[0]["d"]["authentication"] == "1Ct943GAT+6YQUUX47Ia/ncufilbe6+oD6lY+5kaCu4="
+
+
+@pytest.mark.asyncio
+async def test_connect_fails_without_password_when_required():
+    fake_ws = FakeOBS(auth={"challenge": "c", "salt": "s"})
+    client = OBSClient()
+
+    with patch("obs.obs_client.websockets.connect", new=AsyncMock(return_value=fake_ws)):
+        result = await client.connect()
+
+    assert result.is_err()
+    assert fake_ws.closed
+
+
+@pytest.mark.asyncio
+async def test_connect_times_out_without_hello():
+    fake_ws = FakeOBS()
+    fake_ws.incoming.get_nowait()
+    client = OBSClient(request_timeout=0.05)
+
+    with patch("obs.obs_client.websockets.connect", new=AsyncMock(return_value=fake_ws)):
+        result = await asyncio.wait_for(client.connect(), 1.0)
+
+    assert result.unwrap_err() == "TimeoutError"
+    assert fake_ws.closed
+    assert not client.is_connected()
+
+
+@pytest.mark.asyncio
+async def test_start_connects_and_reconnects_in_background():
+    sockets = [FakeOBS(), FakeOBS()]
+    client = OBSClient()
+
+    with patch("obs.obs_client.websockets.connect", new=AsyncMock(side_effect=sockets)) as mock_connect, \
+            patch("obs.obs_client.RECONNECT_INITIAL_DELAY", 0.01):
+        client.start()
+        await asyncio.sleep(0.05)
+        assert client.is_connected()
+
+        # 切断されたら裏で張り直す
+        await sockets[0].close()
+        await asyncio.sleep(0.05)
+        assert client.is_connected()
+        assert mock_connect.await_count == 2
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_reconnect_backs_off_when_connection_drops_right_away():
+    class DroppingOBS(FakeOBS):
+        # Identify までは済ませて、すぐ切る
+        async def send(self, raw):
+            await super().send(raw)
+            self.incoming.put_nowait(ConnectionError("closed"))
+
+    client = OBSClient()
+    with patch("obs.obs_client.websockets.connect", new=AsyncMock(side_effect=lambda *a, **k: DroppingOBS())) \
+            as mock_connect, patch("obs.obs_client.RECONNECT_INITIAL_DELAY", 0.02):
+        client.start()
+        await asyncio.sleep(0.2)
+        await client.close()
+
+    # 0.02, 0.04, 0.08 ... と待つので、すぐ張り直し続けたりはしない
+    assert mock_connect.await_count <= 5
+
+
+def connect_by_url(sockets):
+    async def connect(url, **kwargs):
+        return sockets[url]
+    return AsyncMock(side_effect=connect)
+
+
+@pytest.mark.asyncio
+async def test_targets_return_on_first_save_without_waiting_for_slow_obs():
+    fast, slow = FakeOBS(), FakeOBS(delays={"SaveReplayBuffer": 0.3})
+    targets = OBSTargets([OBSClient(url="ws://slow", name="slow"), OBSClient(url="ws://fast", name="fast")])
+    before = {name: metrics.histogram(f"obs.target.{name}.saved").count for name in ("fast", "slow")}
+
+    with patch("obs.obs_client.websockets.connect", new=connect_by_url({"ws://fast": fast, "ws://slow": slow})):
+        started = asyncio.get_running_loop().time()
+        result = await targets.save_replay_buffer()
+        elapsed = asyncio.get_running_loop().time() - started
+        # 遅いほうも裏で保存を続けている
+        await asyncio.sleep(0.4)
+        await targets.close()
+
+    assert result.is_ok()
+    assert elapsed < 0.2
+    for name in ("fast", "slow"):
+        assert metrics.histogram(f"obs.target.{name}.saved").count == before[name] + 1
+
+
+@pytest.mark.asyncio
+async def test_targets_report_every_failure():
+    down = OBSClient(url="ws://down", name="down")
+    broken = OBSClient(url="ws://broken", name="broken")
+    sockets = {"ws://broken": FakeOBS(failing_requests=("SaveReplayBuffer",))}
+
+    async def connect(url, **kwargs):
+        if url not in sockets:
+            raise OSError("refused")
+        return sockets[url]
+
+    with patch("obs.obs_client.websockets.connect", new=AsyncMock(side_effect=connect)):
+        result = await OBSTargets([down, broken]).save_replay_buffer()
+        await broken.close()
 
     assert result.is_err()
-    assert "Send failed" in result.unwrap_err()
+    assert "down: refused" in result.unwrap_err()
+    assert "broken: SaveReplayBuffer" in result.unwrap_err()
+
+
+def test_targets_from_config():
+    targets = OBSTargets.from_config({"obs": {"targets": [
+        {"name": "gaming", "url": "ws://gaming:4455"},
+        {"url": "ws://stream:4455", "password": "secret"},
+    ]}})
+    assert list(targets.clients) == ["gaming", "obs2"]
+    assert targets.primary.url == "ws://gaming:4455"
+    assert targets.clients["obs2"].password == "secret"
+
+    # 昔の1台だけの書き方もそのまま読める
+    legacy = OBSTargets.from_config({"obs": {"url": "ws://localhost:4455", "password": ""}})
+    assert list(legacy.clients) == ["default"]
+
+
+def test_targets_reject_duplicate_names():
+    with pytest.raises(ValueError, match="gaming"):
+        OBSTargets.from_config({"obs": {"targets": [
+            {"name": "gaming", "url": "ws://gaming:4455"},
+            {"name": "gaming", "url": "ws://stream:4455"},
+        ]}})
@@ -1,42 +1,48 @@
 # src/tests/test_player.py
 
 import pytest
-from unittest.mock import patch, MagicMock
-from lol_api.player import get_active_player_name, _active_player_cache, _active_player_timestamp
-from utils.option import Some, None_
-from datetime import datetime, timedelta
-
-def test_get_active_player_name_cache_hit():
-    # キャッシュ有効
-    now = datetime.now()
-    _active_player_cache._value = "Akari"
-    _active_player_timestamp._value = now
-
-    result = get_active_player_name()
-    assert result.is_some()
-    assert result.unwrap() == "Akari"
-
-@patch("lol_api.player.requests.get")
-def test_get_active_player_name_api_success(mock_get):
-    # キャッシュ無効・API成功
-    _active_player_cache._value = None
-    _active_player_timestamp._value = None
-
-    mock_res = MagicMock()
-    mock_res.json.return_value = {"summonerName": "Kokage"}
-    mock_res.status_code = 200
-    mock_res.raise_for_status = MagicMock()
-    mock_get.return_value = mock_res
-
-    result = get_active_player_name()
-    assert result.is_some()
-    assert result.unwrap() == "Kokage"
-
-@patch("lol_api.player.requests.get", side_effect=Exception("No connection"))
-def test_get_active_player_name_api_failure(mock_get):
-    # API失敗
-    _active_player_cache._value = None
-    _active_player_timestamp._value = None
-
-    result = get_active_player_name()
-    assert result.is_none()
+from lol_api.fetcher import LiveClientSnapshot
+from lol_api.player import ActivePlayerCache, get_active_player_name, active_player, player_names
+
+
+def make_snapshot(active):
+    return LiveClientSnapshot(1, {"allgamedata": {"activePlayer": active}}, {})
+
+
+def test_get_active_player_name_before_snapshot():
+    # スナップショットが来るまでは分からない（通信もしない）
+    active_player.reset()
+    assert get_active_player_name().is_none()
+
+
+@pytest.mark.asyncio
+async def test_filled_from_snapshot_with_riot_id():
+    cache = ActivePlayerCache()
+    await cache.handle_snapshot(make_snapshot(
+        {"riotId": "Akari#JP1", "riotIdGameName": "Akari", "summonerName": "Akari#JP1"}
+    ))
+
+    assert cache.get().unwrap() == "Akari#JP1"
+    assert cache.names().unwrap() == {"Akari#JP1", "Akari"}
+
+
+@pytest.mark.asyncio
+async def test_legacy_summoner_name():
+    cache = ActivePlayerCache()
+    await cache.handle_snapshot(make_snapshot({"summonerName": "Kokage"}))
+    assert cache.get().unwrap() == "Kokage"
+    assert player_names({"summonerName": "Kokage", "riotId": ""}) == {"Kokage"}
+
+
+@pytest.mark.asyncio
+async def test_invalidated_on_game_events():
+    cache = ActivePlayerCache()
+    await cache.handle_snapshot(make_snapshot({"summonerName": "Akari"}))
+    # 埋まった後は新しいスナップショットで上書きしない
+    await cache.handle_snapshot(make_snapshot({"summonerName": "Other"}))
+    assert cache.get().unwrap() == "Akari"
+
+    await cache.handle_game_event({"EventName": "GameEnd"})
+    assert cache.get().is_none()
+    await cache.handle_snapshot(make_snapshot({"summonerName": "Other"}))
+    assert cache.get().unwrap() == "Other"
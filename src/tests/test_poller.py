@@ -1,10 +1,10 @@
 # tests/test_poller.py
 
-import asyncio
 import pytest
-from unittest.mock import AsyncMock, patch, MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 from lol_api.events import LLEventPoller
+from lol_api.fetcher import LiveClientSnapshot
 from utils.event_dispatcher import EventDispatcher
 from utils.event_types import EventType
 
@@ -27,23 +27,56 @@ async def test_poller_dispatches_event_once():
         ]
     }
 
-    with patch("lol_api.events.requests.get") as mock_get:
-        # モックレスポンス
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = fake_event_data
-        mock_get.return_value = mock_response
-
-        # ストップイベントを1回のループ後にトリガーする
-        async def stop_after():
-            await asyncio.sleep(0.1)
-            poller.stop()
-
-        # 並列でポーラー実行
-        await asyncio.gather(
-            poller.poll_events_async(),
-            stop_after()
-        )
+    # 同じイベント一覧が2ティック続いても1回しか流さない
+    await poller.handle_snapshot(LiveClientSnapshot(1, {"eventdata": fake_event_data}, {}))
+    await poller.handle_snapshot(LiveClientSnapshot(2, {"eventdata": fake_event_data}, {}))
 
     # dispatcher.dispatchが1回呼ばれたことを確認
     dispatcher.dispatch.assert_awaited_once_with(EventType.CHAMPION_KILL, fake_event_data["Events"][0])
+
+@pytest.mark.asyncio
+async def test_poller_scans_only_new_tail_and_counts():
+    dispatcher = MagicMock(spec=EventDispatcher)
+    dispatcher.dispatch = AsyncMock()
+    poller = LLEventPoller(dispatcher)
+
+    events = [
+        {"EventID": 0, "EventName": "MinionsSpawning"},
+        {"EventID": 1, "EventName": "ChampionKill", "KillerName": "Akari"},
+    ]
+    await poller.handle_snapshot(LiveClientSnapshot(1, {"eventdata": {"Events": events}}, {}))
+    assert poller.query_params() == {"eventID": 2}
+    assert (poller.stats.seen, poller.stats.skipped, poller.stats.dispatched) == (2, 1, 1)
+
+    # eventIDクエリが無視されて全件返ってきても新しい分だけ処理する
+    events.append({"EventID": 2, "EventName": "Ace"})
+    await poller.handle_snapshot(LiveClientSnapshot(2, {"eventdata": {"Events": events}}, {}))
+    assert poller.stats.received == 3
+    assert (poller.stats.seen, poller.stats.skipped, poller.stats.dispatched) == (1, 0, 1)
+    assert poller.stats.total_dispatched == 2
+    dispatcher.dispatch.assert_awaited_with(EventType.ACE, events[2])
+
+    poller.reset()
+    assert poller.query_params() == {"eventID": 0}
+
+@pytest.mark.asyncio
+async def test_team_filter_matches_champion_kill_via_all_players():
+    dispatcher = EventDispatcher()
+    handler = AsyncMock()
+    dispatcher.register(EventType.CHAMPION_KILL, handler, team="ORDER")
+    poller = LLEventPoller(dispatcher)
+
+    all_game_data = {"allPlayers": [
+        {"summonerName": "Akari", "riotId": "Akari#JP1", "riotIdGameName": "Akari", "team": "ORDER"},
+        {"summonerName": "Kokage", "team": "CHAOS"},
+    ]}
+    events = {"Events": [
+        {"EventID": 1, "EventName": "ChampionKill", "KillerName": "Akari", "VictimName": "Kokage"},
+        {"EventID": 2, "EventName": "ChampionKill", "KillerName": "Kokage", "VictimName": "Akari"},
+        {"EventID": 3, "EventName": "ChampionKill", "KillerName": "Turret_T2_L_03_A", "VictimName": "Akari"},
+    ]}
+    await poller.handle_snapshot(LiveClientSnapshot(1, {"eventdata": events, "allgamedata": all_game_data}, {}))
+
+    (call,) = handler.await_args_list
+    assert call.args[0]["EventID"] == 1
+    assert call.args[0]["KillerTeam"] == "ORDER"
@@ -0,0 +1,158 @@
+# tests/test_replay_buffer.py
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from lol_api.fetcher import LiveClientSnapshot
+from obs.replay_buffer import ReplayBufferLifecycle
+from utils.result import Ok, Err
+
+
+def fake_client(active=False):
+    """
+    GetReplayBufferStatus には active を返して、それ以外は成功するだけのクライアント。
+    """
+    client = MagicMock()
+
+    async def call(request_type, request_data=None):
+        if request_type == "GetReplayBufferStatus":
+            return Ok({"outputActive": active})
+        return Ok({})
+    client.call = AsyncMock(side_effect=call)
+    return client
+
+
+def requested(client):
+    return [c.args[0] for c in client.call.await_args_list]
+
+
+@pytest.mark.asyncio
+async def test_check_warns_when_buffer_shorter_than_delay():
+    client = fake_client()
+    client.call_batch = AsyncMock(return_value=Ok([
+        Ok({"outputActive": True}), Ok({"outputSettings": {"max_time_sec": 4}}),
+    ]))
+    lifecycle = ReplayBufferLifecycle(client, replay_delay=5.0)
+
+    result = await lifecycle.check()
+
+    assert result.unwrap() == {"active": True, "max_time_sec": 4}
+    assert lifecycle.active is True
+    assert client.call_batch.await_args.args[0][1] == ("GetOutputSettings", {"outputName": "Replay Buffer"})
+
+
+@pytest.mark.asyncio
+async def test_game_start_starts_and_game_end_stops_after_grace():
+    client = fake_client()
+    # まとめた保存が replay_delay + max_extension まで遅れるので、stop_grace がもっと短くてもそこまでは待つ
+    lifecycle = ReplayBufferLifecycle(client, replay_delay=0.02, stop_grace=0.01, max_extension=0.08)
+    assert lifecycle.stop_grace == pytest.approx(0.1)
+
+    await lifecycle.handle_game_event({"EventName": "GameStart"})
+    assert requested(client) == ["GetReplayBufferStatus", "StartReplayBuffer"]
+    assert lifecycle.active is True
+
+    # もう動いているので何もしない
+    await lifecycle.handle_game_event({"EventName": "GameStart"})
+    assert len(requested(client)) == 2
+
+    client.call.side_effect = None
+    client.call.return_value = Ok({"outputActive": True})
+    await lifecycle.handle_game_event({"EventName": "GameEnd"})
+    await asyncio.sleep(0.05)
+    assert "StopReplayBuffer" not in requested(client)
+    await asyncio.sleep(0.1)
+    assert requested(client)[-1] == "StopReplayBuffer"
+    assert lifecycle.active is False
+
+
+@pytest.mark.asyncio
+async def test_new_game_cancels_pending_stop():
+    client = fake_client(active=True)
+    lifecycle = ReplayBufferLifecycle(client, replay_delay=0.0, stop_grace=0.05, max_extension=0.0)
+    lifecycle.active = True
+
+    await lifecycle.handle_game_event({"EventName": "GameEnd"})
+    await lifecycle.handle_game_event({"EventName": "GameStart"})
+    await asyncio.sleep(0.1)
+
+    assert "StopReplayBuffer" not in requested(client)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_starts_buffer_once_client_is_up():
+    client = fake_client()
+    lifecycle = ReplayBufferLifecycle(client)
+    snapshot = LiveClientSnapshot(1, {"allgamedata": {"gameData": {"gameTime": 300.0}}}, {})
+
+    await lifecycle.handle_snapshot(snapshot)
+    await lifecycle.close()
+    assert requested(client) == ["GetReplayBufferStatus", "StartReplayBuffer"]
+
+    # GameEnd のあとは、クライアントが戻ってくるまで勝手に開始しない
+    lifecycle.active = False
+    await lifecycle.handle_game_event({"EventName": "GameEnd"})
+    await lifecycle.handle_snapshot(snapshot)
+    await lifecycle.close()
+    assert requested(client).count("StartReplayBuffer") == 1
+
+    lifecycle.reset()
+    await lifecycle.handle_snapshot(snapshot)
+    await lifecycle.close()
+    assert requested(client).count("StartReplayBuffer") == 2
+
+
+@pytest.mark.asyncio
+async def test_check_counts_max_extension():
+    client = fake_client()
+    client.call_batch = AsyncMock(return_value=Ok([
+        Ok({"outputActive": True}), Ok({"outputSettings": {"max_time_sec": 12}}),
+    ]))
+    lifecycle = ReplayBufferLifecycle.from_config(client, {"replay_delay": 5.0, "replay_save": {"max_extension": 10.0}})
+
+    with patch("obs.replay_buffer.logger") as logger:
+        await lifecycle.check()
+    # 12秒は replay_delay には足りるけど、保存がまとめて遅れると足りない
+    logger.warning.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_client_down_stops_buffer_without_game_end():
+    client = fake_client(active=True)
+    lifecycle = ReplayBufferLifecycle(client, replay_delay=0.0, stop_grace=0.05, max_extension=0.0)
+    lifecycle.active = True
+
+    lifecycle.handle_client_down()
+    await asyncio.sleep(0.1)
+    assert requested(client)[-1] == "StopReplayBuffer"
+    assert lifecycle.active is False
+
+
+@pytest.mark.asyncio
+async def test_client_back_within_grace_keeps_buffer():
+    client = fake_client(active=True)
+    lifecycle = ReplayBufferLifecycle(client, replay_delay=0.0, stop_grace=0.05, max_extension=0.0)
+    lifecycle.active = True
+    snapshot = LiveClientSnapshot(1, {"allgamedata": {"gameData": {"gameTime": 300.0}}}, {})
+
+    lifecycle.handle_client_down()
+    await lifecycle.handle_snapshot(snapshot)
+    await asyncio.sleep(0.1)
+    assert "StopReplayBuffer" not in requested(client)
+
+
+@pytest.mark.asyncio
+async def test_failed_start_waits_before_retrying():
+    client = MagicMock()
+    client.call = AsyncMock(return_value=Err("OBSに繋がらない"))
+    now = [0.0]
+    lifecycle = ReplayBufferLifecycle(client, retry_interval=10.0, clock=lambda: now[0])
+
+    assert (await lifecycle.start()).is_err()
+    assert (await lifecycle.start()).is_err()
+    assert client.call.await_count == 1
+
+    now[0] = 11.0
+    await lifecycle.start()
+    assert client.call.await_count == 2
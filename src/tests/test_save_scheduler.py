@@ -0,0 +1,70 @@
+# tests/test_save_scheduler.py
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from obs.save_scheduler import ReplaySaveScheduler
+from utils.result import Ok
+
+@pytest.mark.asyncio
+async def test_overlapping_triggers_are_merged():
+    save = AsyncMock(return_value=Ok(None))
+    scheduler = ReplaySaveScheduler(save, merge_window=1.0, max_extension=1.0)
+
+    results = await asyncio.gather(
+        scheduler.request(0.05, "kill"),
+        scheduler.request(0.1, "multikill"),
+    )
+
+    save.assert_awaited_once_with([])
+    assert all(r.is_ok() for r in results)
+    assert (scheduler.requested, scheduler.issued) == (2, 1)
+
+@pytest.mark.asyncio
+async def test_deadline_is_capped():
+    save = AsyncMock(return_value=Ok(None))
+    scheduler = ReplaySaveScheduler(save, merge_window=1.0, max_extension=0.05)
+
+    # 2つめは上限を超えるので別の保存になる
+    await asyncio.gather(
+        scheduler.request(0.01, "kill"),
+        scheduler.request(0.2, "teamfight"),
+    )
+
+    assert save.await_count == 2
+
+@pytest.mark.asyncio
+async def test_save_error_becomes_err():
+    save = AsyncMock(side_effect=RuntimeError("obs down"))
+    scheduler = ReplaySaveScheduler(save)
+
+    result = await scheduler.request(0.01, "kill")
+
+    assert result.is_err()
+    assert "obs down" in result.unwrap_err()
+
+@pytest.mark.asyncio
+async def test_deadline_overrides_delay():
+    save = AsyncMock(return_value=Ok(None))
+    now = [100.0]
+    scheduler = ReplaySaveScheduler(save, clock=lambda: now[0])
+
+    # もう過ぎた時刻ならすぐ保存する（delay は使わない）
+    result = await asyncio.wait_for(scheduler.request(60.0, "kill", deadline=99.0), timeout=1.0)
+
+    assert result.is_ok()
+    save.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_book_returns_before_save_and_merges():
+    save = AsyncMock(return_value=Ok("/clips/1.mkv"))
+    scheduler = ReplaySaveScheduler(save, merge_window=1.0, max_extension=1.0)
+
+    # 予約するだけなので、呼んだ側は保存を待たない
+    first = scheduler.book(0.05, "kill")
+    second = scheduler.book(0.05, "multikill")
+    assert first is second
+    save.assert_not_awaited()
+
+    assert (await first).unwrap() == "/clips/1.mkv"
+    assert (scheduler.requested, scheduler.issued) == (2, 1)
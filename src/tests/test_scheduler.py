@@ -0,0 +1,93 @@
+# tests/test_scheduler.py
+
+import pytest
+from lol_api.fetcher import LiveClientSnapshot
+from lol_api.scheduler import AdaptivePollScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def snapshot(game_time, dead=False, events=None):
+    data = {
+        "activePlayer": {"riotId": "Akari#JP1", "summonerName": "Akari"},
+        "allPlayers": [{"riotId": "Akari#JP1", "summonerName": "Akari", "isDead": dead}],
+        "events": {"Events": events or []},
+        "gameData": {"gameTime": game_time},
+    }
+    return LiveClientSnapshot(1, {"allgamedata": data}, {})
+
+
+@pytest.mark.asyncio
+async def test_phases_choose_interval():
+    scheduler = AdaptivePollScheduler(min_interval=0.25, base_interval=1.0, max_interval=2.0, clock=FakeClock())
+
+    await scheduler.handle_snapshot(snapshot(0.0))
+    assert scheduler.next_interval() == 2.0  # ロード中
+
+    await scheduler.handle_snapshot(snapshot(30.0))
+    assert scheduler.next_interval() == 2.0  # ショップタイム
+
+    await scheduler.handle_snapshot(snapshot(120.0))
+    assert scheduler.next_interval() == 1.0
+
+    await scheduler.handle_snapshot(snapshot(120.0, dead=True))
+    assert scheduler.next_interval() == 2.0
+
+    await scheduler.handle_snapshot(snapshot(290.0))
+    assert scheduler.next_interval() == pytest.approx(0.625)  # ドラゴン湧き前
+
+
+@pytest.mark.asyncio
+async def test_activity_speeds_up_then_expires():
+    clock = FakeClock()
+    scheduler = AdaptivePollScheduler(min_interval=0.25, max_interval=2.0, activity_hold=10.0, clock=clock)
+    await scheduler.handle_snapshot(snapshot(120.0, dead=True))
+
+    scheduler.note_event("ChampionKill")
+    assert scheduler.next_interval() == 0.25
+
+    clock.now += 11.0
+    assert scheduler.next_interval() == 2.0
+
+    scheduler.note_health_change(0.2, threshold=0.3)
+    assert scheduler.next_interval() == 0.25
+
+
+@pytest.mark.asyncio
+async def test_objective_timer_moves_after_kill():
+    scheduler = AdaptivePollScheduler(clock=FakeClock())
+    kill = {"EventID": 5, "EventName": "DragonKill", "EventTime": 310.0}
+    await scheduler.handle_snapshot(snapshot(320.0, events=[kill]))
+    assert scheduler.next_interval() == 1.0
+
+
+def test_from_config():
+    scheduler = AdaptivePollScheduler.from_config({"polling": {"min_interval": 0.5, "max_interval": 3.0}})
+    assert scheduler.min_interval == 0.5
+    assert scheduler.max_interval == 3.0
+
+
+@pytest.mark.asyncio
+async def test_objective_window_is_bounded_and_death_backoff_wins():
+    scheduler = AdaptivePollScheduler(min_interval=0.25, base_interval=1.0, max_interval=2.0, clock=FakeClock())
+
+    # 湧いたあと倒されていないドラゴンやバロンでは速くしない
+    for game_time in (900.0, 1500.0, 2400.0):
+        await scheduler.handle_snapshot(snapshot(game_time))
+        assert scheduler.next_interval() == 1.0
+
+    # 湧く直前でもデス中はゆっくり
+    for game_time in (280.0, 900.0, 1500.0, 2400.0):
+        await scheduler.handle_snapshot(snapshot(game_time, dead=True))
+        assert scheduler.next_interval() == 2.0
+
+    await scheduler.handle_snapshot(snapshot(1190.0))
+    assert scheduler.next_interval() == pytest.approx(0.625)  # バロン湧き前
+    await scheduler.handle_snapshot(snapshot(1205.0))
+    assert scheduler.next_interval() == pytest.approx(0.625)  # 湧いた直後
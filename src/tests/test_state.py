@@ -0,0 +1,56 @@
+import logging
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from lol_api.fetcher import LiveClientSnapshot
+from lol_api.state import GameStatePoller
+from utils.event_dispatcher import EventDispatcher
+
+
+def snapshot(game_time, gold=0.0):
+    return LiveClientSnapshot(1, {"allgamedata": {"gameData": {"gameTime": game_time},
+                                                  "activePlayer": {"currentGold": gold}}}, {})
+
+
+def state_logs(caplog):
+    return [r.getMessage() for r in caplog.records if r.name == "lol-replay:fileonly"]
+
+
+def make_poller(**kwargs):
+    dispatcher = MagicMock(spec=EventDispatcher)
+    dispatcher.dispatch = AsyncMock()
+    return GameStatePoller(dispatcher, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_default_logs_only_changes(caplog):
+    caplog.set_level(logging.DEBUG, logger="lol-replay:fileonly")
+    poller = make_poller()
+
+    await poller.handle_snapshot(snapshot(1.0))
+    await poller.handle_snapshot(snapshot(1.0))
+    await poller.handle_snapshot(snapshot(2.0, gold=50.0))
+
+    logs = state_logs(caplog)
+    assert len(logs) == 2
+    assert '"gameTime":1.0' in logs[0]
+    assert logs[1].endswith('[["s",["gameData","gameTime"],2.0],["s",["activePlayer","currentGold"],50.0]]')
+    assert poller.dispatcher.dispatch.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_sampled_full_state(caplog):
+    caplog.set_level(logging.DEBUG, logger="lol-replay:fileonly")
+    poller = make_poller(mode="sample", sample_every=3)
+    for t in range(7):
+        await poller.handle_snapshot(snapshot(float(t)))
+    assert len(state_logs(caplog)) == 3
+
+
+@pytest.mark.asyncio
+async def test_nothing_built_when_level_is_disabled(caplog):
+    caplog.set_level(logging.INFO, logger="lol-replay:fileonly")
+    poller = make_poller()
+    await poller.handle_snapshot(snapshot(1.0))
+    assert state_logs(caplog) == []
+    # 差分の基準も持たない
+    assert poller._last is None
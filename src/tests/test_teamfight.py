@@ -0,0 +1,78 @@
+# tests/test_teamfight.py
+
+import pytest
+from lol_api.models import PlayerState
+from lol_api.teamfight import TeamFightDetector, TeamFightScoring
+
+
+def players(healths, dead=()):
+    result = []
+    for i, health in enumerate(healths):
+        result.append(PlayerState.from_dict({
+            "summonerName": f"P{i}",
+            "team": "ORDER" if i < len(healths) // 2 else "CHAOS",
+            "isDead": i in dead,
+            "championStats": {"currentHealth": health, "maxHealth": 1000.0},
+        }))
+    return result
+
+
+def test_quiet_game_is_not_team_fight():
+    detector = TeamFightDetector()
+    for t in range(15):
+        assert detector.update(players([1000.0] * 10), float(t)) is False
+    assert detector.health_change_ratio == 0.0
+
+
+def test_health_change_over_window_triggers():
+    detector = TeamFightDetector(TeamFightScoring(window=3, health_change_threshold=0.3))
+    assert detector.update(players([1000.0] * 10), 0.0) is False
+    # 2人が合計40%削られた
+    assert detector.update(players([800.0, 800.0] + [1000.0] * 8), 1.0) is True
+    assert detector.health_change_ratio == 0.4
+
+
+def test_window_deaths_expire_by_game_time():
+    detector = TeamFightDetector(TeamFightScoring(window=3, health_change_threshold=100.0, min_deaths_per_team=2))
+    full = [1000.0] * 10
+    detector.update(players(full), 0.0)
+    assert detector.update(players(full, dead={0, 1, 5, 6}), 1.0) is True
+    assert detector.window_deaths == {"ORDER": 2, "CHAOS": 2}
+
+    detector.update(players(full, dead={0, 1, 5, 6}), 2.0)
+    assert detector.update(players(full), 4.0) is True
+    # デスした列（1秒）が3秒のウィンドウから外れた
+    assert detector.update(players(full), 4.5) is False
+    assert detector.window_deaths == {"ORDER": 0, "CHAOS": 0}
+
+
+def test_window_covers_same_game_time_at_any_poll_rate():
+    # 10秒かけて少しずつ30%削られる。速くポーリングしても遅くても同じ結果になる
+    for step in (0.25, 2.0):
+        detector = TeamFightDetector(TeamFightScoring(window=10, health_change_threshold=0.3), min_interval=0.25)
+        t, fired = 0.0, False
+        while t <= 10.0:
+            health = 1000.0 - 150.0 * (t / 10.0)
+            fired = detector.update(players([health, health] + [1000.0] * 8), t)
+            t += step
+        assert fired is True
+        assert detector.health_change_ratio == pytest.approx(0.3)
+
+
+def test_fast_samples_do_not_overflow_ring():
+    detector = TeamFightDetector(TeamFightScoring(window=2, min_deaths_per_team=1, health_change_threshold=100.0),
+                                 min_interval=1.0)
+    full = [1000.0] * 10
+    detector.update(players(full), 0.0)
+    detector.update(players(full, dead={0, 5}), 0.1)
+    # 想定より速いサンプルでリングが埋まったら一番古い列から外す
+    for i in range(2, 10):
+        detector.update(players(full), i / 10)
+    assert detector.window_deaths == {"ORDER": 0, "CHAOS": 0}
+
+
+def test_reset_clears_history():
+    detector = TeamFightDetector(TeamFightScoring(window=3))
+    detector.update(players([1000.0] * 10), 0.0)
+    detector.reset()
+    assert detector.update(players([100.0] * 10), 1.0) is False
@@ -24,7 +24,63 @@ def create_default_config() -> None:
             "ChampionKill": True,
             "Multikill": True
         },
-        "replay_delay": 5.0
+        "replay_delay": 5.0,
+        "live_client": {
+            "base_url": "https://127.0.0.1:2999/liveclientdata"
+        },
+        "obs": {
+            "targets": [
+                {"name": "main", "url": "ws://localhost:4455", "password": ""}
+            ]
+        },
+        "metrics_file": "metrics.json",
+        "replay_save": {
+            "merge_window": 5.0,
+            "max_extension": 10.0
+        },
+        "replay_buffer": {
+            "manage": True,
+            "stop_grace": 30.0
+        },
+        "polling": {
+            "min_interval": 0.25,
+            "base_interval": 1.0,
+            "max_interval": 2.0
+        },
+        "game_clock": {
+            "window": 30,
+            "max_residual": 1.0
+        },
+        "team_fight": {
+            "window": 10,
+            "health_change_threshold": 0.3,
+            "min_deaths_per_team": 2
+        },
+        "state_log": {
+            "level": "DEBUG",
+            "mode": "changes",
+            "sample_every": 10,
+            "max_bytes": 5242880,
+            "backup_count": 3
+        },
+        "detectors": {
+            "gold_spike": {
+                "window": 10.0,
+                "threshold": 1000.0
+            },
+            "comeback": {
+                "deficit": 5
+            }
+        },
+        "changes": {
+            "gold_swing": 500.0,
+            "item_min_price": 2500
+        },
+        "dispatcher": {
+            "queue_size": 32,
+            "concurrency": 4,
+            "overflow": "drop_oldest"
+        }
     }
 
     try:
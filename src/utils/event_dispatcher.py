@@ -1,36 +1,266 @@
 # utils/event_dispatcher.py
 
 import asyncio
-from typing import Callable, Awaitable, Dict, List, Union
+import time
+from collections import deque
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Awaitable, Deque, Dict, List, Optional, Tuple, Union
 from utils.logger import logger
 from utils.event_types import EventType, CustomEventType
+from utils.metrics import metrics
+from utils.option import Option
 
 # 列挙型または文字列をサポート
 EventKey = Union[EventType, CustomEventType, str]
+Handler = Callable[[dict], Awaitable[None]]
+Predicate = Callable[[dict], bool]
+# フィルタの期待値。固定値か、dispatchのたびに呼ばれて値（またはOption）を返す関数
+Expected = Union[Any, Callable[[], Any]]
+
+# イベント名に含まれていたらワイルドカードとして扱う文字
+WILDCARD_CHARS = "*?["
+
+# キューがいっぱいのときの動き
+OVERFLOW_BLOCK = "block"              # 空くまでdispatch側を待たせる（バックプレッシャー）
+OVERFLOW_DROP_NEWEST = "drop_newest"  # 新しいイベントを捨てる
+OVERFLOW_DROP_OLDEST = "drop_oldest"  # 一番古いイベントを捨てて新しいのを入れる
+OVERFLOW_MERGE = "merge"              # 一番新しい待ちイベントを新しい内容で上書きする
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_NEWEST, OVERFLOW_DROP_OLDEST, OVERFLOW_MERGE)
+
+# config.json に "dispatcher" セクションがないときのキューの長さとワーカー数
+QUEUE_SIZE = 32
+CONCURRENCY = 4
+
+
+def event_key(event_name: EventKey) -> str:
+    """
+    列挙型でも文字列でも同じキーになるように、イベント名を文字列にそろえる。
+    """
+    return getattr(event_name, "value", event_name)
+
+
+def field_equals(field: str, expected: Expected) -> Predicate:
+    """
+    イベントの field が expected と一致するかを調べる関数を作る。
+    expected が関数なら、dispatchのたびに呼んで今の値と比べるよ（Optionが返ってきてNoneなら不一致）。
+    値が集合なら、そのどれかと一致すればOK。
+    """
+    if callable(expected):
+        def check(data: dict) -> bool:
+            value = expected()
+            if isinstance(value, Option):
+                if value.is_none():
+                    return False
+                value = value.unwrap()
+            if isinstance(value, (set, frozenset)):
+                return data.get(field) in value
+            return value is not None and data.get(field) == value
+    else:
+        def check(data: dict) -> bool:
+            return data.get(field) == expected
+    return check
+
+
+class Subscription:
+    """
+    ハンドラ1つ分の購読。登録するときにフィルタを関数のリストにしておくよ。
+
+    Attributes:
+        pattern (str): イベント名、またはワイルドカードのパターン。
+        handler (Handler): 呼び出すハンドラ。
+        filters (List[Predicate]): 全部Trueのときだけハンドラを呼ぶ。
+    """
+    def __init__(self, pattern: str, handler: Handler, filters: List[Predicate]):
+        self.pattern = pattern
+        self.handler = handler
+        self.filters = filters
+        self.name = f"{pattern}.{getattr(handler, '__name__', 'handler')}"
+
+    def matches(self, data: dict) -> bool:
+        for check in self.filters:
+            try:
+                if not check(data):
+                    return False
+            except Exception as e:
+                logger.error(f"イベント '{self.name}' のフィルタでエラー発生: {e!r}")
+                return False
+        return True
+
+
+class HandlerQueue:
+    """
+    ハンドラ1つ分の有限キューとワーカー。
+    ハンドラが遅くても、dispatchした側や他のハンドラを待たせないよ！
+
+    Attributes:
+        name (str): メトリクスやログに使う名前。
+        dropped (int): あふれて捨てたイベントの数。
+        merged (int): あふれて上書きしたイベントの数。
+    """
+    def __init__(self, name: str, handler: Handler, maxsize: int, concurrency: int, overflow: str):
+        self.name = name
+        self.handler = handler
+        self.maxsize = maxsize
+        self.concurrency = concurrency
+        self.overflow = overflow
+        self.dropped = 0
+        self.merged = 0
+        self._items: Deque[Tuple[dict, float]] = deque()
+        self._cond = asyncio.Condition()
+        self._workers: List[asyncio.Task] = []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    async def put(self, data: dict) -> None:
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+        async with self._cond:
+            if len(self._items) >= self.maxsize:
+                if self.overflow == OVERFLOW_BLOCK:
+                    await self._cond.wait_for(lambda: len(self._items) < self.maxsize)
+                elif self.overflow == OVERFLOW_DROP_NEWEST:
+                    self.dropped += 1
+                    logger.warning(f"⚠️ '{self.name}' のキューがいっぱいなのでイベントを捨てたよ")
+                    return
+                elif self.overflow == OVERFLOW_DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                    logger.warning(f"⚠️ '{self.name}' のキューがいっぱいなので古いイベントを捨てたよ")
+                else:
+                    _, enqueued_at = self._items[-1]
+                    self._items[-1] = (data, enqueued_at)
+                    self.merged += 1
+                    return
+
+            self._items.append((data, time.monotonic()))
+            metrics.observe(f"dispatch.queue_depth.{self.name}", len(self._items))
+            self._cond.notify_all()
+
+    async def _work(self) -> None:
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: len(self._items) > 0)
+                data, enqueued_at = self._items.popleft()
+                # 空きを待っているdispatch側を起こす
+                self._cond.notify_all()
+
+            started_at = time.monotonic()
+            metrics.observe(f"dispatch.queue_wait.{self.name}", started_at - enqueued_at)
+            try:
+                await self.handler(data)
+            except Exception as e:
+                logger.error(f"イベント '{self.name}' のハンドラでエラー発生: {e!r}")
+            metrics.observe(f"dispatch.handler.{self.name}", time.monotonic() - started_at)
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
 
 class EventDispatcher:
-    def __init__(self):
-        self._handlers: Dict[str, List[Callable[[dict], Awaitable[None]]]] = {}
+    """
+    イベント名ごとに非同期ハンドラを登録して呼び出すよ。
+
+    queue_size が0なら、dispatch はハンドラが全部終わるまで待つ。
+    ポーラーは共有フェッチャーの中で順番に呼ばれるので、遅いハンドラがあると全部のポーラーが止まっちゃう。
+    1以上なら、dispatch はハンドラごとの有限キューに積むだけですぐ戻って、
+    ハンドラはワーカーが concurrency 本ずつ並行に処理するよ。アプリは from_config でこっちを使うよ。
+    """
+    def __init__(self, queue_size: int = 0, concurrency: int = 1, overflow: str = OVERFLOW_DROP_OLDEST):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"未知のoverflowポリシー: {overflow}")
+        self.queue_size = queue_size
+        self.concurrency = max(concurrency, 1)
+        self.overflow = overflow
+        # イベント名ごとの購読と、ワイルドカードの購読
+        self._exact: Dict[str, List[Subscription]] = {}
+        self._wildcards: List[Subscription] = []
+        # イベント名から、それに当てはまる購読を引けるようにしたもの（登録のたびに作り直す）
+        self._index: Dict[str, List[Subscription]] = {}
+        self._queues: Dict[int, HandlerQueue] = {}
 
-    def register(self, event_name: EventKey, handler: Callable[[dict], Awaitable[None]]) -> None:
+    @classmethod
+    def from_config(cls, config: dict) -> "EventDispatcher":
+        """
+        config.json の "dispatcher" セクションから作る。なければキューありで動かすよ。
+        """
+        dispatcher = config.get("dispatcher", {})
+        return cls(
+            queue_size=dispatcher.get("queue_size", QUEUE_SIZE),
+            concurrency=dispatcher.get("concurrency", CONCURRENCY),
+            overflow=dispatcher.get("overflow", OVERFLOW_DROP_OLDEST),
+        )
+
+    def register(self, event_name: EventKey, handler: Handler, *,
+                 killer: Optional[Expected] = None, victim: Optional[Expected] = None,
+                 team: Optional[Expected] = None, predicate: Optional[Predicate] = None) -> None:
         """
         指定したイベント名に非同期ハンドラを登録します。
+        "*Steal" のようなワイルドカードも使えるよ。
+
+        Args:
+            killer: KillerName がこれと一致するイベントだけ受け取る。
+            victim: VictimName がこれと一致するイベントだけ受け取る。
+            team: KillerTeam（Aceなら AcingTeam）がこれと一致するイベントだけ受け取る。
+                Live Client のイベントには KillerTeam がないので、LLEventPoller が
+                同じティックの allPlayers から付けたものと比べるよ（allgamedata がないティックでは付かない）。
+            predicate: イベントを受け取ってTrueを返したときだけ受け取る。
         """
-        name = str(event_name)
-        if name not in self._handlers:
-            self._handlers[name] = []
-        self._handlers[name].append(handler)
+        filters: List[Predicate] = []
+        if killer is not None:
+            filters.append(field_equals("KillerName", killer))
+        if victim is not None:
+            filters.append(field_equals("VictimName", victim))
+        if team is not None:
+            by_killer = field_equals("KillerTeam", team)
+            by_ace = field_equals("AcingTeam", team)
+            filters.append(lambda data: by_ace(data) if "AcingTeam" in data else by_killer(data))
+        if predicate is not None:
+            filters.append(predicate)
+
+        key = event_key(event_name)
+        subscription = Subscription(key, handler, filters)
+        if any(c in key for c in WILDCARD_CHARS):
+            self._wildcards.append(subscription)
+        else:
+            self._exact.setdefault(key, []).append(subscription)
+        self._index.clear()
+
+    def subscriptions_for(self, event_name: EventKey) -> List[Subscription]:
+        """
+        イベント名に当てはまる購読を登録順に返す。一度調べたイベント名は覚えておくよ。
+        """
+        key = event_key(event_name)
+        subscriptions = self._index.get(key)
+        if subscriptions is None:
+            subscriptions = self._exact.get(key, []) + [
+                s for s in self._wildcards if fnmatchcase(key, s.pattern)
+            ]
+            self._index[key] = subscriptions
+        return subscriptions
 
     async def dispatch(self, event_name: EventKey, data: dict) -> None:
         """
-        指定したイベント名に登録されている全てのハンドラを呼び出します。
+        指定したイベント名に登録されていて、フィルタに合うハンドラだけを呼び出します。
         """
-        name = str(event_name)
-        handlers = self._handlers.get(name, [])
+        name = event_key(event_name)
+        subscriptions = [s for s in self.subscriptions_for(name) if s.matches(data)]
+        if not subscriptions:
+            return
+
+        if self.queue_size > 0:
+            for subscription in subscriptions:
+                await self._queue_for(subscription).put(data)
+            return
+
         tasks = []
-        for handler in handlers:
+        for subscription in subscriptions:
             try:
-                task = asyncio.create_task(handler(data))
+                task = asyncio.create_task(subscription.handler(data))
                 tasks.append(task)
             except Exception as e:
                 logger.error(f"イベント '{name}' の作成中にエラー発生: {e}")
@@ -39,7 +269,27 @@ class EventDispatcher:
             try:
                 results = await asyncio.gather(*tasks, return_exceptions=True)
                 for result in results:
-                    if result is not None:
+                    if isinstance(result, Exception):
+                        logger.error(f"イベント '{name}' のハンドラでエラー発生: {result!r}")
+                    elif result is not None:
                         logger.debug(f"イベント '{name}' の結果: {result}")
             except Exception as e:
                 logger.error(f"イベント '{name}' の処理中にエラー発生: {e}")
+
+    def _queue_for(self, subscription: Subscription) -> HandlerQueue:
+        queue = self._queues.get(id(subscription))
+        if queue is None:
+            queue = HandlerQueue(subscription.name, subscription.handler,
+                                 self.queue_size, self.concurrency, self.overflow)
+            self._queues[id(subscription)] = queue
+        return queue
+
+    def queue_depths(self) -> Dict[str, int]:
+        """
+        ハンドラごとの今のキューの長さ。
+        """
+        return {queue.name: len(queue) for queue in self._queues.values()}
+
+    async def close(self) -> None:
+        for queue in self._queues.values():
+            await queue.close()
@@ -11,6 +11,7 @@ class EventType(str, Enum):
     DRAGON_KILL = "DragonKill"
     HERALD_KILL = "HeraldKill"
     BARON_KILL = "BaronKill"
+    GAME_START = "GameStart"
     GAME_END = "GameEnd"
     PLAYER_DEATH = "ChampionDeath"
     DRAGON_STEAL = "DragonSteal"
@@ -24,3 +25,12 @@ class CustomEventType(str, Enum):
     GOLD_SPIKE = "gold_spike"
     SOLO_BARAM = "solo_baron"
     COMEBACK = "comeback_detected"
+    GAME_STATE_UPDATE = "game_state_update"
+
+# 🌟 allgamedata の前後の差分から作る変化イベント
+class ChangeEventType(str, Enum):
+    LEVEL_UP = "LevelUp"
+    ITEM_COMPLETED = "ItemCompleted"
+    GOLD_SWING = "GoldSwing"
+    DEATH_TIMER = "DeathTimer"
+    KILL_SCORE = "KillScore"
@@ -0,0 +1,25 @@
+import json
+from typing import Any, Callable, Union
+
+# 速いJSONデコーダがインストールされていればそれを使う（どれも無ければ標準のjson）
+try:
+    import orjson
+
+    _loads: Callable[[Union[bytes, str]], Any] = orjson.loads
+    BACKEND = "orjson"
+except ImportError:
+    try:
+        import msgspec
+
+        _loads = msgspec.json.Decoder().decode
+        BACKEND = "msgspec"
+    except ImportError:
+        _loads = json.loads
+        BACKEND = "json"
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    JSONをデコードする。bytes のまま渡せば、速いデコーダは文字列にする手間も省けるよ。
+    """
+    return _loads(data)
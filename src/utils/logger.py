@@ -1,5 +1,12 @@
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# ファイルだけに出す詳細ログのローテーション（1ファイルの上限バイト数と残す世代数）
+FILEONLY_MAX_BYTES = 5 * 1024 * 1024
+FILEONLY_BACKUP_COUNT = 3
 
 logger = logging.getLogger("lol-replay")
 logger.setLevel(logging.DEBUG)
@@ -22,11 +29,37 @@ file_handler.setFormatter(file_formatter)
 logger.addHandler(console_handler)
 logger.addHandler(file_handler)
 
+class _ThreadQueueHandler(QueueHandler):
+    """
+    同じプロセスの書き込みスレッドに渡すだけなので、呼び出し側では整形しないQueueHandler。
+    メッセージの組み立てもファイル書き込みも書き込みスレッドでやるよ。
+    """
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
 fileonly_logger = logging.getLogger("lol-replay:fileonly")
 fileonly_logger.setLevel(logging.DEBUG)
 
-fileonly_handler = logging.FileHandler("replay_fileonly.log", encoding="utf-8")
+fileonly_handler = RotatingFileHandler(
+    "replay_fileonly.log", maxBytes=FILEONLY_MAX_BYTES, backupCount=FILEONLY_BACKUP_COUNT, encoding="utf-8"
+)
 fileonly_handler.setLevel(logging.DEBUG)
 fileonly_handler.setFormatter(file_formatter)
 
-fileonly_logger.addHandler(fileonly_handler)
+# イベントループを止めないように、書き込みは別スレッドに任せる
+_fileonly_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+fileonly_logger.addHandler(_ThreadQueueHandler(_fileonly_queue))
+_fileonly_listener = QueueListener(_fileonly_queue, fileonly_handler, respect_handler_level=True)
+_fileonly_listener.start()
+atexit.register(_fileonly_listener.stop)
+
+
+def configure_fileonly_log(config: dict) -> None:
+    """
+    config.json の "state_log" セクションでファイル専用ログのレベルとローテーションを変える。
+    """
+    state_log = config.get("state_log", {})
+    fileonly_logger.setLevel(getattr(logging, str(state_log.get("level", "DEBUG")).upper(), logging.DEBUG))
+    fileonly_handler.maxBytes = state_log.get("max_bytes", FILEONLY_MAX_BYTES)
+    fileonly_handler.backupCount = state_log.get("backup_count", FILEONLY_BACKUP_COUNT)
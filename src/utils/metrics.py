@@ -0,0 +1,142 @@
+import json
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence
+from utils.logger import logger
+
+# ヒストグラムのバケット境界（秒）
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 60.0)
+# イベントdictにレイテンシ計測用のトレースを載せるときのキー
+TRACE_KEY = "_trace"
+
+
+class Histogram:
+    """
+    固定バケットのヒストグラム。
+
+    Attributes:
+        count (int): 記録した値の数。
+        sum (float): 記録した値の合計。
+    """
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # 最後の要素は上限なし(+Inf)のバケット
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        バケットの上限値で近似したq分位点を返す。
+        """
+        if self.count == 0:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": {
+                **{str(b): c for b, c in zip(self.buckets, self.counts)},
+                "+Inf": self.counts[-1],
+            },
+        }
+
+
+class MetricsRegistry:
+    """
+    名前付きのヒストグラムをまとめて持って、JSONに書き出すよ。
+    """
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+
+    def histogram(self, name: str) -> Histogram:
+        if name not in self._histograms:
+            self._histograms[name] = Histogram()
+        return self._histograms[name]
+
+    def observe(self, name: str, value: float) -> None:
+        self.histogram(name).observe(value)
+
+    def snapshot(self) -> dict:
+        return {name: h.to_dict() for name, h in sorted(self._histograms.items())}
+
+    def write_json(self, path: str) -> None:
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.warning(f"⚠️ メトリクスの書き出しに失敗したよ: {e}")
+
+
+class LatencyTrace:
+    """
+    1つのゲームイベントがクリップになるまでの各段階の時刻（time.monotonic）。
+
+    Attributes:
+        event_name (str): きっかけになったイベント名。
+        game_lag (float): ゲーム内でイベントが起きてから取得されるまでの秒数。
+        marks (Dict[str, float]): 段階名と時刻。
+        saved_path (Optional[str]): 保存されたクリップのパス。
+    """
+    # 段階の順番
+    STAGES = ("detected", "dispatched", "save_requested", "save_acked", "saved")
+
+    def __init__(self, event_name: str, detected_at: float, game_lag: float = 0.0):
+        self.event_name = event_name
+        self.game_lag = max(game_lag, 0.0)
+        self.marks: Dict[str, float] = {"detected": detected_at}
+        self.saved_path: Optional[str] = None
+
+    def mark(self, stage: str, at: Optional[float] = None) -> None:
+        self.marks[stage] = time.monotonic() if at is None else at
+
+    def stage_latencies(self) -> Dict[str, float]:
+        """
+        隣り合う段階の間の秒数と、イベント発生から保存完了までの合計を返す。
+        """
+        latencies = {"detection": self.game_lag}
+        previous = "detected"
+        for stage in self.STAGES[1:]:
+            if stage in self.marks:
+                latencies[stage] = self.marks[stage] - self.marks[previous]
+                previous = stage
+        if "saved" in self.marks:
+            latencies["total"] = self.game_lag + self.marks["saved"] - self.marks["detected"]
+        return latencies
+
+
+def record_traces(traces: List[LatencyTrace]) -> None:
+    """
+    保存が終わったトレースをヒストグラムに記録する。
+    """
+    for trace in traces:
+        latencies = trace.stage_latencies()
+        for stage, seconds in latencies.items():
+            metrics.observe(f"latency.{stage}", seconds)
+        if "total" in latencies:
+            metrics.observe(f"latency.total.{trace.event_name}", latencies["total"])
+
+
+metrics = MetricsRegistry()
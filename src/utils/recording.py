@@ -0,0 +1,274 @@
+import gzip
+import json
+import time
+import zlib
+from bisect import bisect_right
+from typing import Callable, Iterator, Optional
+from utils.logger import logger
+
+# 1行1レコードで詰めて書くための区切り
+RECORD_SEPARATORS = (",", ":")
+# 何秒ごとに圧縮ストリームを区切ってディスクに書き出すか
+FLUSH_INTERVAL = 5.0
+
+
+class RecordingWriter:
+    """
+    Live Client APIのレスポンスを、gzip圧縮の JSON Lines に1件ずつ追記していくよ。
+    メモリにはためないし、途中で落ちても最後に flush したところまでは読めるよ！
+
+    1レコードはこんな形:
+        {"t": 取得時刻(UNIX秒), "ep": エンドポイント名, "data": レスポンス}
+
+    Attributes:
+        path (str): 書き込み先のファイル。
+        records (int): 書いたレコードの数。
+    """
+    def __init__(self, path: str, flush_interval: float = FLUSH_INTERVAL, compresslevel: int = 6,
+                 clock: Callable[[], float] = time.monotonic):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.records = 0
+        self._clock = clock
+        # 追記モードなので、同じファイルに続けて書くと gzip のメンバーが増えるだけで前の分は消えない
+        self._file = gzip.open(path, "ab", compresslevel=compresslevel)
+        self._last_flush = clock()
+
+    def write(self, endpoint: str, data: dict, captured_at: Optional[float] = None, **extra) -> None:
+        """
+        1レコード書く。extra に渡したものもそのままレコードに入るよ。
+        """
+        record = {"t": time.time() if captured_at is None else captured_at, "ep": endpoint, "data": data}
+        record.update(extra)
+        self.write_record(record)
+
+    def write_record(self, record: dict) -> None:
+        """
+        組み立て済みのレコードをそのまま1行として書く。
+        """
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=RECORD_SEPARATORS).encode("utf-8"))
+        self._file.write(b"\n")
+        self.records += 1
+
+        if self._clock() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        ここまでのレコードを、ファイルだけで展開できる状態にしてディスクへ書き出す。
+        """
+        self._file.flush(zlib.Z_SYNC_FLUSH)
+        self._last_flush = self._clock()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self) -> "RecordingWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def read_records(path: str) -> Iterator[dict]:
+    """
+    RecordingWriter で書いたファイルを先頭から1レコードずつ読む。
+    書いている途中で落ちたファイルでも、読めるところまでは返すよ。
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if not line.strip():
+                    continue
+                yield json.loads(line)
+        except (EOFError, json.JSONDecodeError, zlib.error) as e:
+            logger.warning(f"⚠️ {path} の末尾が壊れていたので、そこまでで読むのをやめたよ: {e}")
+
+
+# 差分の操作。パスは dict のキーか list の添字の並び
+OP_SET = "s"      # [OP_SET, path, value]    path の値を value にする
+OP_DELETE = "d"   # [OP_DELETE, path]        path のキーを消す
+OP_EXTEND = "x"   # [OP_EXTEND, path, items] path のリストの末尾に items を足す
+# 何秒ごとに差分ではなく丸ごと（キーフレーム）を書くか
+KEYFRAME_INTERVAL = 30.0
+
+
+def json_diff(old, new, path: Optional[list] = None) -> list:
+    """
+    2つのJSON値の差分を、apply_diff で old から new を作れる操作のリストにする。
+    dict はキーごと、同じ長さの list は要素ごとに潜って、末尾に足されただけの list は足した分だけにするよ。
+    """
+    path = path or []
+    if type(old) is not type(new):
+        return [[OP_SET, path, new]]
+
+    if isinstance(new, dict):
+        ops = []
+        for key, value in new.items():
+            if key not in old:
+                ops.append([OP_SET, path + [key], value])
+            elif old[key] != value:
+                ops.extend(json_diff(old[key], value, path + [key]))
+        for key in old:
+            if key not in new:
+                ops.append([OP_DELETE, path + [key]])
+        return ops
+
+    if isinstance(new, list):
+        if len(new) == len(old):
+            ops = []
+            for i, (a, b) in enumerate(zip(old, new)):
+                if a != b:
+                    ops.extend(json_diff(a, b, path + [i]))
+            return ops
+        if len(new) > len(old) and new[:len(old)] == old:
+            return [[OP_EXTEND, path, new[len(old):]]]
+        return [[OP_SET, path, new]]
+
+    return [] if old == new else [[OP_SET, path, new]]
+
+
+def apply_diff(doc, ops: list):
+    """
+    json_diff の操作を適用した新しい値を返す。
+    書き換える場所までの dict / list だけをコピーするので、元の doc は変わらないよ。
+    """
+    for op in ops:
+        doc = _apply_op(doc, op[0], op[1], op[2] if len(op) > 2 else None)
+    return doc
+
+
+def _apply_op(node, kind: str, path: list, value):
+    if not path:
+        if kind == OP_EXTEND:
+            return node + value
+        return value
+
+    head, rest = path[0], path[1:]
+    node = node.copy()
+    if not rest and kind == OP_DELETE:
+        del node[head]
+    else:
+        node[head] = _apply_op(node[head] if (rest or kind == OP_EXTEND) else None, kind, rest, value)
+    return node
+
+
+class DeltaRecordingWriter:
+    """
+    エンドポイントごとに、keyframe_interval 秒ごとの丸ごとのレコード（キーフレーム）と、
+    その間は前回との差分だけのレコードを書くよ。
+
+    キーフレームは RecordingWriter と同じ {"t", "ep", "data"}、差分は {"t", "ep", "diff"} の形。
+    """
+    def __init__(self, path: str, keyframe_interval: float = KEYFRAME_INTERVAL, **kwargs):
+        self.keyframe_interval = keyframe_interval
+        self._writer = RecordingWriter(path, **kwargs)
+        self._last: dict = {}
+        self._last_keyframe_at: dict = {}
+
+    @property
+    def path(self) -> str:
+        return self._writer.path
+
+    @property
+    def records(self) -> int:
+        return self._writer.records
+
+    def write(self, endpoint: str, data: dict, captured_at: Optional[float] = None, **extra) -> None:
+        captured_at = time.time() if captured_at is None else captured_at
+        keyframe_at = self._last_keyframe_at.get(endpoint)
+        if keyframe_at is None or captured_at - keyframe_at >= self.keyframe_interval:
+            self._writer.write(endpoint, data, captured_at, **extra)
+            self._last_keyframe_at[endpoint] = captured_at
+        else:
+            record = {"t": captured_at, "ep": endpoint, "diff": json_diff(self._last[endpoint], data)}
+            record.update(extra)
+            self._writer.write_record(record)
+        self._last[endpoint] = data
+
+    def flush(self) -> None:
+        self._writer.flush()
+
+    def close(self) -> None:
+        self._writer.close()
+
+    def __enter__(self) -> "DeltaRecordingWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class RecordingReader:
+    """
+    記録ファイルを読み込んで、好きな時刻の各エンドポイントのレスポンスを復元するよ。
+    差分形式でもそうでなくても読めるよ！
+
+    Attributes:
+        endpoints (List[str]): 記録に入っているエンドポイント。
+        start (float): 最初のレコードの時刻。
+        end (float): 最後のレコードの時刻。
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._times: dict = {}
+        self._records: dict = {}
+        self._keyframes: dict = {}
+        # 直前に復元した (添字, 値)。前から順に読むときは差分を足すだけで済む
+        self._cursor: dict = {}
+
+        for record in read_records(path):
+            ep = record["ep"]
+            if "data" not in record and ep not in self._keyframes:
+                # 最初のキーフレームより前の差分は復元できない
+                continue
+            if "data" in record:
+                self._keyframes.setdefault(ep, []).append(len(self._records.get(ep, [])))
+            self._times.setdefault(ep, []).append(record["t"])
+            self._records.setdefault(ep, []).append(record)
+
+        self.endpoints = sorted(self._records)
+        all_times = [t for times in self._times.values() for t in times]
+        self.start = min(all_times) if all_times else 0.0
+        self.end = max(all_times) if all_times else 0.0
+
+    def times(self, endpoint: str) -> list:
+        return self._times.get(endpoint, [])
+
+    def record(self, endpoint: str, index: int) -> dict:
+        """
+        index 番目のレコードそのもの（latency などの付帯情報を見るとき用）。
+        """
+        return self._records[endpoint][index]
+
+    def index_at(self, endpoint: str, t: float) -> int:
+        """
+        時刻 t の時点で最新だったレコードの添字。まだ何もなければ -1。
+        """
+        return bisect_right(self.times(endpoint), t) - 1
+
+    def at(self, endpoint: str, t: float):
+        """
+        時刻 t の時点で最新だったレスポンスを返す。まだ何もなければ None。
+        返した値は書き換えないでね（次の復元で使い回すよ）。
+        """
+        index = self.index_at(endpoint, t)
+        return self.get(endpoint, index) if index >= 0 else None
+
+    def get(self, endpoint: str, index: int):
+        """
+        index 番目のレコード時点のレスポンスを復元する。
+        """
+        keyframes = self._keyframes[endpoint]
+        keyframe = keyframes[bisect_right(keyframes, index) - 1]
+        cursor = self._cursor.get(endpoint)
+        if cursor is not None and keyframe <= cursor[0] <= index:
+            start, doc = cursor
+        else:
+            start, doc = keyframe, self._records[endpoint][keyframe]["data"]
+
+        for record in self._records[endpoint][start + 1:index + 1]:
+            doc = record["data"] if "data" in record else apply_diff(doc, record["diff"])
+        self._cursor[endpoint] = (index, doc)
+        return doc